@@ -0,0 +1,196 @@
+"""
+api/views.py'deki okuma endpoint'lerinin async halleri (ASGI icin).
+Sorgular Django'nun async ORM'i ile calisiyor, worker thread'i beklemiyor.
+settings.API_ASYNC_VIEWS aciksa api/urls.py bunlari kullaniyor.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import CachedOAuth2Authentication, get_bearer_token, token_cache
+from .models import HostGroup, Device, DeviceState
+from .delta import apply_delta
+from .etag import conditional_list, device_list_models
+from .fql import filter_queryset
+from .fragments import adevice_fragments, fragment_body, fragment_cache, fragment_data
+from .includes import get_includes, with_includes
+from .lookup import afetch_chunks, alookup, get_ids
+from .paginators import CustomPagination
+from .renderers import select_renderer
+from .serializers import fast_host_group, fast_device_list, fast_device_detail, fast_device_state
+from .snapshot import engine as snapshot_engine, list_supported
+from .streaming import STREAM_CHUNK_SIZE, wants_stream, aserialize_chunks, astreaming_response
+from .views import entity_meta, missing_errors
+
+
+def json_response(data, status=200, renderer=None):
+    # renderer: select_renderer() ile Accept'ten secilen (NDJSON / msgpack), yoksa JSON
+    if renderer is None or isinstance(renderer, JSONRenderer):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.content_type)
+
+
+async def authenticate(request):
+    # Cache'teki token icin thread'e hic gecmiyoruz, sadece miss'te DOT'un sync dogrulamasi
+    token = get_bearer_token(request)
+    if token:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+    return await sync_to_async(CachedOAuth2Authentication().authenticate_uncached)(request, token)
+
+
+def api_endpoint(view):
+    """
+    DRF'in @api_view'i async view desteklemiyor; burada ayni isleri yapiyoruz:
+    authentication, DRF Request (query_params/data) ve APIException -> JSON cevap.
+    """
+    @wraps(view)
+    async def wrapper(request):
+        drf_request = Request(request, parsers=[JSONParser()])
+        try:
+            user_auth = await authenticate(request)
+            if user_auth is not None:
+                request.user, request.auth = user_auth
+            return await view(drf_request)
+        except APIException as exc:
+            return json_response({"detail": exc.detail}, status=exc.status_code)
+
+    return csrf_exempt(wrapper)
+
+
+@conditional_list((HostGroup,))
+@require_GET
+@api_endpoint
+async def host_groups(request):
+    paginator = CustomPagination()
+
+    hosts = fast_host_group.values(HostGroup.objects.all())
+    result = await paginator.apaginate_queryset(hosts, request)
+
+    return json_response({
+        "meta": paginator.get_meta(),
+        "errors": None,
+        "resources": await fast_host_group.aserialize(result)
+    })
+
+
+@conditional_list(device_list_models)
+@require_GET
+@api_endpoint
+async def device_list(request):
+    renderer = select_renderer(request)
+    paginator = CustomPagination()
+    devices = apply_delta(paginator, filter_queryset(Device.objects.all(), request), request)
+    devices = fast_device_list.values(devices)
+
+    if wants_stream(request):
+        rows = await paginator.astream_page(devices, request, STREAM_CHUNK_SIZE)
+        return astreaming_response(
+            aserialize_chunks(rows, fast_device_list, STREAM_CHUNK_SIZE),
+            lambda: (paginator.get_meta(), None),
+            renderer,
+        )
+
+    snapshot = await snapshot_engine.aget() if list_supported(request) else None
+    if snapshot is not None:
+        result = snapshot.paginate(paginator, request)
+    else:
+        result = await paginator.apaginate_queryset(devices, request)
+
+    return json_response({
+        "meta": paginator.get_meta(),
+        "errors": None,
+        "resources": await fast_device_list.aserialize(result)
+    }, renderer=renderer)
+
+
+@require_POST
+@api_endpoint
+async def device_entities(request):
+    renderer = select_renderer(request)
+    ids = get_ids(request)
+    includes = get_includes(request)
+    serializer = with_includes(fast_device_detail, includes)
+
+    queryset = fast_device_detail.values(Device.objects.all())
+
+    if wants_stream(request):
+        return stream_entities(queryset, ids, serializer, renderer, includes)
+
+    snapshot = await snapshot_engine.aget()
+    if snapshot is not None:
+        resources, found_ids = snapshot.device_entities(ids, includes)
+        return json_response({
+            "meta": entity_meta(includes),
+            "resources": resources,
+            "errors": missing_errors(ids, found_ids)
+        }, renderer=renderer)
+
+    if fragment_cache.enabled:
+        fragments, found_ids = await adevice_fragments(ids, includes)
+        meta, errors = entity_meta(includes), missing_errors(ids, found_ids)
+        body = fragment_body(renderer, meta, fragments, errors)
+        if body is None:
+            return json_response(fragment_data(meta, fragments, errors), renderer=renderer)
+        return HttpResponse(body, content_type=getattr(renderer, "content_type", "application/json"))
+
+    resources, found_ids = await alookup(queryset, ids, serializer)
+
+    return json_response({
+        "meta": entity_meta(includes),
+        "resources": resources,
+        "errors": missing_errors(ids, found_ids)
+    }, renderer=renderer)
+
+
+@require_POST
+@api_endpoint
+async def online_state(request):
+    renderer = select_renderer(request)
+    ids = get_ids(request)
+
+    queryset = fast_device_state.values(DeviceState.objects.all())
+
+    if wants_stream(request):
+        return stream_entities(queryset, ids, fast_device_state, renderer)
+
+    snapshot = await snapshot_engine.aget()
+    if snapshot is not None:
+        resources, found_ids = snapshot.online_state(ids)
+        return json_response({
+            "meta": entity_meta(),
+            "resources": resources,
+            "errors": missing_errors(ids, found_ids)
+        }, renderer=renderer)
+
+    resources, found_ids = await alookup(queryset, ids, fast_device_state)
+
+    return json_response({
+        "meta": entity_meta(),
+        "resources": resources,
+        "errors": missing_errors(ids, found_ids)
+    }, renderer=renderer)
+
+
+def stream_entities(queryset, ids, serializer, renderer=None, includes=()):
+    found_ids = set()
+
+    async def rows():
+        async for chunk in afetch_chunks(queryset, ids):
+            for row in chunk:
+                found_ids.add(row[0])
+                yield row
+
+    return astreaming_response(
+        aserialize_chunks(rows(), serializer, STREAM_CHUNK_SIZE),
+        lambda: (entity_meta(includes), missing_errors(ids, found_ids)),
+        renderer,
+    )
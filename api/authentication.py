@@ -0,0 +1,53 @@
+from django.conf import settings
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from rest_framework.permissions import BasePermission
+
+from .lru import LRUCache
+
+
+TOKEN_CACHE_TTL = getattr(settings, "API_TOKEN_CACHE_TTL", 60)
+TOKEN_CACHE_SIZE = getattr(settings, "API_TOKEN_CACHE_SIZE", 10000)
+
+# Dogrulanmis token -> (user, AccessToken). Revoke/silme signal'la, suresi dolan token expires ile dusuyor
+token_cache = LRUCache(TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
+def get_bearer_token(request):
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2Authentication + process ici token cache. Cache'te olan token icin
+    AccessToken/Application/User sorgulari hic calismiyor. Entry omru en fazla
+    API_TOKEN_CACHE_TTL saniye ve token'in kendi expires zamanini gecmiyor.
+    """
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token:
+            cached = token_cache.get(token)
+            if cached is not None:
+                return cached
+        return self.authenticate_uncached(request, token)
+
+    def authenticate_uncached(self, request, token):
+        # Cache'e bakilmis ve bulunamamis token; async view'lar da miss'te bunu cagiriyor
+        result = super().authenticate(request)
+        if result is not None and token:
+            _, access_token = result
+            token_cache.set(token, result, expires_at=access_token.expires.timestamp())
+        return result
+
+
+class HasAccessToken(BasePermission):
+    """
+    Gecerli access token. client_credentials token'larinda user yok, IsAuthenticated reddediyor.
+    """
+
+    def has_permission(self, request, view):
+        return request.auth is not None
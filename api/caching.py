@@ -0,0 +1,117 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import TableVersion
+
+
+COUNT_CACHE_TIMEOUT = getattr(settings, "API_COUNT_CACHE_TIMEOUT", 300)
+
+# Versiyon trigger'lari (migration 0004) bu backend'lerde var
+VERSIONED_VENDORS = ("sqlite", "postgresql")
+
+
+def table_versions(models, request=None):
+    """
+    Tablolarin degisiklik sayaclari, `models` sirasinda; tek sorgu. Sayaclari veritabani
+    trigger'lari yazan transaction'in icinde artiriyor: save/delete, bulk_create, update(),
+    ham SQL ve baska process'lerin yazmalari dahil. Trigger olmayan backend'de None,
+    o zaman versiyonlu cache'ler (count, ETag, snapshot) kullanilmiyor.
+    `request` verilirse ayni istekte okunmus versiyonlar (ETag, count) tekrar okunmuyor.
+    """
+    tables = [model._meta.db_table for model in models]
+    known = getattr(request, "table_versions", {})
+    if connection.vendor not in VERSIONED_VENDORS:
+        return None
+    if any(table not in known for table in tables):
+        known = {**known, **dict(TableVersion.objects.filter(name__in=tables).values_list("name", "version"))}
+        missing = [table for table in tables if table not in known]
+        if missing:
+            TableVersion.objects.bulk_create(_new_versions(missing), ignore_conflicts=True)
+            known.update(TableVersion.objects.filter(name__in=missing).values_list("name", "version"))
+    return _ordered_versions(known, tables, request)
+
+
+async def atable_versions(models, request=None):
+    tables = [model._meta.db_table for model in models]
+    known = getattr(request, "table_versions", {})
+    if connection.vendor not in VERSIONED_VENDORS:
+        return None
+    if any(table not in known for table in tables):
+        queryset = TableVersion.objects.filter(name__in=tables).values_list("name", "version")
+        known = {**known, **{name: version async for name, version in queryset}}
+        missing = [table for table in tables if table not in known]
+        if missing:
+            await TableVersion.objects.abulk_create(_new_versions(missing), ignore_conflicts=True)
+            queryset = TableVersion.objects.filter(name__in=missing).values_list("name", "version")
+            known.update({name: version async for name, version in queryset})
+    return _ordered_versions(known, tables, request)
+
+
+def _new_versions(tables):
+    # Satir yoksa (flush, elle silme) yeniden; ilk deger zamandan, eski versiyonlarla cakismiyor
+    return [TableVersion(name=table, version=time.time_ns()) for table in tables]
+
+
+def _ordered_versions(known, tables, request):
+    if any(table not in known for table in tables):
+        return None
+    if request is not None:
+        request.table_versions = known
+    return tuple(known[table] for table in tables)
+
+
+def cached_count(queryset, depends_on=(), request=None):
+    """
+    COUNT(*) sonucunu model + filtre (SQL) bazinda cache'liyor.
+    Key'de tablo versiyonu oldugu icin yazma olunca eski sonuc kendiliginden gecersiz.
+    Versiyon sayimdan once okunuyor; arada gelen yazma sonucu eski key'e yaziyor, yenisine degil.
+    """
+    key = _count_key(queryset, table_versions((queryset.model, *depends_on), request))
+    if key is None:
+        return queryset.count()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+async def acached_count(queryset, depends_on=(), request=None):
+    key = _count_key(queryset, await atable_versions((queryset.model, *depends_on), request))
+    if key is None:
+        return await queryset.acount()
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def _count_key(queryset, versions):
+    if versions is None:
+        return None
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}|{params}".encode()).hexdigest()
+    return f"api:count:{queryset.model._meta.label_lower}:{':'.join(map(str, versions))}:{digest}"
+
+
+def approximate_count(queryset, depends_on=(), request=None):
+    """
+    Filtresiz sorgularda veritabaninin istatistiklerinden tahmini satir sayisi.
+    Filtreli sorgularda ya da desteklenmeyen backend'lerde cache'li kesin sayiya duser.
+    SQLite'ta istatistik yok (MAX(rowid) silmeden sonra fazla sayiyor), hep kesin sayi.
+    """
+    if queryset.query.where or connection.vendor != "postgresql":
+        return cached_count(queryset, depends_on, request)
+
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        row = cursor.fetchone()
+    if row and row[0] > 0:
+        return row[0]
+    return cached_count(queryset, depends_on, request)
@@ -0,0 +1,129 @@
+"""
+Accept-Encoding ile cevap sikistirma icin codec'ler. gzip her zaman var;
+brotli kuruluysa "br" de kaydediliyor. Yeni codec register_codec() ile ekleniyor.
+"""
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # opsiyonel bagimlilik
+    brotli = None
+
+
+COMPRESSION = getattr(settings, "API_COMPRESSION", {})
+
+# Bundan kucuk cevaplarda header + CPU kazanilan byte'tan pahali
+MIN_SIZE = COMPRESSION.get("MIN_SIZE", 1024)
+
+
+class Codec:
+    """
+    `compressor()` her cevap icin compress(chunk) / flush() metotlu bir nesne donuyor.
+    Stream edilen cevaplarda her chunk sonunda flush(sync=True) ile client beklemeden aciyor.
+    """
+
+    def __init__(self, name, compressor, decompress):
+        self.name = name
+        self.compressor = compressor
+        # Sunucu kullanmiyor; benchmark client tarafini olcmek icin
+        self.decompress = decompress
+
+    def compress(self, data):
+        stream = self.compressor()
+        return stream.compress(data) + stream.flush()
+
+    def compress_chunks(self, chunks):
+        stream = self.compressor()
+        for chunk in chunks:
+            data = stream.compress(chunk) + stream.flush(sync=True)
+            if data:
+                yield data
+        yield stream.flush()
+
+    async def acompress_chunks(self, chunks):
+        stream = self.compressor()
+        async for chunk in chunks:
+            data = stream.compress(chunk) + stream.flush(sync=True)
+            if data:
+                yield data
+        yield stream.flush()
+
+
+class ZlibStream:
+    def __init__(self, level, wbits):
+        self._stream = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self._stream.compress(data)
+
+    def flush(self, sync=False):
+        return self._stream.flush(zlib.Z_SYNC_FLUSH if sync else zlib.Z_FINISH)
+
+
+class BrotliStream:
+    def __init__(self, quality):
+        self._stream = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._stream.process(data)
+
+    def flush(self, sync=False):
+        return self._stream.flush() if sync else self._stream.finish()
+
+
+CODECS = {}
+
+
+def register_codec(codec):
+    CODECS[codec.name] = codec
+
+
+register_codec(Codec(
+    "gzip", lambda: ZlibStream(COMPRESSION.get("GZIP_LEVEL", 6), wbits=31), lambda data: zlib.decompress(data, 47),
+))
+if brotli is not None:
+    register_codec(Codec(
+        "br", lambda: BrotliStream(COMPRESSION.get("BROTLI_QUALITY", 4)), brotli.decompress,
+    ))
+
+
+def parse_accept_encoding(header):
+    """
+    "gzip;q=0.8, br" -> {"gzip": 0.8, "br": 1.0}
+    """
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(header):
+    """
+    Client'in kabul ettigi en yuksek q'lu codec; esitlikte sunucunun tercih sirasi
+    (API_COMPRESSION["CODECS"]). Uygun codec yoksa None (identity).
+    """
+    accepted = parse_accept_encoding(header)
+    if not accepted:
+        return None
+
+    preference = [name for name in COMPRESSION.get("CODECS", ["br", "gzip"]) if name in CODECS]
+    best, best_quality = None, 0.0
+    for name in preference:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = CODECS[name], quality
+    return best
@@ -0,0 +1,99 @@
+"""
+Liste endpoint'leri icin conditional GET. ETag tablo versiyonlarindan (api/caching.py,
+tek kucuk sorgu) ve istek parametrelerinden hesaplaniyor. If-None-Match tutarsa
+view hic calismadan 304 donuyor.
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.utils.cache import get_conditional_response
+
+from .caching import atable_versions, table_versions
+from .delta import CHANGED_SINCE_PARAM
+from .fql import FILTER_PARAM, has_relative_time, is_relative_time
+from .models import Device, DeviceState
+
+
+def etag_models(models, request):
+    """
+    ETag'in bagli oldugu modeller; ETag verilmeyecekse None.
+    `models` tuple ya da request alip tuple donen fonksiyon.
+    """
+    if relative_time(request):
+        return None
+    return models(request) if callable(models) else models
+
+
+def relative_time(request):
+    # now-1d gibi goreli zamanda sonuc versiyon degismeden de degisiyor
+    params = request.GET
+    return (
+        any(has_relative_time(value) for value in params.getlist(FILTER_PARAM))
+        or any(is_relative_time(value) for value in params.getlist(CHANGED_SINCE_PARAM))
+    )
+
+
+def list_etag(request, versions):
+    """
+    Weak ETag: meta'daki trace_id her cevapta farkli, veri ayni.
+    """
+    if versions is None:
+        return None
+    params = request.GET
+    key = "|".join([
+        request.path,
+        ":".join(map(str, versions)),
+        "&".join(f"{name}={value}" for name, values in sorted(params.lists()) for value in values),
+        request.META.get("HTTP_ACCEPT", ""),
+    ])
+    return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def device_list_models(request):
+    # changed_since DeviceState'e de bakiyor (api/delta.py)
+    if request.GET.get(CHANGED_SINCE_PARAM):
+        return (Device, DeviceState)
+    return (Device,)
+
+
+def conditional_list(models):
+    """
+    django.views.decorators.http.condition gibi. condition() etag_func'i async view'da da
+    senkron cagiriyor; versiyon sorgusu async view'da async calissin diye kendi decorator'umuz.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_inner(request, *args, **kwargs):
+                depends = etag_models(models, request)
+                etag = list_etag(request, await atable_versions(depends, request)) if depends else None
+                response = not_modified(request, etag)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return with_etag(request, response, etag)
+            return async_inner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            depends = etag_models(models, request)
+            etag = list_etag(request, table_versions(depends, request)) if depends else None
+            response = not_modified(request, etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return with_etag(request, response, etag)
+        return inner
+
+    return decorator
+
+
+def not_modified(request, etag):
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def with_etag(request, response, etag):
+    if etag and request.method in ("GET", "HEAD"):
+        response.headers.setdefault("ETag", etag)
+    return response
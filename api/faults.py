@@ -0,0 +1,189 @@
+"""
+Yuk testleri icin isimli hata / gecikme profilleri (RateLimitMiddleware uyguluyor).
+
+Profil bir dict:
+
+    {
+        "latency": {"lognormal": {"p50": 0.05, "p99": 0.8}, "max": 5},
+        "errors": {500: 0.01, 503: 0.005},    # status -> olasilik
+        "rate_limit": 0.02,                   # rastgele 429 olasiligi
+        "bursts": {"every": 60, "duration": 3},  # her 60 saniyenin ilk 3'unde hep 429
+    }
+
+Gecikme dagilimlari: {"fixed": s}, {"uniform": [min, max]}, {"lognormal": {"p50": .., "p99": ..}}
+(iki yuzdelikten mu / sigma hesaplaniyor). "max" hepsinde ust sinir.
+Profil istek basina ?fault_profile=<ad> ya da X-Fault-Profile header'i ile, ya da
+API_FAULTS["PROFILE"] ile butun isteklere seciliyor. Eski test_mode degerleri de birer profil.
+"""
+import math
+import random
+import re
+import time
+from statistics import NormalDist
+
+from django.conf import settings
+
+
+FAULTS = getattr(settings, "API_FAULTS", {})
+
+PROFILE_PARAM = "fault_profile"
+PROFILE_HEADER = "HTTP_X_FAULT_PROFILE"
+TEST_MODE_PARAM = "test_mode"
+# Global profili tek istekte kapatmak icin
+NO_PROFILE = "none"
+
+SLOW_RESPONSE_SECONDS = 5
+
+PERCENTILE = re.compile(r"^p(\d+(?:\.\d+)?)$")
+
+
+class FaultProfileError(ValueError):
+    pass
+
+
+def fixed_latency(seconds):
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    if not 0 <= low <= high:
+        raise FaultProfileError(f"Invalid uniform latency range: {low}, {high}")
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(percentiles):
+    """
+    Iki yuzdelikten ({"p50": 0.05, "p99": 0.8}) lognormal dagilim:
+    ln(x_p) = mu + sigma * z_p, iki denklemden mu ve sigma.
+    """
+    points = []
+    for key, seconds in percentiles.items():
+        match = PERCENTILE.match(key)
+        if match is None or not 0 < float(match.group(1)) < 100 or seconds <= 0:
+            raise FaultProfileError(f"Invalid latency percentile: {key}={seconds}")
+        points.append((NormalDist().inv_cdf(float(match.group(1)) / 100), math.log(seconds)))
+    if len(points) != 2:
+        raise FaultProfileError("Lognormal latency needs exactly two percentiles")
+
+    (z1, log1), (z2, log2) = sorted(points)
+    if z1 == z2 or log2 < log1:
+        raise FaultProfileError(f"Latency percentiles are not increasing: {percentiles}")
+    sigma = (log2 - log1) / (z2 - z1)
+    mu = log1 - sigma * z1
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+LATENCY_DISTRIBUTIONS = {
+    "fixed": fixed_latency,
+    "uniform": lambda bounds: uniform_latency(*bounds),
+    "lognormal": lognormal_latency,
+}
+
+
+def parse_latency(spec):
+    kinds = [kind for kind in spec if kind in LATENCY_DISTRIBUTIONS]
+    if len(kinds) != 1 or set(spec) - {kinds[0], "max"}:
+        raise FaultProfileError(f"Invalid latency spec: {spec}")
+    sample = LATENCY_DISTRIBUTIONS[kinds[0]](spec[kinds[0]])
+    limit = spec.get("max")
+    if limit is None:
+        return sample
+    return lambda rng: min(sample(rng), limit)
+
+
+class FaultProfile:
+    """
+    decide() istek basina (status, gecikme, retry_after) donuyor. status None ise
+    istek normal isleniyor; 429'da retry_after None ise middleware bucket'i bosaltiyor.
+    """
+
+    def __init__(self, name, latency=None, errors=None, rate_limit=0.0, bursts=None, seed=None, clock=time.monotonic):
+        self.name = name
+        self.latency = parse_latency(latency) if latency else None
+        self.errors = sorted((int(status), float(rate)) for status, rate in (errors or {}).items())
+        self.rate_limit = float(rate_limit)
+        if sum(rate for _, rate in self.errors) + self.rate_limit > 1:
+            raise FaultProfileError(f"Fault rates of profile {name!r} add up to more than 1")
+        if bursts and not 0 < bursts["duration"] <= bursts["every"]:
+            raise FaultProfileError(f"Invalid burst window: {bursts}")
+        self.bursts = bursts
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.started = clock()
+
+    @classmethod
+    def from_spec(cls, name, spec, seed=None):
+        unknown = set(spec) - {"latency", "errors", "rate_limit", "bursts"}
+        if unknown:
+            raise FaultProfileError(f"Unknown keys in fault profile {name!r}: {sorted(unknown)}")
+        return cls(name, seed=seed, **spec)
+
+    def burst_wait(self):
+        # Burst penceresindeyse pencerenin bitmesine kalan sure, degilse None
+        if not self.bursts:
+            return None
+        elapsed = (self.clock() - self.started) % self.bursts["every"]
+        if elapsed < self.bursts["duration"]:
+            return self.bursts["duration"] - elapsed
+        return None
+
+    def decide(self):
+        delay = self.latency(self.rng) if self.latency else 0
+
+        wait = self.burst_wait()
+        if wait is not None:
+            return 429, delay, wait
+
+        # Tek sayi cekiliyor; errors ve rate_limit olasiliklari ardisik araliklar
+        draw = self.rng.random()
+        for status, rate in self.errors:
+            if draw < rate:
+                return status, delay, None
+            draw -= rate
+        if draw < self.rate_limit:
+            return 429, delay, None
+        return None, delay, None
+
+
+BUILTIN_PROFILES = {
+    "rate_limit_hit": {"rate_limit": 1.0},
+    "server_error": {"errors": {500: 1.0}},
+    "slow_response": {"latency": {"fixed": SLOW_RESPONSE_SECONDS}},
+}
+
+
+def load_profiles(specs, seed=None):
+    return {
+        name: FaultProfile.from_spec(name, spec, seed=seed)
+        for name, spec in {**BUILTIN_PROFILES, **specs}.items()
+    }
+
+
+profiles = load_profiles(FAULTS.get("PROFILES", {}), seed=FAULTS.get("SEED"))
+default_profile = FAULTS.get("PROFILE") or None
+if default_profile is not None and default_profile not in profiles:
+    raise FaultProfileError(f"Unknown API_FAULTS PROFILE: {default_profile}")
+
+
+def register_profile(name, spec, seed=None):
+    profiles[name] = FaultProfile.from_spec(name, spec, seed=seed)
+    return profiles[name]
+
+
+def select_profile(request):
+    """
+    Istekteki ya da global profil. Bilinmeyen fault_profile FaultProfileError;
+    bilinmeyen test_mode eskisi gibi yok sayiliyor.
+    """
+    name = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if name is None:
+        test_mode = request.GET.get(TEST_MODE_PARAM)
+        if test_mode in BUILTIN_PROFILES:
+            return profiles[test_mode]
+        name = default_profile
+    if name is None or name == NO_PROFILE:
+        return None
+    profile = profiles.get(name)
+    if profile is None:
+        raise FaultProfileError(f"Unknown fault profile: {name}")
+    return profile
@@ -0,0 +1,172 @@
+"""
+Sentetik device filosu. seed_fleet komutu ve benchmark'lar kullaniyor.
+Ayni seed ile ayni veri uretiliyor; sadece zaman damgalari `now`a gore kayiyor.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import HostGroup, Device, DeviceState
+
+
+Membership = Device.groups.through
+
+PLATFORMS = {
+    "Windows": (["Windows 10 Pro", "Windows 11 Enterprise", "Windows Server 2019", "Windows Server 2022"], "DESKTOP"),
+    "Linux": (["Ubuntu 22.04", "Ubuntu 20.04", "RHEL 8.8", "Debian 12"], "SRV"),
+    "Mac": (["macOS 13.6", "macOS 14.2"], "MAC"),
+}
+# test_data.json'daki dagilima yakin
+PLATFORM_WEIGHTS = {"Windows": 13, "Linux": 8, "Mac": 4}
+STATUS_WEIGHTS = {"normal": 23, "reduced_functionality": 2}
+STATE_WEIGHTS = {"online": 17, "offline": 4, "unknown": 4}
+ENVIRONMENTS = ["PROD", "DEV", "TEST", "STAGE"]
+MANUFACTURERS = ["Dell Inc.", "HP", "Lenovo", "Apple Inc.", "VMware, Inc."]
+AGENT_VERSIONS = ["7.10.17706.0", "7.11.18110.0", "10.19.91655.4"]
+
+DISTRIBUTIONS = ["uniform", "zipf"]
+
+
+# Her BLOCK_SIZE device icin RNG yeniden seed'leniyor; sonuc chunk boyutundan bagimsiz
+BLOCK_SIZE = 1000
+
+
+def _picker(weights):
+    # random.choices her cagrida kumulatif agirligi tekrar hesaplamasin
+    values = list(weights)
+    cum_weights = list(accumulate(weights.values()))
+    return lambda rng: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+class FleetGenerator:
+    """
+    `devices` device, `groups` host group ve her device icin `groups_per_device`
+    (min, max) arasinda grup uyeligi uretiyor. `distribution='zipf'` ise ilk gruplar
+    cok kalabalik, sondakiler seyrek (gercek ortamdaki "All Servers" gibi gruplar).
+    """
+
+    def __init__(self, devices, groups=10, groups_per_device=(1, 3), distribution="uniform",
+                 seed=0, prefix="seed", now=None):
+        self.devices = devices
+        self.groups = groups
+        self.groups_per_device = groups_per_device
+        self.distribution = distribution
+        self.seed = seed
+        self.prefix = prefix
+        self.now = now or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def device_id(self, i):
+        return f"{self.prefix}_{i:08d}"
+
+    def group_id(self, i):
+        return f"{self.prefix}_group_{i:04d}"
+
+    def host_groups(self):
+        rng = random.Random(f"{self.seed}:groups")
+        return [
+            HostGroup(
+                id=self.group_id(i), group_type=rng.choice(["static", "dynamic"]),
+                name=f"{self.prefix.title()} Group {i:04d}", description=f"Synthetic group {i}",
+                assignment_rule=f"hostname:*-{rng.choice(ENVIRONMENTS)}-*",
+                created_by="seed@company.com", created_timestamp=self.now - timedelta(days=rng.randint(365, 730)),
+                modified_by="seed@company.com", modified_timestamp=self.now - timedelta(days=rng.randint(0, 364)),
+            )
+            for i in range(self.groups)
+        ]
+
+    def chunks(self, chunk_size):
+        """
+        (devices, states, memberships) listelerini chunk chunk uretiyor; 1M device
+        bellekte tek seferde tutulmuyor.
+        """
+        group_ids = [self.group_id(i) for i in range(self.groups)]
+        if self.distribution == "zipf":
+            group_weights = list(accumulate(1 / (rank + 1) for rank in range(self.groups)))
+        else:
+            group_weights = None
+
+        platform = _picker(PLATFORM_WEIGHTS)
+        status = _picker(STATUS_WEIGHTS)
+        state = _picker(STATE_WEIGHTS)
+
+        chunk_size = max(BLOCK_SIZE, chunk_size - chunk_size % BLOCK_SIZE)
+        for start in range(0, self.devices, chunk_size):
+            devices, states, memberships = [], [], []
+            for i in range(start, min(start + chunk_size, self.devices)):
+                if i % BLOCK_SIZE == 0:
+                    rng = random.Random(f"{self.seed}:{i // BLOCK_SIZE}")
+                device_id = self.device_id(i)
+                name = platform(rng)
+                os_versions, hostname_prefix = PLATFORMS[name]
+                first_seen = self.now - timedelta(seconds=rng.randint(86400, 730 * 86400))
+                last_seen = self.now - timedelta(seconds=rng.randint(0, 30 * 86400))
+                devices.append(Device(
+                    device_id=device_id, cid=f"cid_{rng.randint(1, 50):03d}",
+                    hostname=f"{hostname_prefix}-{rng.choice(ENVIRONMENTS)}-{i:07d}",
+                    external_ip=f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                    local_ip=f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+                    mac_address="-".join(f"{rng.randrange(256):02x}" for _ in range(6)),
+                    platform_name=name, os_version=rng.choice(os_versions),
+                    agent_version=rng.choice(AGENT_VERSIONS),
+                    first_seen=first_seen, last_seen=max(first_seen, last_seen), status=status(rng),
+                    system_manufacturer=rng.choice(MANUFACTURERS), serial_number=f"SN{i:010d}",
+                ))
+                states.append(DeviceState(device_id=device_id, state=state(rng)))
+
+                if group_ids:
+                    count = min(rng.randint(*self.groups_per_device), len(group_ids))
+                    if group_weights is None:
+                        chosen = rng.sample(group_ids, count)
+                    else:
+                        chosen = set()
+                        while len(chosen) < count:
+                            chosen.update(rng.choices(group_ids, cum_weights=group_weights, k=count - len(chosen)))
+                    memberships.extend(Membership(device_id=device_id, hostgroup_id=g) for g in chosen)
+
+            yield devices, states, memberships
+
+
+def seed_fleet(generator, chunk_size=10000, progress=None):
+    """
+    Filoyu chunk basina bir transaction ile yaziyor. bulk_create signal gondermiyor;
+    tablo versiyonlarini (count cache, ETag, snapshot) veritabani trigger'lari artiriyor.
+    """
+    HostGroup.objects.bulk_create(generator.host_groups())
+
+    created = 0
+    for devices, states, memberships in generator.chunks(chunk_size):
+        with transaction.atomic():
+            Device.objects.bulk_create(devices)
+            DeviceState.objects.bulk_create(states)
+            Membership.objects.bulk_create(memberships)
+        created += len(devices)
+        if progress:
+            progress(created)
+
+    return created
+
+
+def clear_fleet(prefix):
+    """
+    `prefix` ile uretilmis her seyi siliyor. ORM delete() 1M satiri tek tek
+    toplayip signal gonderecegi icin tablo basina tek DELETE. "prefix_" ile baslayan
+    id'ler ["prefix_", "prefix`") araliginda ('`' '_'dan sonraki karakter), index kullaniliyor.
+    Calisan sunucunun cache'leri tablo versiyonlarindan (trigger'lar) haberdar oluyor.
+    """
+    devices = (f"{prefix}_", f"{prefix}`")
+    groups = (f"{prefix}_group_", f"{prefix}_group`")
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model, column, bounds in (
+            (Membership, "device_id", devices),
+            (Membership, "hostgroup_id", groups),
+            (DeviceState, "device_id", devices),
+            (Device, "device_id", devices),
+            (HostGroup, "id", groups),
+        ):
+            cursor.execute(
+                f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(column)} >= %s AND {qn(column)} < %s", bounds,
+            )
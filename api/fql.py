@@ -0,0 +1,228 @@
+"""
+CrowdStrike FQL'in (Falcon Query Language) kucuk bir alt kumesi:
+
+    platform_name:'Windows'+status:'normal'+last_seen:>'now-1d'
+    hostname:*'*-PROD-*',platform_name:['Linux','Mac']
+
+`+` AND, `,` OR (AND once baglanir), parantez gruplama. Operatorler:
+`:` esit, `:!` esit degil, `:>` `:>=` `:<` `:<=` aralik, `:*` wildcard (sadece string).
+`['a','b']` liste (IN). Zaman degerleri ISO 8601 ya da `now`, `now-1d`, `now-12h` gibi.
+"""
+import re
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+FILTER_PARAM = "filter"
+
+STRING_FIELDS = {"platform_name", "status", "hostname"}
+DATETIME_FIELDS = {"last_seen"}
+
+OPERATORS = {
+    ">=": "gte",
+    "<=": "lte",
+    ">": "gt",
+    "<": "lt",
+}
+
+TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*')
+      | (?P<op>:!\*|:!|:>=|:<=|:>|:<|:\*|:)
+      | (?P<punct>[+,()\[\]])
+      | (?P<word>[^\s:+,()\[\]']+)
+    )
+""", re.VERBOSE)
+
+RELATIVE_TIME = re.compile(r"^now(?:(?P<sign>[+-])(?P<amount>\d+)(?P<unit>[smhdw]))?$")
+UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if not match:
+            raise ValidationError({FILTER_PARAM: [f"Unexpected character at {position}: {text[position:position + 10]!r}"]})
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = re.sub(r"\\(.)", r"\1", value[1:-1])
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """
+    expression := term (',' term)*
+    term       := factor ('+' factor)*
+    factor     := '(' expression ')' | field operator value
+    value      := literal | '[' literal (',' literal)* ']'
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+        # now / now-1d gibi goreli zaman kullanildi mi (api/etag.py)
+        self.relative_time = False
+
+    def parse(self):
+        if not self.tokens:
+            return Q()
+        q = self.expression()
+        if self.peek() is not None:
+            self.error(f"Unexpected {self.peek()[1]!r}")
+        return q
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token is None or (kind and token[0] != kind) or (value and token[1] != value):
+            self.error(f"Expected {value or kind}, got {token[1] if token else 'end of filter'!r}")
+        self.position += 1
+        return token[1]
+
+    def error(self, message):
+        raise ValidationError({FILTER_PARAM: [message]})
+
+    def expression(self):
+        q = self.term()
+        while self.peek() == ("punct", ","):
+            self.position += 1
+            q |= self.term()
+        return q
+
+    def term(self):
+        q = self.factor()
+        while self.peek() == ("punct", "+"):
+            self.position += 1
+            q &= self.factor()
+        return q
+
+    def factor(self):
+        if self.peek() == ("punct", "("):
+            self.position += 1
+            q = self.expression()
+            self.take("punct", ")")
+            return q
+
+        field = self.take("word")
+        if field not in STRING_FIELDS and field not in DATETIME_FIELDS:
+            self.error(f"Unknown field {field!r}, expected one of {sorted(STRING_FIELDS | DATETIME_FIELDS)}")
+        operator = self.take("op")
+
+        if self.peek() == ("punct", "["):
+            if operator not in (":", ":!"):
+                self.error(f"{operator} cannot be used with a list")
+            values = self.literal_list()
+            q = Q(**{f"{field}__in": [self.convert(field, value) for value in values]})
+            return ~q if operator == ":!" else q
+
+        return self.comparison(field, operator, self.literal())
+
+    def literal(self):
+        token = self.peek()
+        if token is None or token[0] not in ("string", "word"):
+            self.error(f"Expected a value, got {token[1] if token else 'end of filter'!r}")
+        self.position += 1
+        return token[1]
+
+    def literal_list(self):
+        self.take("punct", "[")
+        values = [self.literal()]
+        while self.peek() == ("punct", ","):
+            self.position += 1
+            values.append(self.literal())
+        self.take("punct", "]")
+        return values
+
+    def comparison(self, field, operator, raw):
+        if operator in (":*", ":!*"):
+            if field not in STRING_FIELDS:
+                self.error(f"Wildcard is only supported on {sorted(STRING_FIELDS)}")
+            q = wildcard(field, raw)
+            return ~q if operator == ":!*" else q
+
+        value = self.convert(field, raw)
+        if operator == ":":
+            return Q(**{field: value})
+        if operator == ":!":
+            return ~Q(**{field: value})
+        return Q(**{f"{field}__{OPERATORS[operator[1:]]}": value})
+
+    def convert(self, field, raw):
+        if field in DATETIME_FIELDS:
+            self.relative_time = self.relative_time or is_relative_time(raw)
+            return parse_time(raw)
+        return raw
+
+
+def is_relative_time(raw):
+    return RELATIVE_TIME.match(raw) is not None
+
+
+def parse_time(raw, param=FILTER_PARAM):
+    match = RELATIVE_TIME.match(raw)
+    if match:
+        value = timezone.now()
+        if match["amount"]:
+            delta = timedelta(**{UNITS[match["unit"]]: int(match["amount"])})
+            value = value - delta if match["sign"] == "-" else value + delta
+        return value
+
+    value = parse_datetime(raw)
+    if value is None:
+        raise ValidationError({param: [f"Invalid time {raw!r}, expected ISO 8601 or now-<n><s|m|h|d|w>"]})
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def wildcard(field, pattern):
+    # SQLite'ta regex Python fonksiyonuyla satir satir calisiyor; yaygin desenler LIKE'a cevriliyor
+    body = pattern.strip("*")
+    if "*" not in body:
+        if pattern.startswith("*") and pattern.endswith("*") and len(pattern) > 1:
+            return Q(**{f"{field}__contains": body})
+        if pattern.endswith("*"):
+            return Q(**{f"{field}__startswith": body})
+        if pattern.startswith("*"):
+            return Q(**{f"{field}__endswith": body})
+        return Q(**{field: body})
+    regex = "^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$"
+    return Q(**{f"{field}__regex": regex})
+
+
+def parse_filter(text):
+    """
+    FQL metnini Q nesnesine ceviriyor. Hatali filtrede 400 (ValidationError).
+    """
+    return Parser(text).parse()
+
+
+def has_relative_time(text):
+    """
+    Filtrede zaman alanina goreli deger (now-1d) var mi; string alanlardaki "now" sayilmiyor.
+    Hatali filtrede True: view zaten 400 donuyor, ETag hesaplanmiyor.
+    """
+    try:
+        parser = Parser(text)
+        parser.parse()
+    except ValidationError:
+        return True
+    return parser.relative_time
+
+
+def filter_queryset(queryset, request):
+    return queryset.filter(parse_filter(request.query_params.get(FILTER_PARAM, "")))
@@ -0,0 +1,236 @@
+"""
+/devices/entities/ icin device basina onceden render edilmis JSON parcalari.
+
+Cache key'i device_id, entry'de satirin versiyonu (modified_timestamp) var; istekte
+once sadece (device_id, modified_timestamp) okunuyor, versiyonu tutan device'lar
+icin serializer hic calismiyor. Cevap parcalar yan yana eklenerek yaziliyor.
+modified_timestamp update() ve uyelik degisikliklerinde de ilerliyor (migration 0005);
+signal'ler (api/signals.py) ayrica entry'leri silip bellegi bosaltiyor.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .includes import state_queryset, group_queryset
+from .lookup import achunk_size, chunk_size, chunked
+from .lru import LRUCache
+from .models import Device
+from .renderers import NDJSONRenderer
+from .serializers import fast_device_detail, fast_host_group
+from .streaming import encoder
+
+
+FRAGMENT_CACHE = getattr(settings, "API_FRAGMENT_CACHE", {})
+
+
+class FragmentCache:
+    """
+    device_id -> (versiyon, JSON parcasi, group id'leri). Entry sayisi ve toplam
+    parca boyutu (byte) sinirli LRU.
+    """
+
+    def __init__(self, max_entries, max_bytes, enabled=True):
+        self.enabled = enabled
+        self.entries = LRUCache(max_entries, maxbytes=max_bytes, sizeof=lambda entry: len(entry[1]))
+        # Serializer'in kolonlari + sonda versiyon; serialize_row fazla kolona bakmiyor
+        columns, _, _ = fast_device_detail.compile()
+        self.columns = [*columns, "modified_timestamp"]
+        self.version_index = len(columns)
+
+    def has_any(self, ids):
+        return any(device_id in self.entries for device_id in ids)
+
+    def lookup(self, versions):
+        """
+        (device_id, versiyon) listesinden cache'teki entry'ler ve eksik id'ler.
+        """
+        found = {}
+        missing = []
+        for device_id, version in versions:
+            entry = self.entries.get(device_id, check=lambda entry: entry[0] == version)
+            if entry is None:
+                missing.append(device_id)
+            else:
+                found[device_id] = entry
+        return found, missing
+
+    def store(self, rows, resources):
+        stored = {}
+        for row, resource in zip(rows, resources):
+            entry = (row[self.version_index], encoder.encode(resource).encode(), tuple(resource["groups"]))
+            self.entries.set(row[0], entry)
+            stored[row[0]] = entry
+        return stored
+
+    def delete(self, device_id):
+        self.entries.delete(device_id)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return {"enabled": self.enabled, **self.entries.stats()}
+
+
+fragment_cache = FragmentCache(
+    FRAGMENT_CACHE.get("MAX_ENTRIES", 100000),
+    FRAGMENT_CACHE.get("MAX_BYTES", 64 * 1024 * 1024),
+    enabled=FRAGMENT_CACHE.get("ENABLED", True),
+)
+
+
+def version_queryset(ids):
+    return Device.objects.filter(device_id__in=ids).values_list("device_id", "modified_timestamp")
+
+
+def device_fragments(ids, includes=()):
+    """
+    Istenen device'larin JSON parcalari (include'lar eklenmis, istekteki sirada) ve
+    bulunan id'ler. Lookup parcasi (api/lookup.py) basina: tamami cache'teyse 1 sorgu,
+    hicbiri yoksa versiyon sorgusu atlaniyor ve cache'siz yol kadar (2) sorgu; include basina +1.
+    """
+    fragments = []
+    found_ids = set()
+    for chunk in chunked(ids, chunk_size()):
+        chunk_fragments, chunk_found = chunk_device_fragments(chunk, includes)
+        fragments.extend(chunk_fragments)
+        found_ids.update(chunk_found)
+    return fragments, found_ids
+
+
+def chunk_device_fragments(ids, includes):
+    entries, missing = {}, ids
+    if fragment_cache.has_any(ids):
+        entries, missing = fragment_cache.lookup(version_queryset(ids))
+    else:
+        fragment_cache.entries.record_misses(len(ids))
+
+    if missing:
+        rows = list(Device.objects.filter(device_id__in=missing).values_list(*fragment_cache.columns))
+        entries.update(fragment_cache.store(rows, fast_device_detail.serialize(rows)))
+
+    entries = ordered(entries, ids)
+    states = groups = None
+    if "online_state" in includes:
+        states = dict(state_queryset([device_id for device_id, _ in entries]))
+    if "group_info" in includes:
+        groups = fast_host_group.serialize(list(group_queryset(group_ids(entries))))
+    return embed(entries, states, groups), {device_id for device_id, _ in entries}
+
+
+async def adevice_fragments(ids, includes=()):
+    fragments = []
+    found_ids = set()
+    for chunk in chunked(ids, await achunk_size()):
+        chunk_fragments, chunk_found = await achunk_device_fragments(chunk, includes)
+        fragments.extend(chunk_fragments)
+        found_ids.update(chunk_found)
+    return fragments, found_ids
+
+
+async def achunk_device_fragments(ids, includes):
+    entries, missing = {}, ids
+    if fragment_cache.has_any(ids):
+        entries, missing = fragment_cache.lookup([row async for row in version_queryset(ids)])
+    else:
+        fragment_cache.entries.record_misses(len(ids))
+
+    if missing:
+        rows = [row async for row in Device.objects.filter(device_id__in=missing).values_list(*fragment_cache.columns)]
+        entries.update(fragment_cache.store(rows, await fast_device_detail.aserialize(rows)))
+
+    entries = ordered(entries, ids)
+    states = groups = None
+    if "online_state" in includes:
+        states = {
+            device_id: state async for device_id, state in state_queryset([device_id for device_id, _ in entries])
+        }
+    if "group_info" in includes:
+        groups = await fast_host_group.aserialize([row async for row in group_queryset(group_ids(entries))])
+    return embed(entries, states, groups), {device_id for device_id, _ in entries}
+
+
+def ordered(entries, ids):
+    # Istekteki sira (ids tekrarsiz), cache'siz yolla ayni
+    return [(device_id, entries[device_id]) for device_id in ids if device_id in entries]
+
+
+def group_ids(entries):
+    return {group_id for _, (_, _, groups) in entries for group_id in groups}
+
+
+def embed(entries, states, groups):
+    # IncludeSerializer.embed ile ayni alanlar ve sira, parcanin kapanan '}'inin onune ekleniyor
+    if states is None and groups is None:
+        return [fragment for _, (_, fragment, _) in entries]
+
+    if groups is not None:
+        groups = {group["id"]: encoder.encode(group).encode() for group in groups}
+    fragments = []
+    for device_id, (_, fragment, device_groups) in entries:
+        extra = []
+        if states is not None:
+            extra.append(b'"online_state":' + encoder.encode(states.get(device_id)).encode())
+        if groups is not None:
+            # Parca okunduktan sonra silinen group'lar atlaniyor
+            members = (groups.get(group_id) for group_id in device_groups)
+            extra.append(b'"group_info":[' + b",".join(group for group in members if group is not None) + b"]")
+        fragments.append(fragment[:-1] + b"," + b",".join(extra) + b"}")
+    return fragments
+
+
+def fragment_body(renderer, meta, fragments, errors):
+    """
+    JSON ve NDJSON'da cevap parcalardan dogrudan yaziliyor. Diger renderer'lar
+    (msgpack, browsable API) icin None; onlar fragment_data() ile normal render ediliyor.
+    """
+    if isinstance(renderer, NDJSONRenderer):
+        return b"".join(fragment + b"\n" for fragment in fragments) + renderer.encode({"meta": meta, "errors": errors})
+    if renderer is None or type(renderer) is JSONRenderer:
+        return (
+            b'{"meta":' + encoder.encode(meta).encode()
+            + b',"resources":[' + b",".join(fragments)
+            + b'],"errors":' + encoder.encode(errors).encode() + b"}"
+        )
+    return None
+
+
+def fragment_data(meta, fragments, errors):
+    return {"meta": meta, "resources": [json.loads(fragment) for fragment in fragments], "errors": errors}
+
+
+class FragmentResponse(Response):
+    """
+    DRF Response; JSON/NDJSON'da govde parcalardan yaziliyor, renderer calismiyor.
+    `data` sadece diger renderer'lar ve testler icin, ihtiyac olunca parcalardan parse ediliyor.
+    """
+
+    def __init__(self, meta, fragments, errors):
+        self.meta = meta
+        self.fragments = fragments
+        self.errors = errors
+        self._data = None
+        super().__init__()
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = fragment_data(self.meta, self.fragments, self.errors)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        # Response.__init__ data=None atiyor
+        if value is not None:
+            self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, "accepted_renderer", None)
+        body = fragment_body(renderer, self.meta, self.fragments, self.errors)
+        if body is None:
+            return super().rendered_content
+        self["Content-Type"] = renderer.content_type if isinstance(renderer, NDJSONRenderer) else renderer.media_type
+        return body
@@ -0,0 +1,91 @@
+"""
+/devices/entities/?include=online_state,group_info
+
+Client'in ayri online-state istegi ve group join'i yerine state ve group
+objeleri device'in icine gomuluyor. Batch boyutundan bagimsiz include basina
+tek sorgu (stream modunda chunk basina).
+"""
+from rest_framework.exceptions import ValidationError
+
+from .models import HostGroup, DeviceState
+from .serializers import fast_host_group
+
+
+INCLUDE_PARAM = "include"
+INCLUDES = ("online_state", "group_info")
+
+
+def get_includes(request):
+    raw = request.query_params.get(INCLUDE_PARAM, "")
+    includes = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in includes if name not in INCLUDES]
+    if unknown:
+        raise ValidationError({INCLUDE_PARAM: [f"Must be any of: {', '.join(INCLUDES)}"]})
+    # Istenen sirayla, tekrarsiz
+    return tuple(dict.fromkeys(includes))
+
+
+def state_queryset(device_ids):
+    return DeviceState.objects.filter(device_id__in=device_ids).values_list("device_id", "state")
+
+
+def group_queryset(group_ids):
+    return fast_host_group.values(HostGroup.objects.filter(pk__in=group_ids))
+
+
+class IncludeSerializer:
+    """
+    CompiledSerializer'i sarip ayni arayuzu (serialize / aserialize) veriyor,
+    stream ve async yollari degismeden kullanabiliyor.
+    """
+
+    def __init__(self, serializer, includes):
+        self.serializer = serializer
+        self.includes = includes
+
+    def state_queryset(self, resources):
+        return state_queryset([resource["device_id"] for resource in resources])
+
+    def group_queryset(self, resources):
+        return group_queryset({group_id for resource in resources for group_id in resource["groups"]})
+
+    def serialize(self, rows):
+        resources = self.serializer.serialize(rows)
+        if not resources:
+            return resources
+
+        states = groups = None
+        if "online_state" in self.includes:
+            states = dict(self.state_queryset(resources))
+        if "group_info" in self.includes:
+            groups = fast_host_group.serialize(list(self.group_queryset(resources)))
+        return self.embed(resources, states, groups)
+
+    async def aserialize(self, rows):
+        resources = await self.serializer.aserialize(rows)
+        if not resources:
+            return resources
+
+        states = groups = None
+        if "online_state" in self.includes:
+            states = {device_id: state async for device_id, state in self.state_queryset(resources)}
+        if "group_info" in self.includes:
+            groups = await fast_host_group.aserialize([row async for row in self.group_queryset(resources)])
+        return self.embed(resources, states, groups)
+
+    def embed(self, resources, states, groups):
+        if groups is not None:
+            groups = {group["id"]: group for group in groups}
+        for resource in resources:
+            if states is not None:
+                resource["online_state"] = states.get(resource["device_id"])
+            if groups is not None:
+                # groups zaten HostGroup.Meta.ordering (isim) sirasinda
+                resource["group_info"] = [groups[group_id] for group_id in resource["groups"]]
+        return resources
+
+
+def with_includes(serializer, includes):
+    if not includes:
+        return serializer
+    return IncludeSerializer(serializer, includes)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe, boyut ve sure sinirli LRU cache. Process ici; worker'lar arasinda paylasilmiyor.
+    Her entry kendi son kullanma zamanini (epoch saniye) tasiyabiliyor.
+    maxbytes verilirse entry sayisinin yaninda toplam boyut da sinirli; boyut sizeof(value).
+    """
+
+    def __init__(self, maxsize, ttl=None, maxbytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def get(self, key, check=None):
+        # check(value) False donerse (ornegin versiyon tutmuyor) entry siliniyor, miss sayiliyor
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if check is not None and not check(value):
+                del self._data[key]
+                self.bytes -= size
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if self.ttl is not None:
+            ttl_expiry = time.time() + self.ttl
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            # Tek basina butceyi asan entry butun cache'i bosaltmasin
+            self.delete(key)
+            return
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def record_misses(self, count):
+        # Cache'e hic bakilmadan atlanan lookup'lar da (ornegin toplu istekte hicbiri yoksa) miss
+        with self._lock:
+            self.misses += count
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def peek(self, key):
+        # get() gibi ama istatistige ve LRU sirasina dokunmuyor; suresi dolmus entry None
+        entry = self._data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            return None
+        return entry[0]
+
+    def __contains__(self, key):
+        # Istatistige ve LRU sirasina dokunmuyor
+        return key in self._data
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+            if self.maxbytes is not None:
+                stats["bytes"] = self.bytes
+                stats["maxbytes"] = self.maxbytes
+            return stats
@@ -0,0 +1,245 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api import views
+from api.compression import CODECS
+from api.fleet import FleetGenerator, seed_fleet
+from api.fragments import fragment_cache
+from api.lookup import chunk_size, lookup, variable_limit
+from api.models import HostGroup, Device, DeviceState
+from api.serializers import (
+    DeviceDetailSerializer, DeviceStateSerializer, fast_device_detail, fast_device_state,
+)
+from api.snapshot import engine as snapshot_engine
+
+
+def ensure_fleet(size):
+    """
+    Benchmark icin en az `size` device + state olmasini sagliyor.
+    Komut her seyi transaction icinde calistirip sonunda rollback ediyor.
+    """
+    existing = Device.objects.count()
+    if existing < size:
+        seed_fleet(FleetGenerator(size - existing, groups=5, groups_per_device=(1, 1), prefix="bench"))
+    return list(Device.objects.values_list('device_id', flat=True)[:size])
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Endpoint benchmark\'lari (uretilen veri sonunda rollback edilir)'
+
+    targets = ['online_state', 'serializers', 'compression', 'snapshot', 'lookup']
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=self.targets)
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 5000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        with transaction.atomic():
+            ids = ensure_fleet(max(sizes))
+            getattr(self, f"bench_{options['target']}")(ids, sizes, options['repeat'])
+            transaction.set_rollback(True)
+
+    def bench_online_state(self, ids, sizes, repeat):
+        factory = APIRequestFactory()
+
+        self.stdout.write(f"{'batch':>8} {'p50 ms':>10} {'p95 ms':>10} {'us/id':>10} {'queries':>8}")
+        for size in sizes:
+            batch = ids[:size]
+            samples = []
+            queries = 0
+            for _ in range(repeat):
+                request = factory.post('/devices/entities/online-state/', {"ids": batch}, format='json')
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = views.online_state(request)
+                    response.render()
+                    samples.append(time.perf_counter() - start)
+                queries = len(ctx.captured_queries)
+
+            p50 = statistics.median(samples)
+            self.stdout.write(
+                f"{size:>8} {p50 * 1000:>10.2f} {percentile(samples, 95) * 1000:>10.2f} "
+                f"{p50 / size * 1e6:>10.2f} {queries:>8}"
+            )
+
+    def bench_serializers(self, ids, sizes, repeat):
+        def drf_detail(batch):
+            queryset = Device.objects.filter(device_id__in=batch).prefetch_related(
+                Prefetch('groups', queryset=HostGroup.objects.only('id'))
+            )
+            return DeviceDetailSerializer(queryset, many=True).data
+
+        def fast_detail(batch):
+            return fast_device_detail.serialize(
+                list(fast_device_detail.values(Device.objects.filter(device_id__in=batch)))
+            )
+
+        def drf_state(batch):
+            return DeviceStateSerializer(DeviceState.objects.filter(device_id__in=batch), many=True).data
+
+        def fast_state(batch):
+            return fast_device_state.serialize(
+                list(fast_device_state.values(DeviceState.objects.filter(device_id__in=batch)))
+            )
+
+        cases = [
+            ('device', drf_detail, fast_detail),
+            ('state', drf_state, fast_state),
+        ]
+        self.stdout.write(f"{'resource':>10} {'rows':>8} {'drf rows/s':>12} {'fast rows/s':>12} {'speedup':>8}")
+        for name, drf, fast in cases:
+            for size in sizes:
+                batch = ids[:size]
+                drf_time = min(self._timed(drf, batch) for _ in range(repeat))
+                fast_time = min(self._timed(fast, batch) for _ in range(repeat))
+                self.stdout.write(
+                    f"{name:>10} {size:>8} {size / drf_time:>12.0f} {size / fast_time:>12.0f} "
+                    f"{drf_time / fast_time:>7.1f}x"
+                )
+
+    def bench_compression(self, ids, sizes, repeat):
+        """
+        /devices/entities/?include=... cevabi icin: kablodaki byte, sunucunun sikistirma
+        CPU'su ve client'in acip JSON parse etme CPU'su (identity = sadece parse).
+        """
+        factory = APIRequestFactory()
+
+        self.stdout.write(
+            f"{'batch':>8} {'codec':>8} {'bytes':>12} {'ratio':>7} {'server ms':>10} {'client ms':>10}"
+        )
+        for size in sizes:
+            request = factory.post(
+                '/devices/entities/?include=online_state,group_info', {"ids": ids[:size]}, format='json',
+            )
+            response = views.device_entities(request)
+            body = response.render().content
+
+            parse_time = min(self._cpu_timed(lambda: json.loads(body)) for _ in range(repeat))
+            self.stdout.write(
+                f"{size:>8} {'identity':>8} {len(body):>12} {1:>7.1f} {0:>10.2f} {parse_time * 1000:>10.2f}"
+            )
+            for codec in CODECS.values():
+                compressed = codec.compress(body)
+                server_time = min(self._cpu_timed(lambda: codec.compress(body)) for _ in range(repeat))
+                client_time = min(
+                    self._cpu_timed(lambda: json.loads(codec.decompress(compressed))) for _ in range(repeat)
+                )
+                self.stdout.write(
+                    f"{size:>8} {codec.name:>8} {len(compressed):>12} {len(body) / len(compressed):>7.1f} "
+                    f"{server_time * 1000:>10.2f} {client_time * 1000:>10.2f}"
+                )
+
+    def bench_snapshot(self, ids, sizes, repeat):
+        """
+        Ayni istekler ORM yolundan ve bellek ici snapshot'tan (api/snapshot.py).
+        Fragment cache kapali, ORM tarafi her istekte serializer'dan geciyor.
+        """
+        factory = APIRequestFactory()
+        fragment_enabled, snapshot_enabled = fragment_cache.enabled, snapshot_engine.enabled
+        fragment_cache.enabled = False
+
+        def device_list(size):
+            request = factory.get('/devices/devices/', {"limit": min(size, 500), "after": "", "total": "none"})
+            return views.device_list(request)
+
+        def entities(size):
+            request = factory.post(
+                '/devices/entities/?include=online_state,group_info', {"ids": ids[:size]}, format='json',
+            )
+            return views.device_entities(request)
+
+        def online_state(size):
+            request = factory.post('/devices/entities/online-state/', {"ids": ids[:size]}, format='json')
+            return views.online_state(request)
+
+        try:
+            snapshot_engine.reset()
+            snapshot_engine.enabled = True
+            snapshot_engine.load()
+            stats = snapshot_engine.stats()
+            self.stdout.write(f"snapshot: {stats['devices']} device, {stats['load_time'] * 1000:.0f} ms yukleme\n")
+
+            self.stdout.write(
+                f"{'endpoint':>14} {'size':>8} {'orm p50 ms':>11} {'snap p50 ms':>12} {'speedup':>8} {'queries':>8}"
+            )
+            for name, func in [('devices', device_list), ('entities', entities), ('online_state', online_state)]:
+                for size in sizes:
+                    timings = {}
+                    for enabled in (False, True):
+                        snapshot_engine.enabled = enabled
+                        samples = []
+                        for _ in range(repeat):
+                            with CaptureQueriesContext(connection) as ctx:
+                                start = time.perf_counter()
+                                func(size).render()
+                                samples.append(time.perf_counter() - start)
+                        timings[enabled] = (statistics.median(samples), len(ctx.captured_queries))
+                    orm, snap = timings[False], timings[True]
+                    self.stdout.write(
+                        f"{name:>14} {size:>8} {orm[0] * 1000:>11.2f} {snap[0] * 1000:>12.2f} "
+                        f"{orm[0] / snap[0]:>7.1f}x {orm[1]:>3} / {snap[1]}"
+                    )
+        finally:
+            fragment_cache.enabled = fragment_enabled
+            snapshot_engine.enabled = snapshot_enabled
+            snapshot_engine.reset()
+
+    def bench_lookup(self, ids, sizes, repeat):
+        """
+        Device detay lookup'i: tek IN sorgusu (eski yol) ve parca boyutlarina gore
+        parcali lookup (api/lookup.py). Istekteki id'lerin yarisi tekrar, %10'u olmayan id.
+        lookup() dogrudan cagriliyor: API_MAX_IDS_PER_REQUEST'ten buyuk boyutlar (50k)
+        endpoint'te 400 donuyor, burada sadece sorgu stratejisini karsilastirmak icin.
+        """
+        self.stdout.write(f"parametre siniri: {variable_limit()}, varsayilan parca: {chunk_size()}\n")
+        queryset = fast_device_detail.values(Device.objects.all())
+
+        def single(batch):
+            rows = list(fast_device_detail.values(Device.objects.filter(device_id__in=batch)))
+            return fast_device_detail.serialize(rows)
+
+        self.stdout.write(f"{'ids':>8} {'chunk':>8} {'p50 ms':>10} {'queries':>8}")
+        for size in sizes:
+            found = ids[:size - size // 10]
+            batch = list(dict.fromkeys(found[::-1] + found[:size // 2] + [f"missing-{i}" for i in range(size // 10)]))
+            cases = [("single", lambda: single(batch))] + [
+                (str(chunk), lambda chunk=chunk: lookup(queryset, batch, fast_device_detail, chunk))
+                for chunk in sorted({500, 1000, chunk_size(), 20000})
+            ]
+            for name, func in cases:
+                samples = []
+                try:
+                    for _ in range(repeat):
+                        with CaptureQueriesContext(connection) as ctx:
+                            samples.append(self._timed(lambda _: func(), None))
+                except Exception as exc:
+                    self.stdout.write(f"{size:>8} {name:>8}  hata: {exc}")
+                    continue
+                self.stdout.write(
+                    f"{size:>8} {name:>8} {statistics.median(samples) * 1000:>10.2f} {len(ctx.captured_queries):>8}"
+                )
+
+    def _cpu_timed(self, func):
+        start = time.process_time()
+        func()
+        return time.process_time() - start
+
+    def _timed(self, func, batch):
+        start = time.perf_counter()
+        func(batch)
+        return time.perf_counter() - start
@@ -0,0 +1,335 @@
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.management.commands.benchmark import percentile
+from api.models import Device
+from api.ratelimit import limiter
+
+
+class InProcessTransport:
+    """
+    Istekleri django.test.Client ile middleware dahil tam stack'ten geciriyor.
+    Her thread'in kendi Client'i ve DB baglantisi var; sorgu sayisi da buradan.
+    View'da cikan exception 500 cevabi oluyor, HTTP modundaki gibi.
+    """
+
+    name = "inprocess"
+
+    def __init__(self, token=None):
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        self.local = threading.local()
+
+    def request(self, method, path, params=None, body=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client(raise_request_exception=False, **self.headers)
+
+        query = f"?{urlencode(params)}" if params else ""
+        with CaptureQueriesContext(connection) as ctx:
+            if method == "POST":
+                response = client.post(f"{path}{query}", json.dumps(body), content_type="application/json")
+            else:
+                response = client.get(f"{path}{query}")
+            content = response.content
+        return response.status_code, content, len(ctx.captured_queries)
+
+    def close(self):
+        connection.close()
+
+
+class HTTPTransport:
+    """
+    Calisan bir sunucuya (runserver / uvicorn) keep-alive HTTP. Sorgu sayisi bilinmiyor.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url, token=None):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.local = threading.local()
+
+    def request(self, method, path, params=None, body=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+        query = f"?{urlencode(params)}" if params else ""
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            conn.request(method, f"{path}{query}", payload, headers)
+            response = conn.getresponse()
+            content = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            raise
+        return response.status, content, None
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+
+
+def fetch_token(base_url, client_id, client_secret):
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    conn.request(
+        "POST", "/oauth2/token/",
+        urlencode({"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret}),
+        {"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    response = conn.getresponse()
+    if response.status != 200:
+        raise CommandError(f"Token alinamadi: {response.status}")
+    return json.loads(response.read())["access_token"]
+
+
+class DevicesScenario:
+    # Her worker cursor ile sayfalari sirayla geziyor, son sayfadan sonra basa donuyor
+    path = "/devices/devices/"
+
+    def __init__(self, size, device_ids):
+        self.size = size
+
+    def new_state(self):
+        return {"after": ""}
+
+    def next_request(self, state, rng):
+        return "GET", self.path, {"limit": self.size, "after": state["after"], "total": "none"}, None
+
+    def on_response(self, state, content):
+        next_cursor = json.loads(content)["meta"]["pagination"].get("next")
+        state["after"] = next_cursor or ""
+
+
+class EntitiesScenario:
+    path = "/devices/entities/"
+
+    def __init__(self, size, device_ids):
+        if size > len(device_ids):
+            raise CommandError(f"batch {size} icin yeterli device yok ({len(device_ids)}), once seed_fleet calistir")
+        self.size = size
+        self.device_ids = device_ids
+
+    def new_state(self):
+        return {}
+
+    def next_request(self, state, rng):
+        return "POST", self.path, None, {"ids": rng.sample(self.device_ids, self.size)}
+
+    def on_response(self, state, content):
+        pass
+
+
+class OnlineStateScenario(EntitiesScenario):
+    path = "/devices/entities/online-state/"
+
+
+SCENARIOS = {
+    "devices": DevicesScenario,
+    "entities": EntitiesScenario,
+    "online_state": OnlineStateScenario,
+}
+
+
+def send(transport, scenario, state, rng):
+    # (latency, status, queries); baglanti hatasi "error" status'u, run durmuyor
+    method, path, params, body = scenario.next_request(state, rng)
+    start = time.perf_counter()
+    try:
+        status, content, queries = transport.request(method, path, params, body)
+    except (http.client.HTTPException, OSError):
+        status, content, queries = "error", None, None
+    elapsed = time.perf_counter() - start
+    if status == 200:
+        scenario.on_response(state, content)
+    return elapsed, status, queries
+
+
+def run_scenario(transport, scenario, concurrency, requests, warmup, seed):
+    """
+    `concurrency` thread toplam `requests` istek atiyor. Her istek icin
+    (latency, status, queries) topluyor; warmup istekleri sadece status olarak sayiliyor.
+    """
+    lock = threading.Lock()
+    issued = 0
+    samples = []
+    warmup_statuses = Counter()
+
+    def worker(index):
+        nonlocal issued
+        rng = random.Random(f"{seed}:{index}")
+        state = scenario.new_state()
+        try:
+            for _ in range(warmup):
+                _, status, _ = send(transport, scenario, state, rng)
+                with lock:
+                    warmup_statuses[str(status)] += 1
+
+            while True:
+                with lock:
+                    if issued >= requests:
+                        return
+                    issued += 1
+
+                sample = send(transport, scenario, state, rng)
+                with lock:
+                    samples.append(sample)
+        finally:
+            transport.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - start
+    return samples, wall, warmup_statuses
+
+
+def summarize(samples, wall, warmup_statuses):
+    latencies = [elapsed for elapsed, _, _ in samples]
+    queries = [q for _, _, q in samples if q is not None]
+    statuses = Counter(str(status) for _, status, _ in samples)
+    return {
+        "requests": len(samples),
+        "statuses": dict(statuses),
+        "rps": round(len(samples) / wall, 1) if wall else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+        "warmup_statuses": dict(warmup_statuses),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Endpoint load testi: p50/p95/p99, istek/s, istek basina sorgu. Sonuclar JSON dosyasina yaziliyor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--url', help='Verilirse bu sunucuya HTTP ile, yoksa process icinde')
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+        parser.add_argument('--page-sizes', nargs='+', type=int, default=[100, 500],
+                            help='/devices/devices/ limit degerleri')
+        parser.add_argument('--batch-sizes', nargs='+', type=int, default=[10, 100, 1000],
+                            help='entities / online-state istek basina id sayisi')
+        parser.add_argument('--requests', type=int, default=200, help='Her senaryo icin olculen istek sayisi')
+        parser.add_argument('--warmup', type=int, default=2, help='Worker basina olculmeyen istek')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--token', help='Bearer token (HTTP modunda CLIENT_ID/CLIENT_SECRET env ile de alinabilir)')
+        parser.add_argument('--rate-limit', action='store_true',
+                            help='Process icinde rate limit acik kalsin (varsayilan: kapali)')
+        parser.add_argument('--output', default='loadtest-results.json')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            token = options['token']
+            if not token and os.getenv("CLIENT_ID"):
+                token = fetch_token(options['url'], os.getenv("CLIENT_ID"), os.getenv("CLIENT_SECRET"))
+            transport = HTTPTransport(options['url'], token)
+        else:
+            transport = InProcessTransport(options['token'])
+
+        if options['url']:
+            device_ids = self.remote_device_ids(transport, max(options['batch_sizes']))
+        else:
+            device_ids = list(Device.objects.values_list('device_id', flat=True))
+        if not device_ids:
+            raise CommandError('Veritabaninda device yok, once seed_fleet calistir')
+
+        rate_limit_was = limiter.enabled
+        if not options['url']:
+            limiter.enabled = options['rate_limit']
+
+        results = []
+        self.stdout.write(
+            f"{'target':>13} {'size':>6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'p99 ms':>9} {'q/req':>6}  statuses"
+        )
+        try:
+            for target in options['targets']:
+                sizes = options['page_sizes'] if target == 'devices' else options['batch_sizes']
+                for size in sizes:
+                    scenario = SCENARIOS[target](size, device_ids)
+                    for concurrency in options['concurrency']:
+                        samples, wall, warmup_statuses = run_scenario(
+                            transport, scenario, concurrency, options['requests'], options['warmup'], options['seed'],
+                        )
+                        result = {
+                            "target": target, "size": size, "concurrency": concurrency,
+                            **summarize(samples, wall, warmup_statuses),
+                        }
+                        results.append(result)
+                        self.write_row(result)
+        finally:
+            limiter.enabled = rate_limit_was
+
+        with open(options['output'], 'w') as f:
+            json.dump({
+                "created": datetime.now(timezone.utc).isoformat(),
+                "revision": git_revision(),
+                "transport": transport.name,
+                "url": options['url'],
+                "devices": len(device_ids) if transport.name == "inprocess" else None,
+                "rate_limit": options['rate_limit'] if transport.name == "inprocess" else None,
+                "results": results,
+            }, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Sonuclar: {options['output']}"))
+
+    def remote_device_ids(self, transport, needed):
+        # HTTP modunda id'leri API'den cursor ile topluyoruz
+        ids, after = [], ""
+        while len(ids) < needed:
+            status, content, _ = transport.request(
+                "GET", "/devices/devices/", {"limit": 500, "after": after, "total": "none"},
+            )
+            if status != 200:
+                raise CommandError(f"Device listesi alinamadi: {status}")
+            body = json.loads(content)
+            ids.extend(device["device_id"] for device in body["resources"])
+            after = body["meta"]["pagination"].get("next")
+            if not after:
+                break
+        transport.close()
+        return ids
+
+    def write_row(self, result):
+        queries = result['queries_per_request']
+        statuses = " ".join(f"{code}:{count}" for code, count in sorted(result['statuses'].items()))
+        self.stdout.write(
+            f"{result['target']:>13} {result['size']:>6} {result['concurrency']:>5} {result['rps']:>9.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{'-' if queries is None else f'{queries:.1f}':>6}  {statuses}"
+        )
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.fleet import DISTRIBUTIONS, FleetGenerator, clear_fleet, seed_fleet
+from api.models import Device
+
+
+class Command(BaseCommand):
+    help = 'Sentetik device filosu olusturur (ayni --seed ile ayni veri)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--groups-per-device', nargs=2, type=int, default=[1, 3], metavar=('MIN', 'MAX'))
+        parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform',
+                            help='zipf: ilk gruplar kalabalik, sondakiler seyrek')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed', help='device_id / group id on eki')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--clear', action='store_true', help='Ayni prefix ile uretilmis eski veriyi sil')
+
+    def handle(self, *args, **options):
+        low, high = options['groups_per_device']
+        if not 0 <= low <= high:
+            raise CommandError('--groups-per-device MIN MAX: 0 <= MIN <= MAX olmali')
+
+        prefix = options['prefix']
+        generator = FleetGenerator(
+            devices=options['devices'],
+            groups=options['groups'],
+            groups_per_device=(low, high),
+            distribution=options['distribution'],
+            seed=options['seed'],
+            prefix=prefix,
+        )
+
+        if options['clear']:
+            with transaction.atomic():
+                clear_fleet(prefix)
+        elif Device.objects.filter(device_id__startswith=f"{prefix}_").exists():
+            raise CommandError(f'"{prefix}_" ile baslayan device\'lar zaten var, --clear ile tekrar dene')
+
+        start = time.perf_counter()
+
+        def progress(created):
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{created:>10} device  {created / elapsed:>8.0f}/s", ending='\r')
+            self.stdout.flush()
+
+        created = seed_fleet(generator, options['chunk_size'], progress)
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} device, {options['groups']} group olusturuldu ({time.perf_counter() - start:.1f}s)"
+        ))
@@ -1,60 +1,155 @@
+import asyncio
 import time
+from http import HTTPStatus
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from . import compression
+from .faults import FaultProfileError, select_profile
+from .ratelimit import limiter, get_client_key, get_cached_client_key, lookup_client_key, retry_after_header
 
 
 class RateLimitMiddleware:
-    
-    remaining = 100 
-    reset_time = time.time() + 60  
-    
+    """
+    Client bazli token bucket rate limit. Her OAuth client'in (token yoksa IP'nin)
+    kendi bucket'i var, bir client digerlerini ac birakamiyor.
+    Secilen hata / gecikme profilini (api/faults.py) da uyguluyor.
+    Hem sync (WSGI) hem async (ASGI) calisiyor; async modda gecikme asyncio.sleep ile,
+    bekleyen istek worker'i bloklamiyor.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
     def __call__(self, request):
-        test_mode = request.GET.get('test_mode')
-        
-        # 1. Rate limit hit simülasyonu
-        if test_mode == 'rate_limit_hit':
-            RateLimitMiddleware.remaining = 0
-            RateLimitMiddleware.reset_time = time.time() + 5  
-            response = JsonResponse({
-                "meta": {"error": "Rate limit exceeded"},
-                "errors": ["Too many requests"]
-            }, status=429)
-            response["X-RateLimit-Remaining"] = "0"
-            response["X-RateLimit-RetryAfter"] = str(int(RateLimitMiddleware.reset_time))
-            return response
-        
-        # 2. Server error simülasyonu
-        if test_mode == 'server_error':
-            response = JsonResponse({
-                "meta": {"error": "Internal server error"},
-                "errors": ["Server temporarily unavailable"]
-            }, status=500)
-            response["X-RateLimit-Remaining"] = str(self.remaining)
-            response["X-RateLimit-RetryAfter"] = str(int(self.reset_time))
+        if self.async_mode:
+            return self.__acall__(request)
+
+        bucket = limiter.get_bucket(get_client_key(request))
+        response, delay = self._check(request, bucket)
+        if delay:
+            time.sleep(delay)
+        if response is not None:
             return response
-        
-        # 3. Slow response simülasyonu
-        if test_mode == 'slow_response':
-            time.sleep(5)
-        
 
-        self._check_reset()
-        
+        if not limiter.enabled:
+            return self.get_response(request)
+
+        allowed, remaining, wait = bucket.consume()
+        if not allowed:
+            return self._too_many_requests(wait)
 
         response = self.get_response(request)
-        
+        self._set_headers(response, remaining, wait)
+        return response
+
+    async def __acall__(self, request):
+        # Token cache'teyse thread'e gecmeden client'i buluyoruz
+        key = get_cached_client_key(request)
+        if key is None:
+            key = await sync_to_async(lookup_client_key)(request)
+        bucket = limiter.get_bucket(key)
+
+        response, delay = self._check(request, bucket)
+        if delay:
+            await asyncio.sleep(delay)
+        if response is not None:
+            return response
+
+        if not limiter.enabled:
+            return await self.get_response(request)
+
+        allowed, remaining, wait = bucket.consume()
+        if not allowed:
+            return self._too_many_requests(wait)
+
+        response = await self.get_response(request)
+        self._set_headers(response, remaining, wait)
+        return response
+
+    def _check(self, request, bucket):
+        """
+        Secilen profile gore (erken cevap, gecikme saniyesi) donuyor; gecikme cevaptan once.
+        """
+        try:
+            profile = select_profile(request)
+        except FaultProfileError as exc:
+            return JsonResponse({"meta": {"error": "Invalid fault profile"}, "errors": [str(exc)]}, status=400), 0
+        if profile is None:
+            return None, 0
+
+        status, delay, wait = profile.decide()
+        if status is None:
+            return None, delay
+
+        if status == 429:
+            # Burst disinda bucket gercekten bosaltiliyor, sonraki istekler de bekliyor
+            if wait is None:
+                wait = bucket.drain()
+            return self._too_many_requests(wait), delay
+
+        remaining, wait = bucket.peek()
+        response = JsonResponse({
+            "meta": {"error": HTTPStatus(status).phrase},
+            "errors": ["Server temporarily unavailable" if status >= 500 else HTTPStatus(status).description]
+        }, status=status)
+        self._set_headers(response, remaining, wait)
+        return response, delay
+
+    def _too_many_requests(self, wait):
+        response = JsonResponse({
+            "meta": {"error": "Rate limit exceeded"},
+            "errors": ["Too many requests"]
+        }, status=429)
+        self._set_headers(response, 0, wait)
+        return response
+
+    def _set_headers(self, response, remaining, wait):
+        response["X-RateLimit-Remaining"] = str(remaining)
+        response["X-RateLimit-RetryAfter"] = retry_after_header(wait)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Accept-Encoding'e gore cevabi sikistiriyor (api/compression.py'deki codec'ler).
+    MIN_SIZE'dan kucuk cevaplar oldugu gibi gidiyor; stream edilen cevaplar
+    chunk chunk sikistiriliyor, bellekte tamami tutulmuyor.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code in (204, 304):
+            return response
+        if not response.streaming and len(response.content) < compression.MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codec = compression.negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if codec is None:
+            return response
 
-        response["X-RateLimit-Remaining"] = str(self.remaining)
-        response["X-RateLimit-RetryAfter"] = str(int(self.reset_time))
-        
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = codec.acompress_chunks(response.streaming_content)
+            else:
+                response.streaming_content = codec.compress_chunks(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
 
-        RateLimitMiddleware.remaining = max(0, self.remaining - 1)
-        
+        # Govde degisti; strong ETag weak olmali (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codec.name
         return response
-    
-    def _check_reset(self):
-        if time.time() > RateLimitMiddleware.reset_time:
-            RateLimitMiddleware.remaining = 100
-            RateLimitMiddleware.reset_time = time.time() + 60
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['status', 'platform_name', 'last_seen'], name='device_status_platform_seen'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['platform_name', 'last_seen'], name='device_platform_seen'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['last_seen'], name='device_last_seen'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['hostname'], name='device_hostname'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_device_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='modified_timestamp',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='devicestate',
+            name='modified_timestamp',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
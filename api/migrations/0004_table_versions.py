@@ -0,0 +1,84 @@
+# Generated by Django 5.2 on 2026-10-17 04:08
+
+import time
+
+from django.db import migrations, models
+
+
+# Tablo -> artirilan versiyon. Group uyelikleri device detayinda gorunuyor, Device'in versiyonu
+VERSIONED_TABLES = {
+    "api_hostgroup": "api_hostgroup",
+    "api_device": "api_device",
+    "api_devicestate": "api_devicestate",
+    "api_device_groups": "api_device",
+}
+
+SQLITE_TRIGGER = """
+CREATE TRIGGER {table}_version_{event} AFTER {event} ON {table}
+BEGIN
+    UPDATE api_tableversion SET version = version + 1 WHERE name = '{version}';
+END
+"""
+
+POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION api_bump_table_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE api_tableversion SET version = version + 1 WHERE name = TG_ARGV[0];
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+POSTGRES_TRIGGER = """
+CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION api_bump_table_version('{version}')
+"""
+
+
+def create_triggers(apps, schema_editor):
+    # Ilk deger zamandan: veritabani sifirdan kurulunca eski ETag'lerle cakismiyor
+    TableVersion = apps.get_model("api", "TableVersion")
+    TableVersion.objects.bulk_create(
+        TableVersion(name=name, version=time.time_ns()) for name in set(VERSIONED_TABLES.values())
+    )
+
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for table, version in VERSIONED_TABLES.items():
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                schema_editor.execute(SQLITE_TRIGGER.format(table=table, event=event, version=version))
+    elif vendor == "postgresql":
+        schema_editor.execute(POSTGRES_FUNCTION)
+        for table, version in VERSIONED_TABLES.items():
+            schema_editor.execute(POSTGRES_TRIGGER.format(table=table, version=version))
+    # Diger backend'lerde trigger yok; api/caching.py versiyonlu cache'leri kullanmiyor
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in VERSIONED_TABLES:
+        if vendor == "sqlite":
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_version_{event}")
+        elif vendor == "postgresql":
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+    if vendor == "postgresql":
+        schema_editor.execute("DROP FUNCTION IF EXISTS api_bump_table_version()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_modified_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
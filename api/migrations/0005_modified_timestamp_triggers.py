@@ -0,0 +1,159 @@
+# Generated by Django 5.2 on 2026-10-17 09:40
+
+from django.db import migrations
+
+
+# auto_now sadece save() / bulk_create'te calisiyor. update(), ham SQL ve uyelik tablosuna
+# dogrudan yazmalar icin modified_timestamp'i trigger'lar ilerletiyor (delta sync, api/fragments.py).
+# Yeni deger eskisinden hep buyuk; ayni milisaniyedeki iki yazma ayni versiyonu almasin
+SQLITE_NEXT = (
+    "max(strftime('%Y-%m-%d %H:%M:%f', 'now'), "
+    "strftime('%Y-%m-%d %H:%M:%f', {column}, '+0.001 seconds')) || '000'"
+)
+
+# Statement baska kolon yazip modified_timestamp'i degistirmediyse (update(), ham SQL).
+# Sadece modified_timestamp'i yazan update() (elle geri alma, testler) dokunulmuyor.
+# Kolon listesi bu migration'daki model; yeni kolon eklenince trigger da yeniden kurulmali
+SQLITE_TOUCH = """
+CREATE TRIGGER {table}_touch AFTER UPDATE OF {columns} ON {table}
+WHEN NEW.modified_timestamp IS OLD.modified_timestamp
+BEGIN
+    UPDATE {table} SET modified_timestamp = {next} WHERE {pk} = NEW.{pk};
+END
+"""
+
+# Uyelik device detayinda (groups) gorunuyor
+SQLITE_MEMBERSHIP = """
+CREATE TRIGGER api_device_groups_touch_{event} AFTER {event} ON api_device_groups
+BEGIN
+    UPDATE api_device SET modified_timestamp = {next} WHERE device_id = {row}.device_id;
+END
+"""
+
+# Group adi device detayindaki groups sirasini degistiriyor
+SQLITE_GROUP_RENAME = """
+CREATE TRIGGER api_hostgroup_touch_devices AFTER UPDATE OF name ON api_hostgroup
+WHEN NEW.name IS NOT OLD.name
+BEGIN
+    UPDATE api_device SET modified_timestamp = {next}
+    WHERE device_id IN (SELECT device_id FROM api_device_groups WHERE hostgroup_id = NEW.id);
+END
+"""
+
+POSTGRES_NEXT = "GREATEST(clock_timestamp(), {column} + interval '1 microsecond')"
+
+POSTGRES_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION api_touch_modified_timestamp() RETURNS trigger AS $$
+BEGIN
+    IF NEW.modified_timestamp IS NOT DISTINCT FROM OLD.modified_timestamp THEN
+        NEW.modified_timestamp := {row_next};
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION api_touch_member_device() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE api_device SET modified_timestamp = {next} WHERE device_id = OLD.device_id;
+    ELSE
+        UPDATE api_device SET modified_timestamp = {next} WHERE device_id = NEW.device_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION api_touch_group_devices() RETURNS trigger AS $$
+BEGIN
+    UPDATE api_device SET modified_timestamp = {next}
+    WHERE device_id IN (SELECT device_id FROM api_device_groups WHERE hostgroup_id = NEW.id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+POSTGRES_TRIGGERS = """
+CREATE TRIGGER api_device_touch BEFORE UPDATE OF {device_columns} ON api_device
+FOR EACH ROW EXECUTE FUNCTION api_touch_modified_timestamp();
+
+CREATE TRIGGER api_devicestate_touch BEFORE UPDATE OF {state_columns} ON api_devicestate
+FOR EACH ROW EXECUTE FUNCTION api_touch_modified_timestamp();
+
+CREATE TRIGGER api_device_groups_touch AFTER INSERT OR DELETE ON api_device_groups
+FOR EACH ROW EXECUTE FUNCTION api_touch_member_device();
+
+CREATE TRIGGER api_hostgroup_touch_devices AFTER UPDATE OF name ON api_hostgroup
+FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name) EXECUTE FUNCTION api_touch_group_devices()
+"""
+
+SQLITE_TRIGGERS = [
+    "api_device_touch", "api_devicestate_touch",
+    "api_device_groups_touch_INSERT", "api_device_groups_touch_DELETE",
+    "api_hostgroup_touch_devices",
+]
+
+POSTGRES_TRIGGERS_ON = {
+    "api_device_touch": "api_device",
+    "api_devicestate_touch": "api_devicestate",
+    "api_device_groups_touch": "api_device_groups",
+    "api_hostgroup_touch_devices": "api_hostgroup",
+}
+
+
+def touched_columns(apps, model_name):
+    model = apps.get_model("api", model_name)
+    return ", ".join(
+        field.column for field in model._meta.concrete_fields if field.column != "modified_timestamp"
+    )
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    device_columns = touched_columns(apps, "Device")
+    state_columns = touched_columns(apps, "DeviceState")
+    if vendor == "sqlite":
+        next_value = SQLITE_NEXT.format(column="modified_timestamp")
+        statements = [
+            SQLITE_TOUCH.format(table="api_device", pk="device_id", columns=device_columns, next=next_value),
+            SQLITE_TOUCH.format(table="api_devicestate", pk="device_id", columns=state_columns, next=next_value),
+            SQLITE_MEMBERSHIP.format(event="INSERT", row="NEW", next=next_value),
+            SQLITE_MEMBERSHIP.format(event="DELETE", row="OLD", next=next_value),
+            SQLITE_GROUP_RENAME.format(next=next_value),
+        ]
+    elif vendor == "postgresql":
+        statements = [
+            POSTGRES_FUNCTIONS.format(
+                row_next=POSTGRES_NEXT.format(column="OLD.modified_timestamp"),
+                next=POSTGRES_NEXT.format(column="modified_timestamp"),
+            ),
+            POSTGRES_TRIGGERS.format(device_columns=device_columns, state_columns=state_columns),
+        ]
+    else:
+        # Diger backend'lerde update() modified_timestamp'i ilerletmiyor (migration 0004 gibi)
+        return
+    for sql in statements:
+        # params=None: SQLite backend'i %'leri parametre sanmasin
+        schema_editor.execute(sql, params=None)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for name in SQLITE_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    elif vendor == "postgresql":
+        for name, table in POSTGRES_TRIGGERS_ON.items():
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        for function in ("api_touch_modified_timestamp", "api_touch_member_device", "api_touch_group_devices"):
+            schema_editor.execute(f"DROP FUNCTION IF EXISTS {function}()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_table_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
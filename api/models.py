@@ -36,10 +36,22 @@ class Device(models.Model):
     status = models.CharField(max_length=20)
     system_manufacturer = models.CharField(max_length=100)
     serial_number = models.CharField(max_length=50)
+    # Delta sync (?changed_since=) ve fragment versiyonu icin; save() / bulk_create'te auto_now,
+    # update(), ham SQL ve group uyeligi degisikliklerinde trigger ilerletiyor (migration 0005)
+    modified_timestamp = models.DateTimeField(auto_now=True, db_index=True)
     
     
     groups = models.ManyToManyField(HostGroup, related_name='devices')
 
+    class Meta:
+        # ?filter= (api/fql.py) ile en sik kullanilan kombinasyonlar
+        indexes = [
+            models.Index(fields=['status', 'platform_name', 'last_seen'], name='device_status_platform_seen'),
+            models.Index(fields=['platform_name', 'last_seen'], name='device_platform_seen'),
+            models.Index(fields=['last_seen'], name='device_last_seen'),
+            models.Index(fields=['hostname'], name='device_hostname'),
+        ]
+
     def __str__(self):
         return self.hostname
 
@@ -53,6 +65,16 @@ class DeviceState(models.Model):
         related_name='online_state'
     )
     state = models.CharField(max_length=20)  # online, offline, unknown
+    modified_timestamp = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.device.hostname}: {self.state}"
+
+
+class TableVersion(models.Model):
+    # Tablo basina degisiklik sayaci; veritabani trigger'lari artiriyor (migration 0004, api/caching.py)
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
@@ -1,27 +1,191 @@
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from asgiref.sync import sync_to_async
+from .caching import cached_count, acached_count, approximate_count
+from .streaming import aiterate
+import base64
+import binascii
 import uuid
 
 
 class CustomPagination(LimitOffsetPagination):
     default_limit = 100
     max_limit = 500
-    
+    # Stream modunda sayfa bellekte tutulmadigi icin daha buyuk limit serbest
+    stream_max_limit = 10000
+
+    # ?after= verilirse offset yerine primary key uzerinden keyset (cursor) pagination
+    cursor_query_param = 'after'
+    cursor_field = 'pk'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # ?total=exact|approximate|none, toplami zaten bilen client her sayfada COUNT odemesin
+    total_query_param = 'total'
+    total_modes = ('exact', 'approximate', 'none')
+    default_total_mode = 'exact'
+    # Sorgu baska tablolara da bakiyorsa (subquery) count cache'i onlarin versiyonuna da bagli
+    count_depends_on = ()
+
+    # View'in meta'ya ekledigi alanlar (ornegin delta sync watermark'i)
+    extra_meta = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request)
+        self.count = self.get_total(queryset)
+        return self.finish_page(list(self.get_page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset, request):
+        # Async view'lar icin ayni akis, sorgular Django'nun async ORM'i ile
+        self.prepare(request)
+        self.count = await self.aget_total(queryset)
+        return self.finish_page([row async for row in self.get_page_queryset(queryset)])
+
+    def stream_page(self, queryset, request, chunk_size):
+        """
+        paginate_queryset'in stream hali: satirlari iterator(chunk_size) ile tek tek donuyor.
+        Meta (next) ancak satirlar bittikten sonra belli.
+        """
+        self.max_limit = self.stream_max_limit
+        # Parametre hatalari (limit, cursor, total) stream baslamadan burada patlamali
+        self.prepare(request)
+        self.count = self.get_total(queryset)
+        return self.iter_page(self.get_page_queryset(queryset), chunk_size)
+
+    async def astream_page(self, queryset, request, chunk_size):
+        self.max_limit = self.stream_max_limit
+        self.prepare(request)
+        self.count = await self.aget_total(queryset)
+        return self.aiter_page(self.get_page_queryset(queryset), chunk_size)
+
+    async def aiter_page(self, page, chunk_size):
+        last = None
+        self.has_next = False
+        index = 0
+        async for row in aiterate(page, chunk_size):
+            if index == self.limit:
+                self.has_next = True
+                break
+            index += 1
+            last = row
+            yield row
+        self.set_next_cursor(last)
+
+    def iter_page(self, page, chunk_size):
+        last = None
+        self.has_next = False
+        for index, row in enumerate(page.iterator(chunk_size=chunk_size)):
+            if index == self.limit:
+                self.has_next = True
+                break
+            last = row
+            yield row
+        self.set_next_cursor(last)
+
+    def prepare(self, request):
+        # Sadece parametreleri okuyor, veritabanina gitmiyor
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.total_mode = self.get_total_mode(request)
+
+        if self.cursor_query_param not in request.query_params:
+            self.cursor = None
+            self.offset = self.get_offset(request)
+            self.position = None
+        else:
+            self.cursor = request.query_params[self.cursor_query_param]
+            self.position = self.decode_cursor(self.cursor)
+
+    def get_page_queryset(self, queryset):
+        # Bir fazla satir cekip sonraki sayfa var mi diye bakiyoruz, toplama ihtiyac yok
+        if self.cursor is None:
+            return queryset[self.offset:self.offset + self.limit + 1]
+
+        queryset = queryset.order_by(self.cursor_field)
+        if self.position is not None:
+            queryset = queryset.filter(**{f"{self.cursor_field}__gt": self.position})
+
+        # OFFSET yok, derin sayfalar da ilk sayfa kadar ucuz
+        return queryset[:self.limit + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.set_next_cursor(rows[-1] if rows else None)
+        return rows
+
+    def set_next_cursor(self, last_row):
+        if self.cursor is not None:
+            self.next_cursor = self.encode_cursor(self.get_cursor_position(last_row)) if self.has_next else ""
+
+    def get_cursor_position(self, row):
+        # values_list() satirlarinda ilk kolon primary key (CompiledSerializer bunu garanti ediyor)
+        return row[0] if isinstance(row, tuple) else row.pk
+
+    def get_total_mode(self, request):
+        mode = request.query_params.get(self.total_query_param, self.default_total_mode)
+        if mode not in self.total_modes:
+            raise ValidationError({self.total_query_param: [f"Must be one of: {', '.join(self.total_modes)}"]})
+        return mode
+
+    def get_total(self, queryset):
+        if self.total_mode == 'none':
+            return None
+        if self.total_mode == 'approximate':
+            return approximate_count(queryset, self.count_depends_on, self.request)
+        return self.get_count(queryset)
+
+    async def aget_total(self, queryset):
+        if self.total_mode == 'none':
+            return None
+        if self.total_mode == 'approximate':
+            return await sync_to_async(approximate_count)(queryset, self.count_depends_on, self.request)
+        return await acached_count(queryset, self.count_depends_on, self.request)
+
+    def get_count(self, queryset):
+        return cached_count(queryset, self.count_depends_on, self.request)
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            return base64.b64decode(padded.encode(), altchars=b"-_", validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_pagination_meta(self):
+        if self.cursor is not None:
+            return {
+                "after": self.cursor,
+                "limit": self.limit,
+                "total": self.count,
+                "next": self.next_cursor
+            }
+
+        return {
+            "offset": self.offset,
+            "limit": self.limit,
+            "total": self.count,
+            "next": str(self.offset + self.limit) if self.has_next else ""
+        }
+
+    def get_meta(self):
+        meta = {
+            "query_time": 0.5, #Mock olduğu için sabit verdim
+            "pagination": self.get_pagination_meta(),
+            "trace_id": str(uuid.uuid4())
+        }
+        if self.extra_meta:
+            meta.update(self.extra_meta)
+        return meta
+
     def get_paginated_response(self, data):
-        next_offset = self.offset + self.limit
-        has_next = next_offset < self.count
-        
         return Response({
-            "meta": {
-                "query_time": 0.5, #Mock olduğu için sabit verdim
-                "pagination": {
-                    "offset": self.offset,
-                    "limit": self.limit,
-                    "total": self.count,
-                    "next": str(next_offset) if has_next else ""  
-                },
-                "trace_id": str(uuid.uuid4())
-            },
+            "meta": self.get_meta(),
             "errors": None,
-            "resources": data  
+            "resources": data
         })
@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from oauth2_provider.models import get_access_token_model
+
+from .authentication import get_bearer_token, token_cache
+
+
+RATE_LIMIT = getattr(settings, "API_RATE_LIMIT", {})
+
+
+class TokenBucket:
+    """
+    Klasik token bucket: saniyede `rate` token doluyor, en fazla `burst` token birikiyor.
+    Butun okuma-yazma lock altinda, thread'ler arasinda azaltma kaybolmuyor.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def _wait_time(self):
+        # Bir sonraki token'a kadar beklenecek sure (saniye)
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, amount=1):
+        """
+        (allowed, remaining, retry_after_seconds) donuyor.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            allowed = self.tokens >= amount
+            if allowed:
+                self.tokens -= amount
+            return allowed, int(self.tokens), self._wait_time()
+
+    def peek(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return int(self.tokens), self._wait_time()
+
+    def drain(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = 0.0
+            return self._wait_time()
+
+
+class RateLimiter:
+    """
+    Client bazli bucket'lar. Key genelde OAuth client id, token yoksa IP.
+    Cok fazla farkli key gelirse en eski kullanilan bucket atiliyor.
+    enabled=False iken (load test) istekler sayilmiyor, test_mode'lar yine calisiyor.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, enabled=True):
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def consume(self, key, amount=1):
+        return self.get_bucket(key).consume(amount)
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+limiter = RateLimiter(
+    rate=RATE_LIMIT.get("RATE", 100) / RATE_LIMIT.get("PERIOD", 60),
+    burst=RATE_LIMIT.get("BURST", 100),
+    max_keys=RATE_LIMIT.get("MAX_KEYS", 10000),
+    enabled=RATE_LIMIT.get("ENABLED", True),
+)
+
+
+def get_cached_client_key(request):
+    """
+    Veritabanina gitmeden bulunabiliyorsa key, yoksa None (async middleware icin).
+    """
+    token = get_bearer_token(request)
+    if not token:
+        return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    # Ayni istekte authentication da bakiyor; hit/miss orada sayiliyor
+    cached = token_cache.peek(token)
+    if cached is not None:
+        _, access_token = cached
+        return f"client:{access_token.application.client_id}"
+    return None
+
+
+def lookup_client_key(request):
+    # Cache'te olmayan token icin tek sorgu
+    client_id = (
+        get_access_token_model().objects.filter(token=get_bearer_token(request))
+        .values_list("application__client_id", flat=True).first()
+    )
+    if client_id:
+        return f"client:{client_id}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def get_client_key(request):
+    key = get_cached_client_key(request)
+    if key is None:
+        key = lookup_client_key(request)
+    return key
+
+
+def retry_after_header(wait):
+    # Eski davranisla ayni: header epoch saniye olarak "su zamanda tekrar dene"
+    if math.isinf(wait):
+        wait = RATE_LIMIT.get("PERIOD", 60)
+    return str(int(math.ceil(time.time() + wait)))
@@ -0,0 +1,91 @@
+"""
+Toplu entity cevaplari icin Accept ile secilen alternatif renderer'lar:
+
+    application/x-ndjson   her satir bir kayit (JSON)
+    application/x-msgpack  her kayit ardisik bir msgpack nesnesi
+
+Iki formatta da resources kayit kayit yaziliyor, son kayit {"meta": ..., "errors": ...}
+(trailer). Client govdenin tamamini beklemeden kayitlari parse edebiliyor.
+"""
+import msgpack
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from .streaming import encoder
+
+
+def packb(obj):
+    # Tarih, UUID, Decimal gibi degerler JSON cevapta nasilsa oyle (string)
+    return msgpack.packb(obj, use_bin_type=True, default=encoder.default)
+
+
+class RecordRenderer(BaseRenderer):
+    """
+    Kayit tabanli renderer'larin ortak kismi; alt sinif sadece `encode(obj) -> bytes` yaziyor.
+    Stream edilen cevaplar (api/streaming.py) ayni cerceveyi iter_records ile kullaniyor.
+    """
+
+    def encode(self, obj):
+        raise NotImplementedError
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f"{self.media_type}; charset={self.charset}"
+        return self.media_type
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Zarf olmayan cevaplar (hata detaylari) tek kayit
+        if not isinstance(data, dict) or "resources" not in data:
+            return self.encode(data)
+        return b"".join(self.iter_records([data["resources"]], lambda: (data.get("meta"), data.get("errors"))))
+
+    def iter_records(self, chunks, finish):
+        for chunk in chunks:
+            if chunk:
+                yield b"".join(self.encode(record) for record in chunk)
+        meta, errors = finish()
+        yield self.encode({"meta": meta, "errors": errors})
+
+    async def aiter_records(self, chunks, finish):
+        async for chunk in chunks:
+            if chunk:
+                yield b"".join(self.encode(record) for record in chunk)
+        meta, errors = finish()
+        yield self.encode({"meta": meta, "errors": errors})
+
+
+class NDJSONRenderer(RecordRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def encode(self, obj):
+        # Compact encoder string icindeki satir sonlarini kacirdigi icin her kayit tek satir
+        return encoder.encode(obj).encode() + b"\n"
+
+
+class MsgPackRenderer(RecordRenderer):
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+
+    def encode(self, obj):
+        return packb(obj)
+
+
+# DRF'in varsayilanlari (JSON, browsable API) once: Accept yoksa ya da */* ise JSON
+ENTITY_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, MsgPackRenderer]
+# Async view'larda browsable API yok
+ASYNC_ENTITY_RENDERERS = [JSONRenderer, NDJSONRenderer, MsgPackRenderer]
+
+
+def select_renderer(request, renderer_classes=ASYNC_ENTITY_RENDERERS):
+    """
+    DRF'in content negotiation'i (Accept ve ?format=). Uygun renderer yoksa NotAcceptable (406).
+    """
+    renderer, _ = DefaultContentNegotiation().select_renderer(request, [cls() for cls in renderer_classes])
+    return renderer
@@ -1,4 +1,7 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import HostGroup, Device, DeviceState
 
 
@@ -17,19 +20,147 @@ class DeviceListSerializer(serializers.ModelSerializer):
 class DeviceDetailSerializer(serializers.ModelSerializer):
 
     groups = serializers.PrimaryKeyRelatedField(
-        many=True, 
+        many=True,
         read_only=True
     )
-    
+
     class Meta:
         model = Device
-        fields = '__all__'
+        # modified_timestamp sadece delta sync (?changed_since=) ve fragment versiyonu icin, cevapta yok
+        exclude = ['modified_timestamp']
 
 
 class DeviceStateSerializer(serializers.ModelSerializer):
 
-    id = serializers.CharField(source='device.device_id')
-    
+    # device.device_id yerine FK kolonunu okuyoruz, her satirda Device yuklenmesin
+    id = serializers.CharField(source='device_id')
+
     class Meta:
         model = DeviceState
         fields = ['id', 'state']
+
+
+def datetime_to_representation(value, tz):
+    # serializers.DateTimeField.to_representation ile ayni cikti (ISO 8601, UTC icin 'Z')
+    if not value:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class CompiledSerializer:
+    """
+    Okuma endpoint'leri icin hizli yol. ModelSerializer'in alanlarindan bir kere
+    dict ureten fonksiyon derliyor, satirlari values_list() tuple'larindan okuyor.
+    Cikti ModelSerializer ile birebir ayni; alan bazli DRF makinesi calismiyor.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is not None:
+            return self._compiled
+
+        serializer = self.serializer_class()
+        model = serializer.Meta.model
+        columns = []
+        many_related = {}
+        namespace = {'_datetime': datetime_to_representation}
+        items = []
+
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ManyRelatedField):
+                many_related[name] = model._meta.get_field(field.source)
+                items.append(f"{name!r}: related[{name!r}].get(row[0], [])")
+                continue
+
+            index = len(columns)
+            columns.append(field.source.replace('.', '__'))
+            value = f"row[{index}]"
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if isinstance(field, serializers.DateTimeField) and output_format and output_format.lower() == 'iso-8601':
+                expr = f"_datetime({value}, tz)"
+            elif type(field) in (serializers.CharField, serializers.IPAddressField):
+                # DB zaten str donduruyor, str(value) gereksiz
+                expr = value
+            else:
+                namespace[f"_field{index}"] = field.to_representation
+                expr = f"(None if {value} is None else _field{index}({value}))"
+            items.append(f"{name!r}: {expr}")
+
+        if not columns or columns[0] != model._meta.pk.attname:
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}: ilk alan primary key olmali"
+            )
+
+        source = "def serialize_row(row, related, tz):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<compiled {self.serializer_class.__name__}>", "exec"), namespace)
+
+        self._compiled = (columns, many_related, namespace['serialize_row'])
+        return self._compiled
+
+    def values(self, queryset):
+        columns, _, _ = self.compile()
+        return queryset.values_list(*columns)
+
+    def related_querysets(self, pks):
+        _, many_related, _ = self.compile()
+        for name, m2m in many_related.items():
+            through = m2m.remote_field.through
+            source = through._meta.get_field(m2m.m2m_field_name()).attname
+            target_name = m2m.m2m_reverse_field_name()
+            target = through._meta.get_field(target_name).attname
+            # Iliskili modelin varsayilan siralamasi (prefetch ile ayni sira)
+            ordering = [
+                f"-{target_name}__{o[1:]}" if o.startswith('-') else f"{target_name}__{o}"
+                for o in m2m.related_model._meta.ordering
+            ]
+            yield name, (
+                through.objects.filter(**{f"{source}__in": pks})
+                .order_by(*ordering)
+                .values_list(source, target)
+            )
+
+    def fetch_related(self, rows):
+        related = {}
+        if rows:
+            for name, queryset in self.related_querysets([row[0] for row in rows]):
+                related[name] = group_pairs(queryset)
+        return related
+
+    async def afetch_related(self, rows):
+        related = {}
+        if rows:
+            for name, queryset in self.related_querysets([row[0] for row in rows]):
+                related[name] = group_pairs([pair async for pair in queryset])
+        return related
+
+    def serialize(self, rows):
+        return self.build(rows, self.fetch_related(rows))
+
+    async def aserialize(self, rows):
+        return self.build(rows, await self.afetch_related(rows))
+
+    def build(self, rows, related):
+        _, many_related, serialize_row = self.compile()
+        for name in many_related:
+            related.setdefault(name, {})
+        tz = timezone.get_current_timezone()
+        return [serialize_row(row, related, tz) for row in rows]
+
+
+def group_pairs(pairs):
+    lookup = {}
+    for owner, target_id in pairs:
+        lookup.setdefault(owner, []).append(target_id)
+    return lookup
+
+
+fast_host_group = CompiledSerializer(HostGroupSerializer)
+fast_device_list = CompiledSerializer(DeviceListSerializer)
+fast_device_detail = CompiledSerializer(DeviceDetailSerializer)
+fast_device_state = CompiledSerializer(DeviceStateSerializer)
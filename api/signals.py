@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from oauth2_provider.models import get_access_token_model
+
+from .authentication import token_cache
+from .fragments import fragment_cache
+from .models import HostGroup, Device
+
+
+# Tablo versiyonlarini (api/caching.py) ve modified_timestamp'i (update(), group uyeligi dahil)
+# veritabani trigger'lari ilerletiyor (migration 0004, 0005); burada sadece process ici cache'ler.
+# Fragment entry'leri versiyonla (modified_timestamp) kontrol ediliyor, silmek bellegi hemen bosaltiyor.
+# update() ve ham SQL signal gondermiyor, onlarda versiyon kontrolu ve LRU yetiyor
+@receiver([post_save, post_delete], sender=Device)
+def invalidate_device_fragment(sender, instance, **kwargs):
+    fragment_cache.delete(instance.pk)
+
+
+@receiver(m2m_changed, sender=Device.groups.through)
+def invalidate_fragments_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        fragment_cache.delete(instance.pk)
+    elif action == "post_clear":
+        # Group'tan hangi device'larin ciktigi artik bilinmiyor
+        fragment_cache.clear()
+    else:
+        for pk in pk_set:
+            fragment_cache.delete(pk)
+
+
+# Group adi parcalardaki groups sirasini degistiriyor, silinen group'un uyelikleri m2m signal'i
+# gondermeden gidiyor. Group degisikligi seyrek, hepsini atiyoruz
+@receiver([post_save, post_delete], sender=HostGroup)
+def invalidate_fragments_on_group_change(sender, **kwargs):
+    fragment_cache.clear()
+
+
+# Revoke edilen (DOT'ta silinen) ya da degisen token cache'te kalmasin.
+# Commit'ten sonra da siliyoruz, arada baska istek eski satirla tekrar cache'lemesin
+@receiver([post_save, post_delete], sender=get_access_token_model())
+def invalidate_access_token(sender, instance, **kwargs):
+    token_cache.delete(instance.token)
+    transaction.on_commit(lambda: token_cache.delete(instance.token))
@@ -0,0 +1,233 @@
+"""
+Okuma endpoint'leri icin opsiyonel bellek ici snapshot (API_SNAPSHOT["ENABLED"]).
+
+Device satirlari, group uyelikleri, state'ler ve host group'lar bir kere yukleniyor;
+device_list sirali id dizisinde bisect ile, entities / online-state dict lookup ile
+veritabanina gitmeden cevaplaniyor. Snapshot tablo versiyonlariyla
+(api/caching.py) etiketli ve her istekte veritabanindaki versiyonlarla (tek kucuk sorgu)
+karsilastiriliyor; tutmazsa snapshot yeniden yuklenene kadar istekler ORM yolundan gidiyor.
+Ilk yukleme sunucu acilirken (mock_api/asgi.py, wsgi.py), yeniden yuklemeler arka plan
+thread'inde; istek yukleme beklemiyor.
+Versiyonlari veritabani trigger'lari artirdigi icin bulk_create, update(), ham SQL ve
+baska process'lerin yazmalari da goruluyor. Cevap, versiyonun okundugu andaki veri; ORM
+yolunda oldugu gibi kontrolden sonra commit edilen yazma o cevapta yok. Trigger'i
+olmayan backend'de snapshot kullanilmiyor.
+"""
+import threading
+import time
+from bisect import bisect_right
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .caching import atable_versions, table_versions
+from .delta import CHANGED_SINCE_PARAM
+from .fql import FILTER_PARAM
+from .includes import IncludeSerializer
+from .models import HostGroup, Device, DeviceState
+from .serializers import fast_host_group, fast_device_detail, fast_device_state, group_pairs
+
+
+SNAPSHOT = getattr(settings, "API_SNAPSHOT", {})
+
+MODELS = (Device, DeviceState, HostGroup)
+
+# Bu parametrelerle device_list snapshot'tan cevaplanmiyor
+UNSUPPORTED_LIST_PARAMS = (FILTER_PARAM, CHANGED_SINCE_PARAM)
+
+
+def current_versions():
+    return table_versions(MODELS)
+
+
+async def acurrent_versions():
+    return await atable_versions(MODELS)
+
+
+class Snapshot:
+
+    def __init__(self, versions, rows, groups, states, host_groups):
+        self.versions = versions
+        # fast_device_detail.values() satirlari, primary key sirasinda
+        self.rows = rows
+        self.device_ids = [row[0] for row in rows]
+        self.index = {device_id: position for position, device_id in enumerate(self.device_ids)}
+        self.groups = groups
+        self.states = states
+        self.host_groups = host_groups
+
+    @classmethod
+    def load(cls):
+        # Versiyon yuklemeden ONCE: yukleme sirasinda gelen yazma snapshot'i hemen eskitiyor
+        versions = current_versions()
+        rows = list(fast_device_detail.values(Device.objects.order_by("pk")).iterator(chunk_size=10000))
+        # CompiledSerializer.related_querysets ile ayni sira (group adi)
+        memberships = Device.groups.through.objects.order_by("hostgroup__name").values_list("device_id", "hostgroup_id")
+        states = dict(DeviceState.objects.values_list("device_id", "state").iterator(chunk_size=10000))
+        host_groups = fast_host_group.serialize(list(fast_host_group.values(HostGroup.objects.all())))
+        return cls(versions, rows, group_pairs(memberships.iterator(chunk_size=10000)), states, host_groups)
+
+    def paginate(self, paginator, request):
+        """
+        CustomPagination.paginate_queryset ile ayni meta; sayfa sirali id dizisinden.
+        Offset modunda da primary key sirasi (ORM'de sirasiz).
+        """
+        paginator.prepare(request)
+        paginator.count = None if paginator.total_mode == "none" else len(self.device_ids)
+        if paginator.cursor is None:
+            start = paginator.offset
+        elif paginator.position is None:
+            start = 0
+        else:
+            start = bisect_right(self.device_ids, paginator.position)
+        page = self.device_ids[start:start + paginator.limit + 1]
+        return paginator.finish_page([(device_id,) for device_id in page])
+
+    def positions(self, ids):
+        # ids tekrarsiz (api/lookup.get_ids), sonuc istekteki sirada
+        return [self.index[device_id] for device_id in ids if device_id in self.index]
+
+    def device_entities(self, ids, includes=()):
+        rows = [self.rows[position] for position in self.positions(ids)]
+        resources = fast_device_detail.build(rows, {"groups": self.groups})
+        if includes:
+            IncludeSerializer(fast_device_detail, includes).embed(
+                resources,
+                self.states if "online_state" in includes else None,
+                self.host_groups if "group_info" in includes else None,
+            )
+        return resources, {row[0] for row in rows}
+
+    def online_state(self, ids):
+        rows = [
+            (self.device_ids[position], self.states[self.device_ids[position]])
+            for position in self.positions(ids) if self.device_ids[position] in self.states
+        ]
+        return fast_device_state.build(rows, {}), {row[0] for row in rows}
+
+
+class SnapshotEngine:
+    """
+    Guncel snapshot'i veriyor. Versiyon degistiyse en fazla MIN_REFRESH_INTERVAL
+    saniyede bir arka planda yeniden yukluyor; o sirada ve arada istekler None alip ORM'e
+    gidiyor. background=False ise yukleme istegin thread'inde (testler transaction icinde,
+    baska thread'in baglantisi test verisini gormuyor).
+    """
+
+    def __init__(self, enabled=False, min_refresh_interval=5, background=True):
+        self.enabled = enabled
+        self.min_refresh_interval = min_refresh_interval
+        self.background = background
+        self.snapshot = None
+        self.loaded_at = None
+        self.loads = 0
+        self.load_time = None
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def fresh(self, versions):
+        snapshot = self.snapshot
+        if snapshot is not None and versions is not None and snapshot.versions == versions:
+            self.hits += 1
+            return snapshot
+        return None
+
+    def refresh(self, versions):
+        if versions is None:
+            # Versiyon trigger'lari olmayan backend, snapshot dogrulanamiyor
+            return self.fallback()
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.min_refresh_interval:
+            return self.fallback()
+        # Baska thread zaten yukluyor, beklemeden ORM'e
+        if not self._lock.acquire(blocking=False):
+            return self.fallback()
+        if self.background:
+            self.start()
+            return self.fallback()
+        try:
+            self.load_locked()
+        finally:
+            self._lock.release()
+        return self.fresh(versions) or self.fallback()
+
+    def load(self):
+        """
+        Snapshot'i bu thread'de yukluyor; suren yukleme varsa onu bekliyor.
+        """
+        with self._lock:
+            self.load_locked()
+        return self.snapshot
+
+    def load_locked(self):
+        start = time.perf_counter()
+        self.snapshot = Snapshot.load()
+        self.load_time = time.perf_counter() - start
+        self.loaded_at = time.monotonic()
+        self.loads += 1
+
+    def start(self):
+        # _lock alinmis olmali, thread yukleme bitince birakiyor
+        thread = threading.Thread(target=self.load_in_background, name="snapshot-load", daemon=True)
+        thread.start()
+        return thread
+
+    def load_in_background(self):
+        try:
+            if current_versions() is not None:
+                self.load_locked()
+        finally:
+            self._lock.release()
+            # Thread'in kendi veritabani baglantisi
+            connections.close_all()
+
+    def warm_up(self):
+        """
+        Sunucu acilirken ilk snapshot'i arka planda yukluyor; hazir olana kadar istekler ORM'den.
+        """
+        if self.enabled and self._lock.acquire(blocking=False):
+            return self.start()
+        return None
+
+    def fallback(self):
+        self.fallbacks += 1
+        return None
+
+    def get(self):
+        if not self.enabled:
+            return None
+        versions = current_versions()
+        return self.fresh(versions) or self.refresh(versions)
+
+    async def aget(self):
+        if not self.enabled:
+            return None
+        versions = await acurrent_versions()
+        if self.background:
+            # refresh() veritabanina gitmiyor, yuklemeyi thread'e birakiyor
+            return self.fresh(versions) or self.refresh(versions)
+        return self.fresh(versions) or await sync_to_async(self.refresh)(versions)
+
+    def reset(self):
+        self.snapshot = None
+        self.loaded_at = None
+        self.loads = self.hits = self.fallbacks = 0
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "devices": len(self.snapshot.rows) if self.snapshot is not None else None,
+            "loads": self.loads,
+            "load_time": round(self.load_time, 3) if self.load_time is not None else None,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+engine = SnapshotEngine(SNAPSHOT.get("ENABLED", False), SNAPSHOT.get("MIN_REFRESH_INTERVAL", 5))
+
+
+def list_supported(request):
+    return not any(request.query_params.get(param) for param in UNSUPPORTED_LIST_PARAMS)
+
@@ -0,0 +1,109 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+STREAM_CHUNK_SIZE = getattr(settings, "API_STREAM_CHUNK_SIZE", 500)
+
+# DRF JSONRenderer ile ayni ayarlar, stream edilen cikti normal cevapla ayni gorunsun
+encoder = JSONEncoder(
+    ensure_ascii=not api_settings.UNICODE_JSON,
+    allow_nan=not api_settings.STRICT_JSON,
+    separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+)
+
+
+def wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true")
+
+
+def serialize_chunks(rows, serializer, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    values_list() satirlarini chunk chunk serialize ediyor.
+    Her chunk icin group gibi iliskiler tek sorguda geliyor.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield serializer.serialize(chunk)
+            chunk = []
+    if chunk:
+        yield serializer.serialize(chunk)
+
+
+def iter_envelope(chunks, finish):
+    """
+    meta/errors/resources zarfini parca parca yaziyor. Bellekte ayni anda
+    en fazla bir chunk var. meta ve errors resources bittikten sonra
+    belli oldugu icin (next cursor, eksik id'ler) zarfin sonuna yaziliyor.
+    """
+    yield b'{"resources":['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = encoder.encode(chunk)[1:-1].encode()
+        yield body if first else b',' + body
+        first = False
+
+    meta, errors = finish()
+    yield b'],"meta":' + encoder.encode(meta).encode() + b',"errors":' + encoder.encode(errors).encode() + b'}'
+
+
+def streaming_response(chunks, finish, renderer=None):
+    # NDJSON / msgpack (api/renderers.py) secildiyse zarf yerine kayit kayit
+    if hasattr(renderer, "iter_records"):
+        return StreamingHttpResponse(renderer.iter_records(chunks, finish), content_type=renderer.content_type)
+    return StreamingHttpResponse(iter_envelope(chunks, finish), content_type="application/json")
+
+
+async def aiterate(queryset, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    QuerySet.aiterator() yerine: values_list() querysetlerinde Django sorguyu
+    async context'te calistirmaya calisiyor. Burada her chunk ayri thread cagrisi.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    fetch = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while True:
+        chunk = await fetch()
+        for row in chunk:
+            yield row
+        if len(chunk) < chunk_size:
+            return
+
+
+async def aserialize_chunks(rows, serializer, chunk_size=STREAM_CHUNK_SIZE):
+    # serialize_chunks'in async hali, satirlar async ORM iterator'undan geliyor
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield await serializer.aserialize(chunk)
+            chunk = []
+    if chunk:
+        yield await serializer.aserialize(chunk)
+
+
+async def aiter_envelope(chunks, finish):
+    yield b'{"resources":['
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        body = encoder.encode(chunk)[1:-1].encode()
+        yield body if first else b',' + body
+        first = False
+
+    meta, errors = finish()
+    yield b'],"meta":' + encoder.encode(meta).encode() + b',"errors":' + encoder.encode(errors).encode() + b'}'
+
+
+def astreaming_response(chunks, finish, renderer=None):
+    if hasattr(renderer, "aiter_records"):
+        return StreamingHttpResponse(renderer.aiter_records(chunks, finish), content_type=renderer.content_type)
+    return StreamingHttpResponse(aiter_envelope(chunks, finish), content_type="application/json")
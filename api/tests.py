@@ -1,3 +1,1535 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import msgpack
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as dj_timezone
+from oauth2_provider.models import AccessToken, Application
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from client.rate_limiter import RateLimiter as ClientRateLimiter
+
+from . import async_views, faults
+from .authentication import token_cache
+from .faults import FaultProfile, FaultProfileError
+from .fleet import clear_fleet
+from .management.commands.loadtest import InProcessTransport
+from .fql import parse_filter
+from .fragments import embed, fragment_cache
+from .middleware import CompressionMiddleware, RateLimitMiddleware
+from .models import HostGroup, Device, DeviceState, TableVersion
+from .ratelimit import RateLimiter, TokenBucket, limiter
+from .renderers import packb
+from .snapshot import Snapshot, current_versions, engine as snapshot_engine
+from .serializers import (
+    HostGroupSerializer, DeviceListSerializer, DeviceDetailSerializer, DeviceStateSerializer,
+    fast_host_group, fast_device_list, fast_device_detail, fast_device_state,
+)
+
+
+SEEN = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def build_device(device_id, **fields):
+    # Kaydedilmemis device; bulk_create testleri icin
+    values = {
+        "cid": "cid_001",
+        "hostname": f"host-{device_id}",
+        "external_ip": "10.0.0.1",
+        "local_ip": "192.168.1.1",
+        "mac_address": "00:00:00:00:00:00",
+        "platform_name": "Windows",
+        "os_version": "Windows 11",
+        "agent_version": "7.10.0",
+        "first_seen": SEEN,
+        "last_seen": SEEN,
+        "status": "normal",
+        "system_manufacturer": "Dell",
+        "serial_number": f"SN-{device_id}",
+    }
+    values.update(fields)
+    return Device(device_id=device_id, **values)
+
+
+def make_device(device_id, **fields):
+    device = build_device(device_id, **fields)
+    device.save(force_insert=True)
+    return device
+
+
+def make_group(group_id, **fields):
+    values = {
+        "group_type": "static",
+        "name": f"Group {group_id}",
+        "created_by": "admin",
+        "created_timestamp": SEEN,
+        "modified_by": "admin",
+        "modified_timestamp": SEEN,
+    }
+    values.update(fields)
+    return HostGroup.objects.create(id=group_id, **values)
+
+
+class APITestCase(TestCase):
+
+    def setUp(self):
+        # Count/versiyon cache'i ve rate limit bucket'lari testler arasinda tasinmasin
+        cache.clear()
+        limiter.reset()
+        fragment_cache.clear()
+        self.client = APIClient()
+
+
+class CursorPaginationTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Bilerek karisik sirada ekliyoruz, cursor pk sirasina gore donmeli
+        for i in [5, 1, 9, 3, 7, 2, 8, 4, 6, 0]:
+            make_device(f"dev_{i:03d}")
+
+    def walk(self, limit, on_page=None):
+        ids = []
+        after = ""
+        while True:
+            response = self.client.get("/devices/devices/", {"limit": limit, "after": after})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(d["device_id"] for d in response.data["resources"])
+            if on_page:
+                on_page()
+            after = response.data["meta"]["pagination"]["next"]
+            if not after:
+                return ids
+
+    def test_cursor_walks_in_primary_key_order(self):
+        ids = self.walk(limit=3)
+        self.assertEqual(ids, [f"dev_{i:03d}" for i in range(10)])
+
+    def test_cursor_is_stable_under_inserts(self):
+        inserted = iter(["dev_000a", "dev_004a", "dev_999"])
+
+        def insert():
+            device_id = next(inserted, None)
+            if device_id:
+                make_device(device_id)
+
+        ids = self.walk(limit=3, on_page=insert)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertTrue(set(f"dev_{i:03d}" for i in range(10)) <= set(ids))
+
+    def test_cursor_deep_page_does_not_use_offset(self):
+        response = self.client.get("/devices/devices/", {"limit": 3, "after": ""})
+        after = response.data["meta"]["pagination"]["next"]
+        # Tablo versiyonu (ETag ve count cache key'i) + sayfa
+        with self.assertNumQueries(2):
+            response = self.client.get("/devices/devices/", {"limit": 3, "after": after})
+        self.assertEqual(response.data["resources"][0]["device_id"], "dev_003")
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/devices/devices/", {"after": "%%%"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_host_groups_cursor(self):
+        for i in range(4):
+            make_group(f"group_{i:03d}", name=f"Group {3 - i}")
+        response = self.client.get("/devices/host-groups/", {"limit": 2, "after": ""})
+        self.assertEqual([g["id"] for g in response.data["resources"]], ["group_000", "group_001"])
+        self.assertTrue(response.data["meta"]["pagination"]["next"])
+
+    def test_offset_mode_unchanged(self):
+        response = self.client.get("/devices/devices/", {"limit": 4, "offset": 8})
+        pagination = response.data["meta"]["pagination"]
+        self.assertEqual(pagination["offset"], 8)
+        self.assertEqual(pagination["total"], 10)
+        self.assertEqual(pagination["next"], "")
+
+
+class TotalCountTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            make_device(f"dev_{i:03d}")
+
+    def test_count_is_cached_between_pages(self):
+        self.client.get("/devices/devices/", {"limit": 2})
+        # Tablo versiyonu + sayfa, COUNT yok
+        with self.assertNumQueries(2):
+            response = self.client.get("/devices/devices/", {"limit": 2, "offset": 2})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 5)
+
+    def test_count_cache_invalidated_on_save_and_delete(self):
+        self.client.get("/devices/devices/")
+        with self.captureOnCommitCallbacks(execute=True):
+            make_device("dev_new")
+        response = self.client.get("/devices/devices/")
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Device.objects.get(device_id="dev_000").delete()
+        response = self.client.get("/devices/devices/")
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 5)
+
+    def test_count_follows_writes_without_signals(self):
+        # bulk_create, update() ve ham SQL signal gondermiyor; versiyonu trigger'lar artiriyor
+        self.client.get("/devices/devices/")
+        Device.objects.bulk_create([build_device("dev_bulk")])
+        response = self.client.get("/devices/devices/")
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 6)
+        self.assertEqual(len(response.data["resources"]), 6)
+
+        self.client.get("/devices/devices/", {"filter": "hostname:'renamed'"})
+        Device.objects.filter(device_id="dev_000").update(hostname="renamed")
+        response = self.client.get("/devices/devices/", {"filter": "hostname:'renamed'"})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM api_device WHERE device_id = %s", ["dev_bulk"])
+        response = self.client.get("/devices/devices/")
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 5)
+
+    def test_missing_version_rows_are_recreated(self):
+        # flush ya da elle silinen api_tableversion satirlari cache'leri kapatmiyor
+        TableVersion.objects.all().delete()
+        self.client.get("/devices/devices/")
+        self.assertTrue(TableVersion.objects.filter(name="api_device").exists())
+        make_device("dev_new")
+        response = self.client.get("/devices/devices/")
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 6)
+
+    def test_approximate_after_delete(self):
+        # SQLite'ta MAX(rowid) silmeden sonra fazla sayiyordu; kesin sayiya dusuyor
+        Device.objects.filter(device_id__in=["dev_000", "dev_001"]).delete()
+        response = self.client.get("/devices/devices/", {"total": "approximate"})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 3)
+
+    def test_total_none_skips_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/devices/devices/", {"limit": 2, "total": "none"})
+        pagination = response.data["meta"]["pagination"]
+        self.assertIsNone(pagination["total"])
+        self.assertEqual(pagination["next"], "2")
+
+        response = self.client.get("/devices/devices/", {"limit": 2, "offset": 4, "total": "none"})
+        self.assertEqual(response.data["meta"]["pagination"]["next"], "")
+
+    def test_total_approximate(self):
+        response = self.client.get("/devices/devices/", {"total": "approximate"})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 5)
+
+    def test_invalid_total_mode(self):
+        response = self.client.get("/devices/devices/", {"total": "sometimes"})
+        self.assertEqual(response.status_code, 400)
+
+
+class DeviceFilterTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = dj_timezone.now()
+        make_device("win_new", hostname="DESKTOP-PROD-001", last_seen=now - timedelta(hours=2))
+        make_device("win_old", hostname="DESKTOP-DEV-002", last_seen=now - timedelta(days=5))
+        make_device("win_rfm", hostname="DESKTOP-PROD-003", status="reduced_functionality", last_seen=now)
+        make_device("lin_new", hostname="SRV-PROD-001", platform_name="Linux", last_seen=now)
+        make_device("mac_old", hostname="MAC-DEV-001", platform_name="Mac", last_seen=now - timedelta(days=30))
+
+    def ids(self, fql, **params):
+        response = self.client.get("/devices/devices/", {"filter": fql, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(device["device_id"] for device in response.json()["resources"])
+
+    def test_equality_and_relative_time(self):
+        self.assertEqual(
+            self.ids("platform_name:'Windows'+status:'normal'+last_seen:>'now-1d'"), ["win_new"],
+        )
+
+    def test_or_lists_and_negation(self):
+        self.assertEqual(self.ids("platform_name:'Linux',platform_name:'Mac'"), ["lin_new", "mac_old"])
+        self.assertEqual(self.ids("platform_name:['Linux','Mac']"), ["lin_new", "mac_old"])
+        self.assertEqual(self.ids("platform_name:!'Windows'+last_seen:>='now-7d'"), ["lin_new"])
+        # + , 'den once baglaniyor
+        self.assertEqual(
+            self.ids("status:'reduced_functionality',platform_name:'Mac'+last_seen:<'now-7d'"), ["mac_old", "win_rfm"],
+        )
+        self.assertEqual(
+            self.ids("(status:'reduced_functionality',platform_name:'Mac')+last_seen:>'now-7d'"), ["win_rfm"],
+        )
+
+    def test_wildcard_and_absolute_time(self):
+        self.assertEqual(self.ids("hostname:*'*-PROD-*'"), ["lin_new", "win_new", "win_rfm"])
+        self.assertEqual(self.ids("hostname:*'DESKTOP-*-00*'"), ["win_new", "win_old", "win_rfm"])
+        self.assertEqual(self.ids("last_seen:<'2000-01-01T00:00:00Z'"), [])
+
+    def test_filter_with_cursor_and_total(self):
+        response = self.client.get(
+            "/devices/devices/", {"filter": "platform_name:'Windows'", "after": "", "limit": 2},
+        ).json()
+        self.assertEqual(response["meta"]["pagination"]["total"], 3)
+        second = self.client.get(
+            "/devices/devices/",
+            {"filter": "platform_name:'Windows'", "after": response["meta"]["pagination"]["next"], "limit": 2},
+        ).json()
+        ids = [device["device_id"] for device in response["resources"] + second["resources"]]
+        self.assertEqual(ids, ["win_new", "win_old", "win_rfm"])
+
+    def test_invalid_filter(self):
+        for fql in ["cid:'x'", "platform_name:'Windows'+", "last_seen:>'yesterday'", "last_seen:*'2024*'", "status:'a"]:
+            with self.subTest(fql=fql):
+                response = self.client.get("/devices/devices/", {"filter": fql})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("filter", response.json())
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN ciktisi SQLite'a ozel")
+    def test_query_plan_uses_index(self):
+        cases = {
+            "platform_name:'Windows'+status:'normal'+last_seen:>'now-1d'": "device_status_platform_seen",
+            "platform_name:'Mac'+last_seen:>'now-1d'": "device_platform_seen",
+            "hostname:'SRV-PROD-001'": "device_hostname",
+        }
+        for fql, index in cases.items():
+            with self.subTest(fql=fql):
+                queryset = Device.objects.filter(parse_filter(fql)).order_by("pk")
+                self.assertIn(f"USING INDEX {index}", queryset.explain())
+
+
+class DeltaSyncTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.group = make_group("group_001")
+        for i in range(5):
+            DeviceState.objects.create(device=make_device(f"dev_{i:03d}"), state="online")
+        # Onceki bir sync'ten kalmis gibi
+        Device.objects.update(modified_timestamp=SEEN)
+        DeviceState.objects.update(modified_timestamp=SEEN)
+        self.since = "2024-06-01T00:00:00Z"
+
+    def changed(self, **params):
+        response = self.client.get("/devices/devices/", {"changed_since": self.since, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_watermark_in_meta(self):
+        before = dj_timezone.now()
+        watermark = self.client.get("/devices/devices/").json()["meta"]["watermark"]
+        self.assertLessEqual(datetime.fromisoformat(watermark), before)
+
+    def test_only_changed_devices(self):
+        self.assertEqual(self.changed()["resources"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            device = Device.objects.get(device_id="dev_001")
+            device.status = "reduced_functionality"
+            device.save()
+            state = DeviceState.objects.get(device_id="dev_002")
+            state.state = "offline"
+            state.save()
+            Device.objects.get(device_id="dev_003").groups.add(self.group)
+
+        body = self.changed(after="")
+        self.assertEqual([d["device_id"] for d in body["resources"]], ["dev_001", "dev_002", "dev_003"])
+        self.assertEqual(body["meta"]["pagination"]["total"], 3)
+
+    def test_group_side_membership_changes(self):
+        self.group.devices.add(Device.objects.get(device_id="dev_000"))
+        Device.objects.update(modified_timestamp=SEEN)
+        self.group.devices.clear()
+        self.assertEqual([d["device_id"] for d in self.changed()["resources"]], ["dev_000"])
+
+    def test_state_change_invalidates_cached_total(self):
+        self.assertEqual(self.changed()["meta"]["pagination"]["total"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            state = DeviceState.objects.get(device_id="dev_004")
+            state.state = "offline"
+            state.save()
+        self.assertEqual(self.changed()["meta"]["pagination"]["total"], 1)
+
+    def test_update_and_raw_membership_writes(self):
+        # Signal'siz yazmalar: modified_timestamp'i trigger'lar ilerletiyor
+        Device.objects.filter(device_id="dev_001").update(status="contained")
+        DeviceState.objects.filter(device_id="dev_002").update(state="offline")
+        Device.groups.through.objects.bulk_create([Device.groups.through(device_id="dev_003", hostgroup=self.group)])
+        self.assertEqual(sorted(d["device_id"] for d in self.changed()["resources"]), ["dev_001", "dev_002", "dev_003"])
+
+    def test_modified_timestamp_not_in_payload(self):
+        device = self.client.post("/devices/entities/", {"ids": ["dev_000"]}, format="json").json()["resources"][0]
+        self.assertNotIn("modified_timestamp", device)
+
+    def test_invalid_changed_since(self):
+        response = self.client.get("/devices/devices/", {"changed_since": "last tuesday"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("changed_since", response.json())
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        make_group("group_001")
+        for i in range(3):
+            make_device(f"dev_{i:03d}")
+
+    def test_not_modified_reads_only_versions(self):
+        for path in ("/devices/host-groups/", "/devices/devices/"):
+            with self.subTest(path=path):
+                etag = self.client.get(path, {"limit": 2})["ETag"]
+                self.assertTrue(etag.startswith('W/"'))
+                # Sadece tablo versiyonu (api_tableversion)
+                with self.assertNumQueries(1):
+                    response = self.client.get(path, {"limit": 2}, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(response.content, b"")
+
+    def test_etag_changes_with_data_and_params(self):
+        etag = self.client.get("/devices/devices/")["ETag"]
+        self.assertNotEqual(self.client.get("/devices/devices/", {"limit": 1})["ETag"], etag)
+        # Host group degisikligi device listesini etkilemiyor
+        with self.captureOnCommitCallbacks(execute=True):
+            make_group("group_002")
+        self.assertEqual(self.client.get("/devices/devices/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_device("dev_new")
+        response = self.client.get("/devices/devices/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_follows_writes_without_signals(self):
+        # bulk_create / update() / ham SQL sinyal gondermiyor; versiyonu trigger artiriyor
+        def raw_delete():
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM api_device WHERE device_id = 'dev_001'")
+
+        writes = [
+            lambda: Device.objects.bulk_create([build_device("dev_bulk")]),
+            lambda: Device.objects.filter(pk="dev_000").update(hostname="renamed"),
+            raw_delete,
+        ]
+        for write in writes:
+            etag = self.client.get("/devices/devices/")["ETag"]
+            write()
+            response = self.client.get("/devices/devices/", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_relative_time_has_no_etag(self):
+        response = self.client.get("/devices/devices/", {"filter": "last_seen:>'now-1d'"})
+        self.assertFalse(response.has_header("ETag"))
+        response = self.client.get("/devices/devices/", {"filter": "last_seen:>'2024-01-01T00:00:00Z'"})
+        self.assertTrue(response.has_header("ETag"))
+        # String alandaki "now" goreli zaman degil
+        response = self.client.get("/devices/devices/", {"filter": "hostname:'snowflake-now'"})
+        self.assertTrue(response.has_header("ETag"))
+        response = self.client.get("/devices/devices/", {"changed_since": "now-1h"})
+        self.assertFalse(response.has_header("ETag"))
+
+    async def test_async_view(self):
+        factory = AsyncRequestFactory()
+        etag = (await async_views.host_groups(factory.get("/devices/host-groups/")))["ETag"]
+        response = await async_views.host_groups(factory.get("/devices/host-groups/", headers={"If-None-Match": etag}))
+        self.assertEqual(response.status_code, 304)
+
+
+class DeviceEntitiesQueryCountTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        groups = [make_group(f"group_{i:03d}") for i in range(3)]
+        devices = Device.objects.bulk_create([
+            Device(
+                device_id=f"dev_{i:05d}", cid="cid_001", hostname=f"host-{i}",
+                mac_address="00:00:00:00:00:00", platform_name="Linux", os_version="Ubuntu 22.04",
+                agent_version="7.10.0", first_seen=SEEN, last_seen=SEEN, status="normal",
+                system_manufacturer="Dell", serial_number=f"SN-{i}",
+            )
+            for i in range(5000)
+        ])
+        Membership = Device.groups.through
+        Membership.objects.bulk_create([
+            Membership(device_id=device.device_id, hostgroup_id=groups[i % 3].id)
+            for i, device in enumerate(devices)
+        ] + [
+            Membership(device_id=device.device_id, hostgroup_id=groups[(i + 1) % 3].id)
+            for i, device in enumerate(devices) if i % 2 == 0
+        ])
+
+    def setUp(self):
+        super().setUp()
+        # Serializer yolunun sorgu sayisi; cache'li yol FragmentCacheTests'te
+        fragment_cache.enabled = False
+        self.addCleanup(setattr, fragment_cache, "enabled", True)
+
+    def test_constant_query_count(self):
+        for size in (10, 100, 5000):
+            ids = [f"dev_{i:05d}" for i in range(size)]
+            with self.subTest(size=size), self.assertNumQueries(2):
+                response = self.client.post("/devices/entities/", {"ids": ids}, format="json")
+            self.assertEqual(len(response.data["resources"]), size)
+            self.assertIsNone(response.data["errors"])
+
+    def test_groups_and_missing_ids(self):
+        response = self.client.post(
+            "/devices/entities/", {"ids": ["dev_00000", "dev_00001", "nope"]}, format="json"
+        )
+        groups = {d["device_id"]: d["groups"] for d in response.data["resources"]}
+        self.assertEqual(groups, {
+            "dev_00000": ["group_000", "group_001"],
+            "dev_00001": ["group_001"],
+        })
+        self.assertEqual(response.data["errors"], [{"id": "nope", "message": "Device not found"}])
+
+
+class EntityLookupTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        group = make_group("group_001")
+        for i in range(10):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(group)
+            DeviceState.objects.create(device=device, state="online")
+        self.ids = ["dev_007", "dev_002", "missing-1", "dev_002", "dev_009", "dev_000", "missing-2", "dev_007"]
+        self.expected = ["dev_007", "dev_002", "dev_009", "dev_000"]
+
+    def post(self, path="/devices/entities/", ids=None, query=""):
+        return self.client.post(f"{path}{query}", {"ids": self.ids if ids is None else ids}, format="json")
+
+    def device_ids(self, response):
+        if response.streaming:
+            body = json.loads(b"".join(response.streaming_content))
+        else:
+            body = response.json()
+        return [r.get("device_id", r.get("id")) for r in body["resources"]], [e["id"] for e in body["errors"] or []]
+
+    def test_request_order_without_duplicates(self):
+        cases = [
+            ("/devices/entities/", ""),
+            ("/devices/entities/", "?stream=true"),
+            ("/devices/entities/", "?include=online_state,group_info"),
+            ("/devices/entities/online-state/", ""),
+            ("/devices/entities/online-state/", "?stream=true"),
+        ]
+        for fragments in (True, False):
+            fragment_cache.enabled = fragments
+            for path, query in cases:
+                with self.subTest(path=path, query=query, fragments=fragments):
+                    resources, errors = self.device_ids(self.post(path, query=query))
+                    self.assertEqual(resources, self.expected)
+                    self.assertEqual(errors, ["missing-1", "missing-2"])
+        fragment_cache.enabled = True
+
+    def test_chunked_queries(self):
+        fragment_cache.enabled = False
+        self.addCleanup(setattr, fragment_cache, "enabled", True)
+        ids = [f"dev_{i:03d}" for i in range(9, -1, -1)]
+        # 4 parca x (device + groups)
+        with mock.patch("api.lookup._chunk_size", 3), self.assertNumQueries(8):
+            response = self.post(ids=ids)
+        self.assertEqual(self.device_ids(response)[0], ids)
+        with mock.patch("api.lookup._chunk_size", 3):
+            queries = captured_queries(lambda: self.post(ids=ids))
+        for query in queries:
+            self.assertLessEqual(query["sql"].count("'dev_"), 3)
+
+    def test_too_many_ids(self):
+        with mock.patch("api.lookup.MAX_IDS_PER_REQUEST", 3):
+            # Tekrarlar sayilmiyor
+            self.assertEqual(self.post(ids=["dev_000", "dev_001", "dev_000", "dev_002"]).status_code, 200)
+            response = self.post(ids=["dev_000", "dev_001", "dev_002", "dev_003"])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("at most 3", response.json()["ids"][0])
+
+    def test_invalid_ids(self):
+        for ids in ("dev_000", [1, 2], [{"id": "dev_000"}]):
+            with self.subTest(ids=ids):
+                response = self.post("/devices/entities/online-state/", ids=ids)
+                self.assertEqual(response.status_code, 400)
+
+    async def test_async_views(self):
+        for view in (async_views.device_entities, async_views.online_state):
+            for query in ("", "stream=true"):
+                request = AsyncRequestFactory().post(
+                    "/", {"ids": self.ids}, content_type="application/json", QUERY_STRING=query,
+                )
+                with mock.patch("api.lookup._chunk_size", 2):
+                    response = await view(request)
+                    if response.streaming:
+                        body = json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+                    else:
+                        body = json.loads(response.content)
+                self.assertEqual([r.get("device_id", r.get("id")) for r in body["resources"]], self.expected)
+
+
+def captured_queries(func):
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    return ctx.captured_queries
+
+
+class FragmentCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.group = make_group("group_001", name="Production")
+        for i in range(20):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(self.group)
+            DeviceState.objects.create(device=device, state="online")
+        self.ids = [f"dev_{i:03d}" for i in range(20)] + ["missing"]
+
+    def post(self, ids=None, include="online_state,group_info"):
+        return self.client.post(f"/devices/entities/?include={include}", {"ids": ids or self.ids}, format="json")
+
+    def uncached(self, **kwargs):
+        fragment_cache.enabled = False
+        try:
+            return self.post(**kwargs).json()
+        finally:
+            fragment_cache.enabled = True
+
+    def test_matches_serializer_output(self):
+        for include in ("online_state,group_info", "group_info", ""):
+            self.post(include=include)
+            body = self.post(include=include).json()
+            expected = self.uncached(include=include)
+            self.assertEqual(body["resources"], expected["resources"])
+            self.assertEqual(body["errors"], expected["errors"])
+        self.assertGreater(fragment_cache.stats()["hits"], 0)
+
+    def test_warm_request_skips_serializer(self):
+        self.post()
+        before = fragment_cache.stats()
+        # (device_id, modified_timestamp) + include basina 1
+        with self.assertNumQueries(3):
+            response = self.post()
+        self.assertEqual(len(response.data["resources"]), 20)
+        stats = fragment_cache.stats()
+        self.assertEqual((stats["hits"] - before["hits"], stats["misses"] - before["misses"]), (20, 0))
+
+    def test_invalidation(self):
+        self.post()
+        device = Device.objects.get(device_id="dev_001")
+        device.hostname = "renamed"
+        device.save()
+        other = make_group("group_002", name="Alpha")
+        Device.objects.get(device_id="dev_002").groups.add(other)
+        self.assertNotIn("dev_001", fragment_cache.entries)
+
+        devices = {d["device_id"]: d for d in self.post().data["resources"]}
+        self.assertEqual(devices["dev_001"]["hostname"], "renamed")
+        self.assertEqual([g["name"] for g in devices["dev_002"]["group_info"]], ["Alpha", "Production"])
+
+    def test_stale_version_is_a_miss(self):
+        # update() signal gondermiyor; modified_timestamp'i trigger ilerletiyor (migration 0005)
+        self.post()
+        stale = fragment_cache.stats()["stale"]
+        Device.objects.filter(device_id="dev_003").update(hostname="updated")
+        Device.objects.filter(device_id="dev_003").update(hostname="updated again")
+        devices = {d["device_id"]: d for d in self.post().data["resources"]}
+        self.assertEqual(devices["dev_003"]["hostname"], "updated again")
+        self.assertEqual(fragment_cache.stats()["stale"], stale + 1)
+
+    def test_membership_without_signals(self):
+        other = make_group("group_002", name="Alpha")
+        self.post()
+        Device.groups.through.objects.bulk_create([Device.groups.through(device_id="dev_004", hostgroup=other)])
+        HostGroup.objects.filter(pk="group_001").update(name="Zulu")
+        devices = {d["device_id"]: d for d in self.post().data["resources"]}
+        self.assertEqual([g["name"] for g in devices["dev_004"]["group_info"]], ["Alpha", "Zulu"])
+        self.assertEqual(devices["dev_005"]["group_info"][0]["name"], "Zulu")
+
+    def test_deleted_group_is_skipped(self):
+        # Parca okunduktan sonra, group sorgusundan once silinen group
+        entries = [("dev_000", (None, b'{"device_id":"dev_000"}', ("group_001", "gone")))]
+        groups = [{"id": "group_001", "name": "Production"}]
+        fragment = json.loads(embed(entries, None, groups)[0])
+        self.assertEqual([g["id"] for g in fragment["group_info"]], ["group_001"])
+
+    def test_byte_budget(self):
+        self.post()
+        size = fragment_cache.stats()["bytes"]
+        self.addCleanup(setattr, fragment_cache.entries, "maxbytes", fragment_cache.entries.maxbytes)
+        fragment_cache.entries.maxbytes = size // 2
+        fragment_cache.clear()
+        self.post()
+        stats = fragment_cache.stats()
+        self.assertLessEqual(stats["bytes"], size // 2)
+        self.assertGreater(stats["evictions"], 0)
+
+    def test_stats_endpoint(self):
+        self.post()
+        self.client.force_authenticate(token="token")
+        response = self.client.get("/debug/cache-stats/")
+        self.assertEqual(response.data["fragment_cache"]["size"], 20)
+
+    async def test_async_view(self):
+        await sync_to_async(self.post)()
+        request = AsyncRequestFactory().post(
+            "/devices/entities/", {"ids": self.ids}, content_type="application/json",
+            QUERY_STRING="include=online_state,group_info",
+        )
+        body = json.loads((await async_views.device_entities(request)).content)
+        expected = await sync_to_async(self.uncached)()
+        self.assertEqual(body["resources"], expected["resources"])
+
+
+class SnapshotTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        groups = [make_group("group_001", name="Production"), make_group("group_002", name="Linux Servers")]
+        for i in range(30):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(*groups[:1 + i % 2])
+            if i % 4:
+                DeviceState.objects.create(device=device, state="online" if i % 3 else "offline")
+        self.ids = [f"dev_{i:03d}" for i in range(29, -1, -1)] + ["dev_004", "missing"]
+        snapshot_engine.reset()
+        self.addCleanup(snapshot_engine.reset)
+        self.addCleanup(setattr, snapshot_engine, "enabled", False)
+        self.addCleanup(setattr, snapshot_engine, "min_refresh_interval", snapshot_engine.min_refresh_interval)
+        self.addCleanup(setattr, snapshot_engine, "background", snapshot_engine.background)
+        snapshot_engine.enabled = True
+        snapshot_engine.min_refresh_interval = 0
+        # Test transaction'i baska thread'in baglantisindan gorunmuyor, yukleme istegin thread'inde
+        snapshot_engine.background = False
+
+    def get(self, path, data=None, **params):
+        if data is not None:
+            query = "&".join(f"{k}={v}" for k, v in params.items())
+            response = self.client.post(f"{path}?{query}", data, format="json")
+        else:
+            response = self.client.get(path, params)
+        body = response.json()
+        body["meta"].pop("trace_id")
+        body["meta"].pop("watermark", None)
+        return body
+
+    def orm(self, *args, **kwargs):
+        snapshot_engine.enabled = False
+        try:
+            return self.get(*args, **kwargs)
+        finally:
+            snapshot_engine.enabled = True
+
+    def test_matches_orm(self):
+        ids = {"ids": self.ids}
+        cases = [
+            ("/devices/devices/", None, {"limit": 7, "after": ""}),
+            ("/devices/devices/", None, {"limit": 7, "after": "ZGV2XzAwNg", "total": "approximate"}),
+            ("/devices/devices/", None, {"limit": 50, "after": "ZGV2XzAyOQ", "total": "none"}),
+            ("/devices/entities/", ids, {}),
+            ("/devices/entities/", ids, {"include": "online_state,group_info"}),
+            ("/devices/entities/online-state/", ids, {}),
+        ]
+        for path, data, params in cases:
+            with self.subTest(path=path, params=params):
+                self.assertEqual(self.get(path, data, **params), self.orm(path, data, **params))
+        self.assertEqual(snapshot_engine.stats()["loads"], 1)
+
+    def test_served_from_memory(self):
+        self.get("/devices/devices/")
+        # Sadece snapshot'in tazeligi icin tablo versiyonlari
+        with self.assertNumQueries(1):
+            body = self.get("/devices/entities/", {"ids": self.ids}, include="online_state,group_info")
+        self.assertEqual(len(body["resources"]), 30)
+        self.assertEqual(body["errors"], [{"id": "missing", "message": "Device not found"}])
+
+    def test_refresh_after_write(self):
+        self.get("/devices/devices/")
+        with self.captureOnCommitCallbacks(execute=True):
+            make_device("dev_100")
+        body = self.get("/devices/devices/", limit=500, after="")
+        self.assertEqual(body["meta"]["pagination"]["total"], 31)
+        self.assertEqual(snapshot_engine.stats()["loads"], 2)
+
+    def test_stale_snapshot_falls_back_to_orm(self):
+        snapshot_engine.min_refresh_interval = 3600
+        self.get("/devices/devices/")
+        # update() signal gondermiyor; versiyonu trigger artiriyor
+        DeviceState.objects.filter(device_id="dev_001").update(state="offline")
+        body = self.get("/devices/entities/online-state/", {"ids": ["dev_001"]})
+        self.assertEqual(body["resources"], [{"id": "dev_001", "state": "offline"}])
+        self.assertEqual(snapshot_engine.stats()["loads"], 1)
+        self.assertGreater(snapshot_engine.stats()["fallbacks"], 0)
+
+    def test_bulk_create_is_seen(self):
+        snapshot_engine.min_refresh_interval = 3600
+        self.get("/devices/devices/")
+        Device.objects.bulk_create([build_device("dev_100")])
+        body = self.get("/devices/entities/", {"ids": ["dev_100"]})
+        self.assertEqual([d["device_id"] for d in body["resources"]], ["dev_100"])
+        self.assertEqual(snapshot_engine.stats()["loads"], 1)
+
+    def test_filtered_list_uses_orm(self):
+        self.get("/devices/devices/")
+        with self.assertNumQueries(3):
+            self.get("/devices/devices/", filter="hostname:'host-dev_001'")
+
+    async def test_async_views(self):
+        ids = json.dumps({"ids": self.ids})
+        request = AsyncRequestFactory().post(
+            "/devices/entities/", ids, content_type="application/json", QUERY_STRING="include=group_info",
+        )
+        body = json.loads((await async_views.device_entities(request)).content)
+        expected = await sync_to_async(self.orm)("/devices/entities/", {"ids": self.ids}, include="group_info")
+        self.assertEqual(body["resources"], expected["resources"])
+        self.assertEqual(snapshot_engine.stats()["loads"], 1)
+
+    def test_background_load(self):
+        snapshot_engine.background = True
+        versions = current_versions()
+        loaded = mock.Mock(versions=versions, rows=[])
+        release = threading.Event()
+
+        def load():
+            release.wait(5)
+            return loaded
+
+        with mock.patch("api.snapshot.current_versions", return_value=versions), \
+                mock.patch.object(Snapshot, "load", load):
+            thread = snapshot_engine.warm_up()
+            # Yukleme bitmeden istekler beklemeden ORM'e
+            self.assertIsNone(snapshot_engine.get())
+            self.assertIsNone(snapshot_engine.get())
+            release.set()
+            thread.join(5)
+            self.assertIs(snapshot_engine.get(), loaded)
+        self.assertEqual(snapshot_engine.stats()["loads"], 1)
+        self.assertEqual(snapshot_engine.stats()["fallbacks"], 2)
+
+
+class EntityIncludeTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.prod = make_group("group_001", name="Production")
+        self.linux = make_group("group_002", name="Linux Servers")
+        for i in range(20):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(self.prod, *([self.linux] if i % 2 else []))
+            if i != 5:
+                DeviceState.objects.create(device=device, state="offline" if i % 3 else "online")
+        self.ids = [f"dev_{i:03d}" for i in range(20)]
+
+    def post(self, include, ids=None, **params):
+        query = "&".join(f"{k}={v}" for k, v in {"include": include, **params}.items())
+        return self.client.post(f"/devices/entities/?{query}", {"ids": ids or self.ids}, format="json")
+
+    def test_embeds_state_and_groups(self):
+        with self.assertNumQueries(4):
+            response = self.post("online_state,group_info")
+        body = response.json()
+        self.assertEqual(body["meta"]["include"], ["online_state", "group_info"])
+
+        devices = {d["device_id"]: d for d in body["resources"]}
+        self.assertEqual(devices["dev_000"]["online_state"], "online")
+        self.assertEqual(devices["dev_001"]["online_state"], "offline")
+        self.assertIsNone(devices["dev_005"]["online_state"])
+        self.assertEqual([g["name"] for g in devices["dev_001"]["group_info"]], ["Linux Servers", "Production"])
+        self.assertEqual(devices["dev_001"]["group_info"][0], HostGroupSerializer(self.linux).data)
+        self.assertEqual([g["id"] for g in devices["dev_002"]["group_info"]], ["group_001"])
+
+    def test_single_include_and_default(self):
+        with self.assertNumQueries(3):
+            device = self.post("online_state").json()["resources"][0]
+        self.assertIn("online_state", device)
+        self.assertNotIn("group_info", device)
+
+        body = self.client.post("/devices/entities/", {"ids": self.ids}, format="json").json()
+        self.assertNotIn("include", body["meta"])
+        self.assertNotIn("online_state", body["resources"][0])
+
+    def test_stream_matches_regular(self):
+        regular = self.post("online_state,group_info").json()
+        streamed = json.loads(b"".join(self.post("online_state,group_info", stream="true").streaming_content))
+        self.assertEqual(streamed["resources"], regular["resources"])
+        self.assertEqual(streamed["meta"]["include"], regular["meta"]["include"])
+
+    def test_unknown_include(self):
+        response = self.post("online_state,secrets")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("include", response.json())
+
+
+class CompressionTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(50):
+            make_device(f"dev_{i:03d}")
+        self.ids = {"ids": [f"dev_{i:03d}" for i in range(50)]}
+
+    def post(self, path="/devices/entities/", data=None, **headers):
+        return self.client.post(path, data or self.ids, format="json", **headers)
+
+    def test_gzip_round_trip(self):
+        plain = self.post()
+        compressed = self.post(HTTP_ACCEPT_ENCODING="br;q=0, gzip;q=0.8, deflate")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertLess(len(compressed.content), len(plain.content) / 4)
+        self.assertEqual(json.loads(gzip.decompress(compressed.content))["resources"], plain.json()["resources"])
+
+    def test_negotiation(self):
+        self.assertFalse(self.post().has_header("Content-Encoding"))
+        self.assertFalse(self.post(HTTP_ACCEPT_ENCODING="gzip;q=0").has_header("Content-Encoding"))
+        self.assertFalse(self.post(HTTP_ACCEPT_ENCODING="identity").has_header("Content-Encoding"))
+        self.assertEqual(self.post(HTTP_ACCEPT_ENCODING="*")["Content-Encoding"], "gzip")
+
+    def test_small_responses_not_compressed(self):
+        response = self.post(data={"ids": ["dev_000"]}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.json()["resources"][0]["device_id"], "dev_000")
+
+    def test_streaming_response(self):
+        plain = json.loads(b"".join(self.post("/devices/entities/?stream=true").streaming_content))
+        response = self.post("/devices/entities/?stream=true", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        body = json.loads(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(body["resources"], plain["resources"])
+
+    async def test_async_streaming_response(self):
+        async def chunks():
+            for i in range(100):
+                yield f'{{"chunk": {i}}}\n'.encode()
+
+        middleware = CompressionMiddleware(lambda request: None)
+        request = AsyncRequestFactory().get("/", headers={"Accept-Encoding": "gzip"})
+        response = middleware.process_response(request, StreamingHttpResponse(chunks()))
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(gzip.decompress(body).count(b"chunk"), 100)
+
+
+class RecordRendererTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(30):
+            device = make_device(f"dev_{i:03d}")
+            DeviceState.objects.create(device=device, state="online")
+        self.ids = {"ids": [f"dev_{i:03d}" for i in range(30)] + ["missing"]}
+
+    def decode(self, media_type, body):
+        # Artimli decoder'lar client tarafinda test ediliyor (client/tests); burada sadece format
+        if media_type == "application/x-msgpack":
+            records = list(msgpack.Unpacker(BytesIO(body), raw=False))
+        else:
+            records = [json.loads(line) for line in body.splitlines()]
+        trailer = records.pop()
+        return {**trailer, "resources": records}
+
+    def body(self, response):
+        if response.streaming:
+            return b"".join(response.streaming_content)
+        return response.content
+
+    def test_formats_match_json(self):
+        expected = self.client.post("/devices/entities/", self.ids, format="json").json()
+        for media_type in ("application/x-ndjson", "application/x-msgpack"):
+            for query in ("", "?stream=true"):
+                with self.subTest(media_type=media_type, query=query):
+                    response = self.client.post(
+                        f"/devices/entities/{query}", self.ids, format="json", HTTP_ACCEPT=media_type,
+                    )
+                    self.assertTrue(response["Content-Type"].startswith(media_type))
+                    body = self.decode(media_type, self.body(response))
+                    self.assertEqual(body["resources"], expected["resources"])
+                    self.assertEqual(body["errors"], expected["errors"])
+
+    def test_ndjson_one_record_per_line(self):
+        response = self.client.get("/devices/devices/?limit=10", HTTP_ACCEPT="application/x-ndjson")
+        lines = response.content.splitlines()
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(json.loads(lines[0])["device_id"], "dev_000")
+        self.assertEqual(json.loads(lines[-1])["meta"]["pagination"]["next"], "10")
+
+    def test_unsupported_accept(self):
+        response = self.client.post("/devices/entities/", self.ids, format="json", HTTP_ACCEPT="application/xml")
+        self.assertEqual(response.status_code, 406)
+
+    def test_packb_round_trip(self):
+        # JSON'da olmayan tipler (tarih) JSON cevaptaki gibi string
+        value = {"strings": ["c" * 70000, "türkçe"], "none": None, "date": SEEN}
+        self.assertEqual(msgpack.unpackb(packb(value)), {**value, "date": "2024-01-01T00:00:00Z"})
+
+    async def test_async_views(self):
+        request = AsyncRequestFactory().post(
+            "/devices/entities/", self.ids, content_type="application/json",
+            headers={"Accept": "application/x-msgpack"}, QUERY_STRING="stream=true",
+        )
+        response = await async_views.device_entities(request)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response["Content-Type"], "application/x-msgpack")
+        self.assertEqual(len(self.decode("application/x-msgpack", body)["resources"]), 30)
+
+
+class OnlineStateTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            device = make_device(f"dev_{i:03d}")
+            DeviceState.objects.create(device=device, state="online" if i % 2 else "offline")
+
+    def test_single_query_per_batch(self):
+        ids = [f"dev_{i:03d}" for i in range(20)] + ["missing"]
+        with self.assertNumQueries(1):
+            response = self.client.post("/devices/entities/online-state/", {"ids": ids}, format="json")
+        self.assertEqual(len(response.data["resources"]), 20)
+        self.assertEqual(response.data["resources"][0], {"id": "dev_000", "state": "offline"})
+        self.assertEqual(response.data["errors"], [{"id": "missing", "message": "Device not found"}])
+
+
+class CompiledSerializerParityTests(TestCase):
+    fixtures = ["test_data.json"]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Fixture'da olmayan kenar durumlar: bos IP, grupsuz device, UTC disi timestamp
+        make_device(
+            "dev_edge", external_ip=None, local_ip="2001:db8::1",
+            first_seen=datetime.fromisoformat("2024-05-01T10:30:15.123456+03:00"),
+        )
+
+    def assertParity(self, serializer_class, fast, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        actual = JSONRenderer().render(fast.serialize(list(fast.values(queryset))))
+        self.assertEqual(actual, expected)
+
+    def test_host_groups(self):
+        self.assertParity(HostGroupSerializer, fast_host_group, HostGroup.objects.all())
+
+    def test_device_list(self):
+        self.assertParity(DeviceListSerializer, fast_device_list, Device.objects.order_by("pk"))
+
+    def test_device_detail(self):
+        self.assertTrue(Device.groups.through.objects.exists())
+        self.assertParity(DeviceDetailSerializer, fast_device_detail, Device.objects.order_by("pk"))
+
+    def test_device_state(self):
+        self.assertParity(DeviceStateSerializer, fast_device_state, DeviceState.objects.order_by("pk"))
+
+
+class StreamingResponseTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        group = make_group("group_001")
+        for i in range(25):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(group)
+            DeviceState.objects.create(device=device, state="online")
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_entities_stream_matches_buffered(self):
+        ids = [f"dev_{i:03d}" for i in range(25)] + ["missing"]
+        for url in ("/devices/entities/", "/devices/entities/online-state/"):
+            with self.subTest(url=url):
+                buffered = self.client.post(url, {"ids": ids}, format="json").json()
+                streamed = self.read(self.client.post(f"{url}?stream=true", {"ids": ids}, format="json"))
+                self.assertEqual(streamed["resources"], buffered["resources"])
+                self.assertEqual(streamed["errors"], buffered["errors"])
+
+    def test_entities_stream_serializes_in_chunks(self):
+        ids = [f"dev_{i:03d}" for i in range(25)]
+        with mock.patch("api.views.STREAM_CHUNK_SIZE", 10):
+            response = self.client.post("/devices/entities/?stream=true", {"ids": ids}, format="json")
+            # 1 satir sorgusu + chunk basina 1 group sorgusu
+            with self.assertNumQueries(4):
+                body = self.read(response)
+        self.assertEqual(len(body["resources"]), 25)
+        self.assertEqual(body["resources"][0]["groups"], ["group_001"])
+
+    def test_device_list_stream_pagination(self):
+        response = self.client.get("/devices/devices/", {"stream": "true", "limit": 10, "after": ""})
+        body = self.read(response)
+        self.assertEqual(len(body["resources"]), 10)
+        after = body["meta"]["pagination"]["next"]
+
+        response = self.client.get("/devices/devices/", {"stream": "true", "limit": 1000, "after": after})
+        body = self.read(response)
+        self.assertEqual(body["resources"][0]["device_id"], "dev_010")
+        self.assertEqual(len(body["resources"]), 15)
+        self.assertEqual(body["meta"]["pagination"]["next"], "")
+        self.assertEqual(body["meta"]["pagination"]["limit"], 1000)
+
+    def test_stream_rejects_bad_cursor_before_streaming(self):
+        response = self.client.get("/devices/devices/", {"stream": "true", "after": "%%%"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TokenCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        token_cache.clear()
+        make_device("dev_001")
+        self.application = Application.objects.create(
+            name="Test Client",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_CLIENT_CREDENTIALS,
+        )
+        self.token = self.make_token("token-1", seconds=3600)
+
+    def make_token(self, value, seconds):
+        return AccessToken.objects.create(
+            token=value, application=self.application, scope="read",
+            expires=dj_timezone.now() + timedelta(seconds=seconds),
+        )
+
+    def test_cached_token_skips_database(self):
+        before = token_cache.stats()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer token-1")
+        self.client.get("/devices/devices/")
+        # Tablo versiyonu + sayfa, token sorgusu yok
+        with self.assertNumQueries(2):
+            response = self.client.get("/devices/devices/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.auth, self.token)
+        # Middleware (client id) peek ile bakiyor, istek basina tek lookup sayiliyor
+        stats = token_cache.stats()
+        self.assertEqual((stats["hits"] - before["hits"], stats["misses"] - before["misses"]), (1, 1))
+
+    def test_revoked_token_is_evicted(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer token-1")
+        self.client.get("/devices/devices/")
+        self.assertEqual(len(token_cache), 1)
+
+        self.token.revoke()
+        self.assertEqual(len(token_cache), 0)
+        response = self.client.get("/devices/devices/")
+        self.assertIsNone(response.wsgi_request.auth)
+
+    def test_entry_does_not_outlive_token(self):
+        self.make_token("token-short", seconds=1)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer token-short")
+        self.client.get("/devices/devices/")
+        self.assertEqual(len(token_cache), 1)
+
+        with mock.patch("api.lru.time.time", return_value=dj_timezone.now().timestamp() + 5):
+            self.assertIsNone(token_cache.get("token-short"))
+        self.assertEqual(token_cache.stats()["expirations"], 1)
+
+    async def test_async_view_counts_one_lookup(self):
+        factory = AsyncRequestFactory()
+        before = token_cache.stats()
+        for _ in range(2):
+            response = await async_views.device_list(factory.get("/devices/devices/", headers={"Authorization": "Bearer token-1"}))
+            self.assertEqual(response.status_code, 200)
+        stats = token_cache.stats()
+        self.assertEqual((stats["hits"] - before["hits"], stats["misses"] - before["misses"]), (1, 1))
+
+    def test_stats_endpoint(self):
+        self.assertEqual(self.client.get("/debug/cache-stats/").status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer token-1")
+        response = self.client.get("/debug/cache-stats/")
+        self.assertIn("hit_rate", response.data["token_cache"])
+
+
+class RateLimitTests(APITestCase):
+
+    def test_bucket_count_is_exact_under_threads(self):
+        bucket = TokenBucket(rate=0, burst=1000)
+        allowed = []
+        start = threading.Barrier(20)
+
+        def worker():
+            start.wait()
+            allowed.append(sum(bucket.consume()[0] for _ in range(100)))
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(allowed), 1000)
+        self.assertEqual(bucket.peek()[0], 0)
+
+    def test_limiter_shares_one_bucket_per_key_under_threads(self):
+        shared = RateLimiter(rate=0, burst=500)
+        allowed = []
+        start = threading.Barrier(10)
+
+        def worker():
+            start.wait()
+            allowed.append(sum(shared.consume("client:abc")[0] for _ in range(100)))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(allowed), 500)
+
+    def test_bucket_refills_at_rate(self):
+        with mock.patch("api.ratelimit.time.monotonic", return_value=1000.0):
+            bucket = TokenBucket(rate=2, burst=4)
+            for _ in range(4):
+                self.assertTrue(bucket.consume()[0])
+            allowed, remaining, wait = bucket.consume()
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 0.5)
+        with mock.patch("api.ratelimit.time.monotonic", return_value=1001.0):
+            self.assertEqual(bucket.peek()[0], 2)
+
+    def test_headers_and_429(self):
+        with mock.patch.object(limiter, "burst", 3):
+            remaining = [
+                self.client.get("/devices/devices/")["X-RateLimit-Remaining"] for _ in range(3)
+            ]
+            response = self.client.get("/devices/devices/")
+        self.assertEqual(remaining, ["2", "1", "0"])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("X-RateLimit-RetryAfter", response)
+
+    def test_clients_do_not_share_buckets(self):
+        with mock.patch.object(limiter, "burst", 1):
+            self.client.get("/devices/devices/", REMOTE_ADDR="10.0.0.1")
+            blocked = self.client.get("/devices/devices/", REMOTE_ADDR="10.0.0.1")
+            other = self.client.get("/devices/devices/", REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(blocked.status_code, 429)
+        self.assertEqual(other.status_code, 200)
+
+    def test_rate_limit_hit_test_mode(self):
+        response = self.client.get("/devices/devices/", {"test_mode": "rate_limit_hit"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+
+    def test_disabled_limiter_does_not_count(self):
+        with mock.patch.object(limiter, "burst", 1), mock.patch.object(limiter, "enabled", False):
+            statuses = {self.client.get("/devices/devices/").status_code for _ in range(5)}
+            test_mode = self.client.get("/devices/devices/", {"test_mode": "rate_limit_hit"})
+        self.assertEqual(statuses, {200})
+        self.assertEqual(test_mode.status_code, 429)
+
+
+class FaultProfileTests(APITestCase):
+
+    def sample(self, profile, n=20000):
+        return sorted(profile.decide()[1] for _ in range(n))
+
+    def test_latency_distributions(self):
+        self.assertEqual(set(self.sample(FaultProfile("p", latency={"fixed": 0.2}), 10)), {0.2})
+
+        uniform = self.sample(FaultProfile("p", latency={"uniform": [0.1, 0.3]}, seed=1))
+        self.assertGreaterEqual(uniform[0], 0.1)
+        self.assertLessEqual(uniform[-1], 0.3)
+
+        lognormal = self.sample(FaultProfile("p", latency={"lognormal": {"p50": 0.05, "p99": 0.8}}, seed=1))
+        self.assertAlmostEqual(lognormal[len(lognormal) // 2], 0.05, delta=0.005)
+        self.assertAlmostEqual(lognormal[int(len(lognormal) * 0.99)], 0.8, delta=0.15)
+
+        capped = self.sample(FaultProfile("p", latency={"lognormal": {"p50": 0.05, "p99": 0.8}, "max": 0.1}, seed=1))
+        self.assertEqual(capped[-1], 0.1)
+
+    def test_invalid_profiles(self):
+        for spec in (
+            {"latency": {"lognormal": {"p50": 0.5, "p99": 0.1}}},
+            {"latency": {"lognormal": {"p50": 0.5}}},
+            {"latency": {"uniform": [1, 0]}},
+            {"latency": {"fixed": 1, "uniform": [0, 1]}},
+            {"errors": {500: 0.6}, "rate_limit": 0.5},
+            {"bursts": {"every": 1, "duration": 2}},
+            {"timeout": 1},
+        ):
+            with self.subTest(spec=spec), self.assertRaises(FaultProfileError):
+                FaultProfile.from_spec("p", spec)
+
+    def test_error_rates(self):
+        profile = FaultProfile("p", errors={500: 0.1, 503: 0.2}, rate_limit=0.05, seed=7)
+        statuses = [profile.decide()[0] for _ in range(20000)]
+        for status, rate in ((500, 0.1), (503, 0.2), (429, 0.05), (None, 0.65)):
+            self.assertAlmostEqual(statuses.count(status) / len(statuses), rate, delta=0.015)
+
+    def test_bursts(self):
+        now = [100.0]
+        profile = FaultProfile("p", bursts={"every": 10, "duration": 2}, clock=lambda: now[0])
+        decisions = []
+        for offset in (0, 1.5, 2, 9.9, 10.5, 12):
+            now[0] = 100 + offset
+            decisions.append(profile.decide())
+        self.assertEqual([status for status, _, _ in decisions], [429, 429, None, None, 429, None])
+        self.assertEqual(decisions[1][2], 0.5)
+
+    def get(self, **kwargs):
+        return self.client.get("/devices/host-groups/", **kwargs)
+
+    def test_selection(self):
+        register = {"always_503": FaultProfile("always_503", errors={503: 1.0})}
+        with mock.patch.dict(faults.profiles, register):
+            self.assertEqual(self.get(data={"fault_profile": "always_503"}).status_code, 503)
+            self.assertEqual(self.get(HTTP_X_FAULT_PROFILE="always_503").status_code, 503)
+            self.assertEqual(self.get(data={"fault_profile": "nope"}).status_code, 400)
+            self.assertEqual(self.get().status_code, 200)
+
+            with mock.patch.object(faults, "default_profile", "always_503"):
+                response = self.get()
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response.json()["meta"]["error"], "Service Unavailable")
+                self.assertIn("X-RateLimit-RetryAfter", response)
+                self.assertEqual(self.get(data={"fault_profile": "none"}).status_code, 200)
+                self.assertEqual(self.get(data={"test_mode": "rate_limit_hit"}).status_code, 429)
+
+    def test_burst_retry_after(self):
+        burst = FaultProfile("burst", bursts={"every": 100, "duration": 30})
+        with mock.patch.dict(faults.profiles, {"burst": burst}):
+            response = self.get(data={"fault_profile": "burst"})
+            after = self.get()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["X-RateLimit-RetryAfter"]) - time.time(), 25)
+        # Burst bucket'i bosaltmiyor
+        self.assertEqual(after.status_code, 200)
+
+
+class AsyncViewTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        group = make_group("group_001")
+        for i in range(12):
+            device = make_device(f"dev_{i:03d}")
+            device.groups.add(group)
+            DeviceState.objects.create(device=device, state="online")
+
+    async def call(self, view, method, path, data=None, **params):
+        factory = AsyncRequestFactory()
+        if method == "post":
+            request = factory.post(path, data, content_type="application/json", QUERY_STRING="&".join(
+                f"{k}={v}" for k, v in params.items()
+            ))
+        else:
+            request = factory.get(path, params)
+        response = await view(request)
+        if response.streaming:
+            return json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+        return json.loads(response.content)
+
+    def sync_call(self, method, path, data=None, **params):
+        if method == "post":
+            query = "&".join(f"{k}={v}" for k, v in params.items())
+            response = self.client.post(f"{path}?{query}", data, format="json")
+        else:
+            response = self.client.get(path, params)
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))
+        return response.json()
+
+    async def test_matches_sync_views(self):
+        ids = {"ids": [f"dev_{i:03d}" for i in range(12)] + ["missing"]}
+        cases = [
+            (async_views.host_groups, "get", "/devices/host-groups/", None, {}),
+            (async_views.device_list, "get", "/devices/devices/", None, {"limit": 5, "after": ""}),
+            (async_views.device_list, "get", "/devices/devices/", None, {"limit": 5, "offset": 10}),
+            (async_views.device_entities, "post", "/devices/entities/", ids, {}),
+            (async_views.online_state, "post", "/devices/entities/online-state/", ids, {}),
+            (async_views.device_list, "get", "/devices/devices/", None, {"stream": "true", "limit": 20}),
+            (async_views.device_entities, "post", "/devices/entities/", ids, {"stream": "true"}),
+            (async_views.device_entities, "post", "/devices/entities/", ids, {"include": "online_state,group_info"}),
+            (async_views.device_entities, "post", "/devices/entities/", ids,
+             {"include": "group_info,online_state", "stream": "true"}),
+        ]
+        for view, method, path, data, params in cases:
+            with self.subTest(path=path, params=params):
+                actual = await self.call(view, method, path, data, **params)
+                expected = await sync_to_async(self.sync_call)(method, path, data, **params)
+                for body in (actual, expected):
+                    body["meta"].pop("trace_id")
+                    body["meta"].pop("watermark", None)
+                self.assertEqual(actual, expected)
+
+    async def test_bad_cursor(self):
+        factory = AsyncRequestFactory()
+        response = await async_views.device_list(factory.get("/devices/devices/", {"after": "%%%"}))
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncMiddlewareTests(APITestCase):
+
+    async def test_slow_requests_do_not_block_each_other(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = RateLimitMiddleware(view)
+        factory = AsyncRequestFactory()
+        requests = []
+        for i in range(2000):
+            request = factory.get("/devices/devices/", {"test_mode": "slow_response"})
+            request.META["REMOTE_ADDR"] = f"10.0.{i // 250}.{i % 250}"
+            requests.append(request)
+        slow = FaultProfile("slow_response", latency={"fixed": 0.5})
+        with mock.patch.dict(faults.profiles, {"slow_response": slow}):
+            start = time.monotonic()
+            responses = await asyncio.gather(*(middleware(request) for request in requests))
+            elapsed = time.monotonic() - start
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        # Sirali bekleseydi 1000 saniye surerdi
+        self.assertLess(elapsed, 5)
+
+
+class LoadtestCommandTests(TransactionTestCase):
+    # Worker thread'leri kendi DB baglantisini aciyor, veri commit edilmis olmali
+
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            make_device(f"dev_{i:03d}")
+
+    def run_loadtest(self, *args):
+        fd, output = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, output)
+        call_command(
+            "loadtest", "--concurrency", "1", "2", "--page-sizes", "2", "--batch-sizes", "3",
+            "--requests", "4", "--warmup", "1", "--output", output, *args, stdout=StringIO(),
+        )
+        with open(output) as f:
+            return json.load(f)
+
+    def test_smoke(self):
+        report = self.run_loadtest()
+        self.assertEqual(report["transport"], "inprocess")
+        self.assertEqual(report["devices"], 5)
+        self.assertEqual(
+            [(r["target"], r["size"], r["concurrency"]) for r in report["results"]],
+            [(target, size, conc) for target, size in (("devices", 2), ("entities", 3), ("online_state", 3))
+             for conc in (1, 2)],
+        )
+        for result in report["results"]:
+            self.assertEqual(set(result), {
+                "target", "size", "concurrency", "requests", "statuses", "rps", "p50_ms", "p95_ms", "p99_ms",
+                "mean_ms", "queries_per_request", "warmup_statuses",
+            })
+            self.assertEqual((result["requests"], result["statuses"]), (4, {"200": 4}))
+            self.assertEqual(sum(result["warmup_statuses"].values()), result["concurrency"])
+            self.assertGreater(result["queries_per_request"], 0)
+
+    def test_warmup_error_does_not_abort(self):
+        real = InProcessTransport.request
+        calls = []
+
+        def flaky(transport, *args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise ConnectionResetError("reset")
+            return real(transport, *args)
+
+        with mock.patch.object(InProcessTransport, "request", flaky):
+            report = self.run_loadtest("--targets", "devices", "--concurrency", "1")
+        result = report["results"][0]
+        self.assertEqual(result["warmup_statuses"], {"error": 1})
+        self.assertEqual(result["statuses"], {"200": 4})
+
+
+class SeedFleetTests(APITestCase):
+
+    def seed(self, *args):
+        call_command("seed_fleet", "--devices", "2500", "--groups", "8", "--chunk-size", "1000", *args, stdout=StringIO())
+        return list(Device.objects.order_by("device_id").values_list("device_id", "hostname", "external_ip", "status"))
+
+    def test_creates_fleet(self):
+        self.seed("--groups-per-device", "1", "3")
+        self.assertEqual(Device.objects.count(), 2500)
+        self.assertEqual(DeviceState.objects.count(), 2500)
+        self.assertEqual(HostGroup.objects.count(), 8)
+        per_device = Device.groups.through.objects.values("device_id").annotate(n=Count("id"))
+        self.assertEqual(len(per_device), 2500)
+        self.assertTrue(all(1 <= row["n"] <= 3 for row in per_device))
+
+    def test_running_server_sees_seed(self):
+        # Sunucu process'inin count cache'i ve ETag'i seed/clear'dan sonra eskimiyor
+        response = self.client.get("/devices/devices/", {"limit": 1})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 0)
+        etag = response["ETag"]
+        self.seed()
+        response = self.client.get("/devices/devices/", {"limit": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 2500)
+
+        make_device("other_001").groups.add(HostGroup.objects.get(id="seed_group_0000"))
+        clear_fleet("seed")
+        response = self.client.get("/devices/devices/", {"limit": 1})
+        self.assertEqual(response.data["meta"]["pagination"]["total"], 1)
+        self.assertEqual(HostGroup.objects.count(), 0)
+
+    def test_same_seed_same_data(self):
+        first = self.seed()
+        self.assertEqual(self.seed("--clear"), first)
+        self.assertNotEqual(self.seed("--clear", "--seed", "1"), first)
+
+    def test_refuses_to_duplicate(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_invalidates_cached_total(self):
+        self.assertEqual(self.client.get("/devices/devices/", {"limit": 1}).json()["meta"]["pagination"]["total"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seed()
+        self.assertEqual(self.client.get("/devices/devices/", {"limit": 1}).json()["meta"]["pagination"]["total"], 2500)
+
+
+class ClientRateLimiterTests(APITestCase):
+    # client/rate_limiter.py (sadece stdlib) gercek RateLimitMiddleware'e karsi; header ya da
+    # dolma davranisi degisirse client/sunucu uyumu burada bozuluyor
+
+    async def test_stays_under_server_limit(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = RateLimitMiddleware(view)
+        factory = AsyncRequestFactory()
+        client_limiter = ClientRateLimiter()
+        statuses = []
+
+        async def worker(count):
+            for _ in range(count):
+                await client_limiter.acquire()
+                request = factory.get("/devices/devices/")
+                request.META["REMOTE_ADDR"] = "10.1.1.1"
+                response = await middleware(request)
+                statuses.append(response.status_code)
+                client_limiter.update(
+                    response.status_code,
+                    int(response["X-RateLimit-Remaining"]),
+                    int(response["X-RateLimit-RetryAfter"]),
+                )
+
+        # Sunucu: saniyede 20, en fazla 40 birikiyor; 20 worker x 6 istek
+        with mock.patch.object(limiter, "enabled", True), mock.patch.object(limiter, "rate", 20), \
+                mock.patch.object(limiter, "burst", 40):
+            start = time.monotonic()
+            await asyncio.gather(*(worker(6) for _ in range(20)))
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(len(statuses), 120)
+        self.assertEqual(set(statuses), {200})
+        # Hiz Remaining artisindan olculdu
+        self.assertAlmostEqual(client_limiter.rate, 20, delta=4)
+        # (120 - 40) / 20 = 4 saniyeden az olamaz; RetryAfter'in saniye yuvarlamasi ve rezerv payi
+        self.assertGreater(elapsed, 3.5)
+        self.assertLess(elapsed, 7)
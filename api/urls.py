@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# ASGI altinda okuma endpoint'leri async view'larla servis edilebiliyor (API_ASYNC_VIEWS)
+read_views = async_views if settings.API_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('health/', views.health),
-    path('devices/host-groups/', views.host_groups),
-    path('devices/devices/', views.device_list),
-    path('devices/entities/', views.device_entities),
-    path('devices/entities/online-state/', views.online_state),
+    path('debug/cache-stats/', views.cache_stats),
+    path('devices/host-groups/', read_views.host_groups),
+    path('devices/devices/', read_views.device_list),
+    path('devices/entities/', read_views.device_entities),
+    path('devices/entities/online-state/', read_views.online_state),
 ]
@@ -1,11 +1,20 @@
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
 from rest_framework.permissions import AllowAny
-from oauth2_provider.contrib.rest_framework import OAuth2Authentication
 from rest_framework.response import Response
 from rest_framework import status
+from .authentication import CachedOAuth2Authentication, HasAccessToken, token_cache
+from .delta import apply_delta
+from .etag import conditional_list, device_list_models
+from .fql import filter_queryset
+from .fragments import FragmentResponse, device_fragments, fragment_cache
+from .includes import get_includes, with_includes
+from .lookup import fetch_chunks, get_ids, lookup
 from .paginators import CustomPagination
+from .renderers import ENTITY_RENDERERS
 from .models import HostGroup, Device, DeviceState
-from .serializers import HostGroupSerializer, DeviceListSerializer, DeviceDetailSerializer, DeviceStateSerializer   
+from .serializers import fast_host_group, fast_device_list, fast_device_detail, fast_device_state
+from .snapshot import engine as snapshot_engine, list_supported
+from .streaming import STREAM_CHUNK_SIZE, wants_stream, serialize_chunks, streaming_response
 import uuid
 
 
@@ -15,7 +24,18 @@ def health(request):
     return Response({"message: Alive"},status = status.HTTP_200_OK)
 
 @api_view(["GET"])
-@authentication_classes([OAuth2Authentication])
+@authentication_classes([CachedOAuth2Authentication])
+@permission_classes([HasAccessToken])
+def cache_stats(request):
+    return Response({
+        "token_cache": token_cache.stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "snapshot": snapshot_engine.stats(),
+    })
+
+@conditional_list((HostGroup,))
+@api_view(["GET"])
+@authentication_classes([CachedOAuth2Authentication])
 @permission_classes([]) 
 def host_groups(request):
     limit = request.query_params.get("limit")
@@ -23,79 +43,147 @@ def host_groups(request):
     
     paginator = CustomPagination()
 
-    hosts = HostGroup.objects.all()
+    hosts = fast_host_group.values(HostGroup.objects.all())
     result = paginator.paginate_queryset(hosts, request)
-    serializer = HostGroupSerializer(result, many = True)
 
-    return paginator.get_paginated_response(serializer.data)
+    return paginator.get_paginated_response(fast_host_group.serialize(result))
 
     
+@conditional_list(device_list_models)
 @api_view(["GET"])
-@authentication_classes([OAuth2Authentication])
+@renderer_classes(ENTITY_RENDERERS)
+@authentication_classes([CachedOAuth2Authentication])
 @permission_classes([]) 
 def device_list(request):
     limit = request.query_params.get("limit")
     offset = request.query_params.get("offset")
 
     paginator = CustomPagination()
-    devices = Device.objects.all()
-    result = paginator.paginate_queryset(devices, request)
-    serializer = DeviceListSerializer(result, many = True)
+    devices = apply_delta(paginator, filter_queryset(Device.objects.all(), request), request)
+    devices = fast_device_list.values(devices)
 
-    return paginator.get_paginated_response(serializer.data)
+    if wants_stream(request):
+        rows = paginator.stream_page(devices, request, STREAM_CHUNK_SIZE)
+        return streaming_response(
+            serialize_chunks(rows, fast_device_list, STREAM_CHUNK_SIZE),
+            lambda: (paginator.get_meta(), None),
+            request.accepted_renderer,
+        )
+
+    snapshot = snapshot_engine.get() if list_supported(request) else None
+    if snapshot is not None:
+        result = snapshot.paginate(paginator, request)
+    else:
+        result = paginator.paginate_queryset(devices, request)
+
+    return paginator.get_paginated_response(fast_device_list.serialize(result))
 
 @api_view(["POST"])
-@authentication_classes([OAuth2Authentication])
+@renderer_classes(ENTITY_RENDERERS)
+@authentication_classes([CachedOAuth2Authentication])
 @permission_classes([]) 
 def device_entities(request):
-    ids = request.data.get('ids', [])
+    ids = get_ids(request)
+    includes = get_includes(request)
+    serializer = with_includes(fast_device_detail, includes)
     
-    devices = Device.objects.filter(device_id__in=ids)
-    found_ids = set(devices.values_list('device_id', flat=True))
-    missing_ids = set(ids) - found_ids
+    queryset = fast_device_detail.values(Device.objects.all())
     
-    errors = None
-    if missing_ids:
-        errors = []
-        for id in missing_ids:
-            errors.append({"id": id, "message": "Device not found"}) 
-   
-    serializer = DeviceDetailSerializer(devices, many=True)
+    if wants_stream(request):
+        return stream_entities(queryset, ids, serializer, request.accepted_renderer, includes)
+    
+    snapshot = snapshot_engine.get()
+    if snapshot is not None:
+        resources, found_ids = snapshot.device_entities(ids, includes)
+        return Response({
+            "meta": entity_meta(includes),
+            "resources": resources,
+            "errors": missing_errors(ids, found_ids)
+        })
+    
+    if fragment_cache.enabled:
+        # Sicak device'lar cache'teki JSON parcalarindan, serializer calismadan
+        fragments, found_ids = device_fragments(ids, includes)
+        return FragmentResponse(entity_meta(includes), fragments, missing_errors(ids, found_ids))
+    
+    # Group'lar tek sorguda geliyor, parca (API_LOOKUP_CHUNK_SIZE) basina 2 sorgu (+ include basina 1)
+    resources, found_ids = lookup(queryset, ids, serializer)
     
     return Response({
-        "meta": {
-            "query_time": 0.5,
-            "trace_id": str(uuid.uuid4())
-        },
-        "resources": serializer.data,
-        "errors": errors
+        "meta": entity_meta(includes),
+        "resources": resources,
+        "errors": missing_errors(ids, found_ids)
     })
 
 
 
 @api_view(["POST"])
-@authentication_classes([OAuth2Authentication])
+@renderer_classes(ENTITY_RENDERERS)
+@authentication_classes([CachedOAuth2Authentication])
 @permission_classes([]) 
 def online_state(request):
-    ids = request.data.get("ids",[])
+    ids = get_ids(request)
+    
+    queryset = fast_device_state.values(DeviceState.objects.all())
     
-    devices = DeviceState.objects.all().filter(device_id__in = ids)
-    found_ids = set(devices.values_list('device_id', flat=True))
-    missing_ids = set(ids) - found_ids
+    if wants_stream(request):
+        return stream_entities(queryset, ids, fast_device_state, request.accepted_renderer)
+    
+    snapshot = snapshot_engine.get()
+    if snapshot is not None:
+        resources, found_ids = snapshot.online_state(ids)
+        return Response({
+            "meta": entity_meta(),
+            "resources": resources,
+            "errors": missing_errors(ids, found_ids)
+        })
+    
+    # Parca basina tek sorgu, primary key (device_id) index'i uzerinden; Device satirina hic gitmiyoruz
+    resources, found_ids = lookup(queryset, ids, fast_device_state)
+    
+    return Response({
+        "meta": entity_meta(),
+        "resources": resources,
+        "errors": missing_errors(ids, found_ids)
+    })
+
+
+def entity_meta(includes=()):
+    meta = {
+        "query_time": 0.5,
+        "trace_id": str(uuid.uuid4())
+    }
+    # Client include desteklendigini buradan anliyor
+    if includes:
+        meta["include"] = list(includes)
+    return meta
+
+
+def missing_errors(ids, found_ids):
+    # ids tekrarsiz (get_ids), hatalar istekteki sirada
+    missing_ids = [id for id in ids if id not in found_ids]
     
     errors = None
     if missing_ids:
         errors = []
         for id in missing_ids:
-            errors.append({"id": id, "message": "Device not found"}) 
-   
-    serializer = DeviceStateSerializer(devices, many=True)
+            errors.append({"id": id, "message": "Device not found"})
+    return errors
+
+
+def stream_entities(queryset, ids, serializer, renderer=None, includes=()):
+    # Bulunan id'leri sayip sonunda eksikleri errors'a yaziyoruz, satirlarin kendisini tutmuyoruz
+    found_ids = set()
     
-    return Response({
-        "meta": {
-            "query_time": 0.5,
-            "trace_id": str(uuid.uuid4())
-        },
-        "resources": serializer.data,
-        "errors": errors
-    })
\ No newline at end of file
+    def rows():
+        # Bellekte ayni anda tek lookup parcasi; serialize_chunks onu STREAM_CHUNK_SIZE'lik parcalara boluyor
+        for chunk in fetch_chunks(queryset, ids):
+            for row in chunk:
+                found_ids.add(row[0])
+                yield row
+    
+    return streaming_response(
+        serialize_chunks(rows(), serializer, STREAM_CHUNK_SIZE),
+        lambda: (entity_meta(includes), missing_errors(ids, found_ids)),
+        renderer,
+    )
@@ -0,0 +1,238 @@
+"""
+Client script'lerinin (async_client.py, async_client_memory_efficient.py) ortak HTTP katmani.
+Tek bir ClientSession ve ayarli TCPConnector: baglantilar havuzda tutuluyor (keep-alive),
+DNS cevabi cache'leniyor, her istek icin yeni TCP baglantisi acilmiyor.
+GET / POST ayni yoldan (request) gidiyor; header'lar token alininca bir kere kuruluyor.
+"""
+import asyncio
+import json
+import os
+import time
+
+import aiohttp
+
+try:
+    from .decoders import accept_header, read_body
+    from .rate_limiter import RateLimiter
+    from .retry import CLIENT_ERROR, OK, CircuitBreaker, RetryPolicy, classify, is_idempotent
+except ImportError:  # client/ icinden script olarak (python async_client.py)
+    from decoders import accept_header, read_body
+    from rate_limiter import RateLimiter
+    from retry import CLIENT_ERROR, OK, CircuitBreaker, RetryPolicy, classify, is_idempotent
+
+
+# Havuzdaki toplam baglanti; ayni anda en fazla bu kadar istek yolda
+POOL_SIZE = int(os.getenv("POOL_SIZE", "100"))
+# Host basina sinir, 0 = sadece POOL_SIZE
+POOL_SIZE_PER_HOST = int(os.getenv("POOL_SIZE_PER_HOST", "0"))
+KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
+CONNECT_TIMEOUT = 10
+# Govde parcalari arasi en fazla bekleme; toplam sure sinirsiz (stream edilen buyuk cevaplar)
+READ_TIMEOUT = 60
+
+# Liste sayfalari icin If-None-Match; degismeyen sayfa 304 ile geliyor, govde cache'ten
+ETAG_CACHE_FILE = os.getenv("ETAG_CACHE_FILE", "etag_cache.json")
+ETAG_CACHE_SIZE = 1000
+# json | ndjson | msgpack; ndjson/msgpack'te kayitlar govde gelirken parse ediliyor (decoders.py)
+RESPONSE_FORMAT = os.getenv("RESPONSE_FORMAT", "json")
+
+
+def make_connector(pool_size=POOL_SIZE, per_host=POOL_SIZE_PER_HOST, keepalive=True):
+    if not keepalive:
+        # Karsilastirma icin (benchmark_pool.py): her istek yeni baglanti
+        return aiohttp.TCPConnector(limit=pool_size, limit_per_host=per_host, force_close=True)
+    return aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL,
+    )
+
+
+def make_timeout():
+    # connect havuzdan baglanti beklemeyi de sayiyor; havuz doluyken kuyruktaki istekler
+    # zaman asimina dusmesin diye sadece TCP baglantisi (sock_connect) sinirli
+    return aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+
+
+def load_watermark(path):
+    # Delta sync state'i (changed_since); dosya yoksa ya da bozuksa full sync
+    try:
+        with open(path) as f:
+            return json.load(f).get("watermark")
+    except (OSError, ValueError):
+        return None
+
+
+def save_watermark(path, watermark):
+    # Yarim yazilmis dosya bir sonraki calismayi bozmasin
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump({"watermark": watermark}, f)
+    os.replace(tmp_file, path)
+
+
+def etag_cache_key(url, params):
+    return url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+
+
+class APIClient:
+    """
+    async with APIClient(BASE_URL) as client:
+        await client.authenticate(CLIENT_ID, CLIENT_SECRET)
+        result = await client.request("GET", url, params=...)
+
+    request() cevabin govdesini (decoders.read_body) ya da basarisizsa None donuyor.
+    Rate limiter, ETag cache'i, tekrar deneme butcesi ve circuit breaker client'ta,
+    butun istekler paylasiyor.
+    """
+
+    def __init__(self, base_url, pool_size=POOL_SIZE, per_host=POOL_SIZE_PER_HOST, keepalive=True,
+                 response_format=RESPONSE_FORMAT, etag_cache_file=ETAG_CACHE_FILE,
+                 retry_policy=None, breaker=None):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.per_host = per_host
+        self.keepalive = keepalive
+        self.etag_cache_file = etag_cache_file
+        self.etag_cache = {}
+        self.token = None
+        # Butun istekler ayni bucket tahminini paylasiyor (rate_limiter.py)
+        self.rate_limiter = RateLimiter()
+        # Ne zaman, kac kere tekrar denenecegi ve API cokmusken isteklerin kesilmesi (retry.py)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.session = None
+        # Her HTTP cevabi icin observer(status, gecikme, X-RateLimit-Remaining); scheduler.AIMDLimit
+        self.observers = []
+        # Accept-Encoding'i (gzip, deflate; brotli kuruluysa br) aiohttp ekliyor ve cevabi kendisi aciyor
+        self.headers = {
+            "Accept": accept_header(response_format),
+        }
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=make_connector(self.pool_size, self.per_host, self.keepalive),
+            timeout=make_timeout(),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def authenticate(self, client_id, client_secret):
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": client_id,
+            "client_secret": client_secret,
+        }
+        async with self.session.post(f"{self.base_url}/oauth2/token/", data=data) as response:
+            if response.status != 200:
+                print(f"Token alinamadi: {response.status}")
+                return None
+            result = await response.json()
+        self.token = result["access_token"]
+        self.headers["Authorization"] = f"Bearer {self.token}"
+        print("Token alindi")
+        return self.token
+
+    def update_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        retry_after = response.headers.get("X-RateLimit-RetryAfter")
+        remaining = int(remaining) if remaining is not None else None
+        self.rate_limiter.update(response.status, remaining, int(retry_after) if retry_after is not None else None)
+        return remaining
+
+    def notify(self, status, latency, remaining=None):
+        for observer in self.observers:
+            observer(status, latency, remaining)
+
+    async def request(self, method, url, params=None, json_data=None, cache=False, idempotent=None):
+        """
+        GET ve POST ayni yol. cache=True ise (sadece GET) If-None-Match gonderiliyor,
+        304'te govde ETag cache'inden. Hatalarda retry_policy'ye gore jitter'li bekleyip
+        tekrar deniyor. idempotent verilmezse metoddan (GET evet, POST hayir); sadece okuyan
+        POST'lar (entities) idempotent=True ile cagrilmali, yoksa 5xx / timeout sonrasi
+        tekrar denenmiyor. Devre aciksa istek gonderilmeden None donuyor.
+        """
+        if idempotent is None:
+            idempotent = is_idempotent(method)
+        cache_key = etag_cache_key(url, params) if cache and method == "GET" else None
+        headers = self.headers
+        if cache_key in self.etag_cache:
+            headers = {**headers, "If-None-Match": self.etag_cache[cache_key]["etag"]}
+
+        self.retry_policy.budget.record_request()
+        delay = None
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                print(f"Devre acik, istek gonderilmedi: {method} {url}")
+                return None
+            try:
+                outcome, result, error = await self._send(method, url, params, json_data, headers, cache_key)
+            except asyncio.CancelledError:
+                self.breaker.cancel_probe()
+                raise
+            self.breaker.record(outcome)
+            if outcome == OK:
+                return result
+
+            if not self.retry_policy.should_retry(outcome, idempotent, attempt):
+                print(f"Hata: {error}")
+                return None
+            attempt += 1
+            delay = self.retry_policy.backoff(delay)
+            print(f"{error}, {delay:.1f} sn bekle")
+            await asyncio.sleep(delay)
+
+    async def _send(self, method, url, params, json_data, headers, cache_key):
+        # Tek deneme; (classify sonucu, govde, hata mesaji)
+        await self.rate_limiter.acquire()
+        start = time.perf_counter()
+        answered = False
+        try:
+            async with self.session.request(method, url, params=params, json=json_data, headers=headers) as response:
+                remaining = self.update_rate_limit(response)
+                answered = True
+                # Gecikme header'lar gelene kadar; govdenin okunmasi sunucunun yukunu gostermiyor
+                self.notify(response.status, time.perf_counter() - start, remaining)
+
+                if response.status == 304 and cache_key in self.etag_cache:
+                    return OK, self.etag_cache[cache_key]["body"], None
+                if response.status == 200:
+                    result = await read_body(response)
+                    if cache_key and "ETag" in response.headers:
+                        self.etag_cache.pop(cache_key, None)
+                        self.etag_cache[cache_key] = {"etag": response.headers["ETag"], "body": result}
+                    return OK, result, None
+                outcome = classify(response.status)
+                # 304 cache'te yoksa ya da beklenmeyen 2xx / 3xx: basarisiz ama tekrar denenmiyor
+                return outcome if outcome != OK else CLIENT_ERROR, None, f"ERROR {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.notify(None, time.perf_counter() - start)
+            return classify(error=e), None, f"ERROR {e!r}"
+        except ValueError as e:
+            # Govde bozuk geldi, baglanti saglam
+            return classify(error=e), None, f"ERROR {e}"
+        finally:
+            # Cevap gelmeden biten istek (hata ya da iptal, CancelledError) token'ini birakiyor
+            if not answered:
+                self.rate_limiter.release()
+
+    def load_etag_cache(self):
+        try:
+            with open(self.etag_cache_file) as f:
+                self.etag_cache = json.load(f)
+        except (OSError, ValueError):
+            self.etag_cache = {}
+
+    def save_etag_cache(self):
+        # En eski girdiler atiliyor, dosya sinirsiz buyumesin
+        entries = list(self.etag_cache.items())[-ETAG_CACHE_SIZE:]
+        tmp_file = f"{self.etag_cache_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(dict(entries), f)
+        os.replace(tmp_file, self.etag_cache_file)
@@ -1,10 +1,11 @@
 from dotenv import load_dotenv
 import asyncio
-import aiohttp
 import os
 import time
 from elasticsearch import AsyncElasticsearch
 import logging
+from api_client import APIClient, load_watermark, save_watermark
+from scheduler import Scheduler, batched
 
 load_dotenv()
 
@@ -12,201 +13,114 @@ BASE_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 ES_URL = os.getenv("ES_URL", "http://localhost:9200")
-
-token = None
-remaining_requests = 5000
-retry_after_time = 0
+ENTITY_INCLUDES = "online_state,group_info"
+# Delta sync: son basarili calismanin watermark'i burada, FULL_SYNC=1 hepsini tekrar ceker
+SYNC_STATE_FILE = os.getenv("SYNC_STATE_FILE", "sync_state.json")
+FULL_SYNC = os.getenv("FULL_SYNC", "0") == "1"
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def get_auth_token(session):
-    global token
-    
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-    }
-    
-    async with session.post(f"{BASE_URL}/oauth2/token/", data=data) as response:
-        if response.status == 200:
-            result = await response.json()
-            token = result["access_token"]
-            print("Token alindi")
-            return token
-        else:
-            print(f"Token alinamadi: {response.status}")
-            return None
-
-
-async def check_rate_limit():
-    global remaining_requests, retry_after_time
-    
-    if remaining_requests < 10:
-        wait = retry_after_time - time.time()
-        if wait > 0:
-            print(f"Rate limit! {wait:.0f} saniye bekleniyor")
-            await asyncio.sleep(wait)
-            remaining_requests = 5000
-
-
-async def make_request(session, method, url, params=None, json_data=None, retry_count=0):
-    global remaining_requests, retry_after_time
-    
-    await check_rate_limit()
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    try:
-        if method == "GET":
-            async with session.get(url, params=params, headers=headers) as response:
-                if "X-RateLimit-Remaining" in response.headers:
-                    remaining_requests = int(response.headers["X-RateLimit-Remaining"])
-                if "X-RateLimit-RetryAfter" in response.headers:
-                    retry_after_time = int(response.headers["X-RateLimit-RetryAfter"])
-                
-                if response.status == 200:
-                    return await response.json()
-                elif response.status in [429, 500, 502, 503, 504]:
-                    if retry_count < 3:
-                        wait_time = (2 ** retry_count)
-                        print(f"ERROR {response.status}, {wait_time} sn bekle")
-                        await asyncio.sleep(wait_time)
-                        return await make_request(session, method, url, params, json_data, retry_count + 1)
-                    else:
-                        print(f"Hata: {response.status}")
-                        return None
-                else:
-                    print(f"Hata: {response.status}")
-                    return None
-        
-        elif method == "POST":
-            async with session.post(url, json=json_data, headers=headers) as response:
-                if "X-RateLimit-Remaining" in response.headers:
-                    remaining_requests = int(response.headers["X-RateLimit-Remaining"])
-                if "X-RateLimit-RetryAfter" in response.headers:
-                    retry_after_time = int(response.headers["X-RateLimit-RetryAfter"])
-                
-                if response.status == 200:
-                    return await response.json()
-                elif response.status in [429, 500, 502, 503, 504]:
-                    if retry_count < 3:
-                        wait_time = (2 ** retry_count)
-                        print(f"ERROR {response.status}, {wait_time} sn bekle")
-                        await asyncio.sleep(wait_time)
-                        return await make_request(session, method, url, params, json_data, retry_count + 1)
-                    else:
-                        print(f"Hata: {response.status}")
-                        return None
-                else:
-                    print(f"Hata: {response.status}")
-                    return None
-    
-    except Exception as e:
-        if retry_count < 3:
-            wait_time = (2 ** retry_count)
-            await asyncio.sleep(wait_time)
-            return await make_request(session, method, url, params, json_data, retry_count + 1)
-        else:
-            print(f"ERROR {e}")
-            return None
-
-
-async def get_host_groups(session):
+async def get_host_groups(client):
     print("Host groups cekiliyor")
     
     all_groups = []
     offset = 0
     limit = 10
     
+    # Toplami sadece ilk sayfada istiyoruz, sonrakilerde COUNT'a gerek yok
+    total_mode = "exact"
+    
     while True:
         url = f"{BASE_URL}/devices/host-groups/"
-        params = {"limit": limit, "offset": offset}
+        params = {"limit": limit, "offset": offset, "total": total_mode}
         
-        result = await make_request(session, "GET", url, params=params)
+        result = await client.request("GET", url, params=params, cache=True)
         
         if not result:
             break
         
         all_groups.extend(result["resources"])
         
-        total = result["meta"]["pagination"]["total"]
-        offset += limit
+        total_mode = "none"
+        next_offset = result["meta"]["pagination"]["next"]
         
-        if offset >= total:
+        if not next_offset:
             break
+        offset = int(next_offset)
     
     print(f"{len(all_groups)} host group cekildi")
     return all_groups
 
 
-async def get_device_ids(session):
+async def get_device_ids(client, changed_since=None):
+    """
+    changed_since verilirse sadece o zamandan sonra degisen device'lar geliyor.
+    (id listesi, yeni watermark) donuyor; liste yarim kaldiysa watermark None.
+    """
     print("Device ID'leri cekiliyor")
     
     all_ids = []
-    limit = 10
+    limit = 500
     
+    # Cursor (after) modu: sayfalar primary key sirasinda, yeni kayit eklense de kaymiyor
     url = f"{BASE_URL}/devices/devices/"
-    params = {"limit": limit, "offset": 0}
-    first_page = await make_request(session, "GET", url, params=params)
+    after = ""
+    total_mode = "exact"
+    # Watermark ilk sayfadan: listeleme baslarken sunucunun zamani
+    watermark = None
     
-    if not first_page:
-        return []
-    
-    total = first_page["meta"]["pagination"]["total"]
-    
-    for device in first_page["resources"]:
-        all_ids.append(device["device_id"])
+    while True:
+        params = {"limit": limit, "after": after, "total": total_mode}
+        if changed_since:
+            params["changed_since"] = changed_since
+        result = await client.request("GET", url, params=params, cache=True)
         
-    tasks = []
-    for offset in range(limit, total, limit):
-        params = {"limit": limit, "offset": offset}
-        task = make_request(session, "GET", url, params=params)
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks)
-    
-    for result in results:
-        if result:
-            for device in result["resources"]:
-                all_ids.append(device["device_id"])
-    
-    unique_ids = list(set(all_ids))
-    
-    if len(all_ids) != len(unique_ids):
-        print(f"{len(all_ids) - len(unique_ids)} tekrar eden ID kaldirildi")
+        if not result:
+            watermark = None
+            break
+        
+        if not after:
+            watermark = result["meta"].get("watermark")
+        
+        for device in result["resources"]:
+            all_ids.append(device["device_id"])
+        
+        total_mode = "none"
+        after = result["meta"]["pagination"]["next"]
+        if not after:
+            break
     
-    print(f"{len(unique_ids)} unique device ID cekildi")
-    return unique_ids
+    print(f"{len(all_ids)} device ID cekildi")
+    return all_ids, watermark
 
 
-async def get_device_details(session, device_ids):
+async def get_device_details(client, scheduler, device_ids):
+    """
+    State ve group bilgisini de ayni istekte istiyoruz (include). Sunucu destekliyorsa
+    meta.include'da geri yaziyor; o zaman ayri online-state istegi ve join gerekmiyor.
+    (device'lar, include edildi mi) donuyor.
+    """
     print("Device detaylari cekiliyor")
     
     all_devices = []
+    embedded = False
     batch_size = 10
 
-    batches = [] 
-    for i in range(0, len(device_ids), batch_size):
-        batch = device_ids[i:i+batch_size]
-        batches.append(batch)
-    
+    # Batch'ler tek tek olusturuluyor, ayni anda en fazla scheduler'in limiti kadar istek
+    url = f"{BASE_URL}/devices/entities/?include={ENTITY_INCLUDES}"
 
-    tasks = []
-    url = f"{BASE_URL}/devices/entities/"
-    for batch in batches:
-        json_data = {"ids": batch}
-        task = make_request(session, "POST", url, json_data=json_data)
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks)
+    # entities POST'lari sadece okuyor; 5xx / timeout sonrasi tekrar denemek guvenli
+    async def fetch(batch):
+        return await client.request("POST", url, json_data={"ids": batch}, idempotent=True)
     
     received_ids = set()
-    for result in results:
+    async for batch, result in scheduler.imap(fetch, batched(device_ids, batch_size)):
         if result:
+            if result["meta"].get("include"):
+                embedded = True
             for device in result["resources"]:
                 all_devices.append(device)
                 received_ids.add(device["device_id"])
@@ -224,38 +138,28 @@ async def get_device_details(session, device_ids):
             print("Eksik ID'ler tekrar deneniyor")
             for missing_id in missing_ids:
                 json_data = {"ids": [missing_id]}
-                result = await make_request(session, "POST", url, json_data=json_data)
+                result = await client.request("POST", url, json_data=json_data, idempotent=True)
                 if result and result["resources"]:
                     all_devices.extend(result["resources"])
                     print(f"{missing_id} bulundu")
     
     print(f"{len(all_devices)} device detayi cekildi")
-    return all_devices
+    return all_devices, embedded
 
 
-async def get_device_states(session, device_ids):
+async def get_device_states(client, scheduler, device_ids):
     print("Device state'leri cekiliyor")
     
     all_states = []
     batch_size = 10
-    
-    batches = []
-    for i in range(0, len(device_ids), batch_size):
-        batch = device_ids[i:i+batch_size]
-        batches.append(batch)
-        
-    tasks = []
+
     url = f"{BASE_URL}/devices/entities/online-state/"
-    for batch in batches:
-        json_data = {"ids": batch}
-        task = make_request(session, "POST", url, json_data=json_data)
-        tasks.append(task)
-    
-    results = await asyncio.gather(*tasks)
-    
+
+    async def fetch(batch):
+        return await client.request("POST", url, json_data={"ids": batch}, idempotent=True)
 
     received_ids = set()
-    for result in results:
+    async for batch, result in scheduler.imap(fetch, batched(device_ids, batch_size)):
         if result:
             for state in result["resources"]:
                 all_states.append(state)
@@ -329,10 +233,12 @@ async def save_to_es(es, devices, states):
                     pass
         
         print(f"{device_count} device ve {state_count} state kaydedildi")
+        return True
         
     except Exception as e:
         print(f"Elasticsearch hatasi: {e}")
         logger.error(f"Elasticsearch hatasi: {e}")
+        return False
 
 
 async def log_to_es(es, level, message):
@@ -349,42 +255,62 @@ async def log_to_es(es, level, message):
 
 async def main():
     es = AsyncElasticsearch([ES_URL])
+    client = APIClient(BASE_URL)
+    client.load_etag_cache()
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with client:
+            # Batch isteklerinin eszamanliligi cevaplara gore ayarlaniyor (scheduler.py)
+            scheduler = Scheduler()
+            client.observers.append(scheduler.limit.observe)
             print("\nToken aliniyor")
-            await get_auth_token(session)
+            await client.authenticate(CLIENT_ID, CLIENT_SECRET)
             await log_to_es(es, "INFO", "Token alindi")
             
             print()
-            groups = await get_host_groups(session)
+            groups = await get_host_groups(client)
             await log_to_es(es, "INFO", f"{len(groups)} host group cekildi")
             
             print()
-            device_ids = await get_device_ids(session)
+            changed_since = None if FULL_SYNC else load_watermark(SYNC_STATE_FILE)
+            if changed_since:
+                print(f"Delta sync: {changed_since} sonrasi degisen device'lar")
+            device_ids, watermark = await get_device_ids(client, changed_since)
             await log_to_es(es, "INFO", f"{len(device_ids)} device ID cekildi")
             
             print()
-            devices = await get_device_details(session, device_ids)
+            devices, embedded = await get_device_details(client, scheduler, device_ids)
             await log_to_es(es, "INFO", f"{len(devices)} device detayi cekildi")
             
-            print()
-            states = await get_device_states(session, device_ids)
-            await log_to_es(es, "INFO", f"{len(states)} device state cekildi")
-
-            print()
-            devices = add_group_info(devices, groups)
-            await log_to_es(es, "INFO", "Enrichment tamamlandi")
+            if embedded:
+                # online_state ve group_info device'larin icinde geldi
+                states = []
+            else:
+                print()
+                states = await get_device_states(client, scheduler, device_ids)
+                await log_to_es(es, "INFO", f"{len(states)} device state cekildi")
+
+                print()
+                devices = add_group_info(devices, groups)
+                await log_to_es(es, "INFO", "Enrichment tamamlandi")
             
 
             print()
-            await save_to_es(es, devices, states)
+            saved = await save_to_es(es, devices, states)
+            
+            # Eksik detay varsa (basarisiz batch) watermark ilerlemiyor, sonraki calisma tekrar dener
+            if saved and watermark and len(devices) >= len(device_ids):
+                save_watermark(SYNC_STATE_FILE, watermark)
+                print(f"Watermark kaydedildi: {watermark}")
             
             print("\n" + "=" * 50)
             print("TAMAMLANDI")
             print(f"- {len(groups)} Host Group")
             print(f"- {len(devices)} Device")
-            print(f"- {len(states)} Device State")
+            if embedded:
+                print(f"- {sum(1 for d in devices if d.get('online_state'))} Device State (include ile)")
+            else:
+                print(f"- {len(states)} Device State")
             
             if devices:
                 print("\nOrnek Device:")
@@ -398,6 +324,7 @@ async def main():
         await log_to_es(es, "ERROR", f"Hata: {e}")
     
     finally:
+        client.save_etag_cache()
         await es.close()
 
 
@@ -1,10 +1,11 @@
 from dotenv import load_dotenv
 import asyncio
-import aiohttp
 import os
 import time
 from elasticsearch import AsyncElasticsearch
 import logging
+from api_client import APIClient, load_watermark, save_watermark
+from scheduler import Scheduler
 
 load_dotenv()
 
@@ -12,109 +13,17 @@ BASE_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 ES_URL = os.getenv("ES_URL", "http://localhost:9200")
-
-token = None
-remaining_requests = 5000
-retry_after_time = 0
+ENTITY_INCLUDES = "online_state,group_info"
+# Delta sync: son basarili calismanin watermark'i burada, FULL_SYNC=1 hepsini tekrar ceker.
+# async_client.py'den ayri dosya: biri digerinin watermark'ini ilerletip degisiklik kacirtmasin
+SYNC_STATE_FILE = os.getenv("SYNC_STATE_FILE", "sync_state_memory_efficient.json")
+FULL_SYNC = os.getenv("FULL_SYNC", "0") == "1"
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def get_auth_token(session):
-    global token
-    
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-    }
-    
-    async with session.post(f"{BASE_URL}/oauth2/token/", data=data) as response:
-        if response.status == 200:
-            result = await response.json()
-            token = result["access_token"]
-            print("Token alindi")
-            return token
-        else:
-            print(f"Token alinamadi: {response.status}")
-            return None
-
-
-async def check_rate_limit():
-    global remaining_requests, retry_after_time
-    
-    if remaining_requests < 10:
-        wait = retry_after_time - time.time()
-        if wait > 0:
-            print(f"Rate limit! {wait:.0f} saniye bekleniyor")
-            await asyncio.sleep(wait)
-            remaining_requests = 5000
-
-
-async def make_request(session, method, url, params=None, json_data=None, retry_count=0):
-    global remaining_requests, retry_after_time
-    
-    await check_rate_limit()
-    
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    try:
-        if method == "GET":
-            async with session.get(url, params=params, headers=headers) as response:
-                if "X-RateLimit-Remaining" in response.headers:
-                    remaining_requests = int(response.headers["X-RateLimit-Remaining"])
-                if "X-RateLimit-RetryAfter" in response.headers:
-                    retry_after_time = int(response.headers["X-RateLimit-RetryAfter"])
-                
-                if response.status == 200:
-                    return await response.json()
-                elif response.status in [429, 500, 502, 503, 504]:
-                    if retry_count < 3:
-                        wait_time = (2 ** retry_count)
-                        print(f"ERROR {response.status}, {wait_time} sn bekle")
-                        await asyncio.sleep(wait_time)
-                        return await make_request(session, method, url, params, json_data, retry_count + 1)
-                    else:
-                        print(f"Hata: {response.status}")
-                        return None
-                else:
-                    print(f"Hata: {response.status}")
-                    return None
-        
-        elif method == "POST":
-            async with session.post(url, json=json_data, headers=headers) as response:
-                if "X-RateLimit-Remaining" in response.headers:
-                    remaining_requests = int(response.headers["X-RateLimit-Remaining"])
-                if "X-RateLimit-RetryAfter" in response.headers:
-                    retry_after_time = int(response.headers["X-RateLimit-RetryAfter"])
-                
-                if response.status == 200:
-                    return await response.json()
-                elif response.status in [429, 500, 502, 503, 504]:
-                    if retry_count < 3:
-                        wait_time = (2 ** retry_count)
-                        print(f"ERROR {response.status}, {wait_time} sn bekle")
-                        await asyncio.sleep(wait_time)
-                        return await make_request(session, method, url, params, json_data, retry_count + 1)
-                    else:
-                        print(f"Hata: {response.status}")
-                        return None
-                else:
-                    print(f"Hata: {response.status}")
-                    return None
-    
-    except Exception as e:
-        if retry_count < 3:
-            wait_time = (2 ** retry_count)
-            await asyncio.sleep(wait_time)
-            return await make_request(session, method, url, params, json_data, retry_count + 1)
-        else:
-            print(f"ERROR {e}")
-            return None
-
-
-async def get_host_groups(session):
+async def get_host_groups(client):
     """
     Group'lar az sayida oldugu icin hepsini RAM'de tutmak OK.
     Bunlar enrichment icin lazim.
@@ -125,22 +34,26 @@ async def get_host_groups(session):
     offset = 0
     limit = 10
     
+    # Toplami sadece ilk sayfada istiyoruz, sonrakilerde COUNT'a gerek yok
+    total_mode = "exact"
+    
     while True:
         url = f"{BASE_URL}/devices/host-groups/"
-        params = {"limit": limit, "offset": offset}
+        params = {"limit": limit, "offset": offset, "total": total_mode}
         
-        result = await make_request(session, "GET", url, params=params)
+        result = await client.request("GET", url, params=params, cache=True)
         
         if not result:
             break
         
         all_groups.extend(result["resources"])
         
-        total = result["meta"]["pagination"]["total"]
-        offset += limit
+        total_mode = "none"
+        next_offset = result["meta"]["pagination"]["next"]
         
-        if offset >= total:
+        if not next_offset:
             break
+        offset = int(next_offset)
     
     # Dict'e cevir - hizli lookup icin
     group_dict = {}
@@ -151,64 +64,66 @@ async def get_host_groups(session):
     return group_dict
 
 
-async def get_device_ids_paginated(session):
+async def get_device_ids_paginated(client, sync):
     """
     Generator gibi calisiyor - her seferinde bir sayfa ID donuyor.
-    Tum ID'leri RAM'de tutmuyor.
+    Tum ID'leri RAM'de tutmuyor. Cursor (after) token'ini takip ediyor,
+    bu yuzden sayfalar kaymiyor ve derin sayfalar da ilk sayfa kadar ucuz.
+    sync["changed_since"] varsa sadece degisenler geliyor; ilk sayfanin
+    watermark'i sync["watermark"]'a yaziliyor, liste yarim kalirsa None.
     """
-    limit = 10
-    offset = 0
+    limit = 500
     
     url = f"{BASE_URL}/devices/devices/"
-    params = {"limit": limit, "offset": 0}
-    first_page = await make_request(session, "GET", url, params=params)
-    
-    if not first_page:
-        return
-    
-    total = first_page["meta"]["pagination"]["total"]
-    
-    # Ilk sayfanin ID'lerini don
-    page_ids = []
-    for device in first_page["resources"]:
-        page_ids.append(device["device_id"])
-    yield page_ids
+    after = ""
+    total_mode = "exact"
     
-    # Diger sayfalari don
-    offset = limit
-    while offset < total:
-        params = {"limit": limit, "offset": offset}
-        result = await make_request(session, "GET", url, params=params)
+    while True:
+        params = {"limit": limit, "after": after, "total": total_mode}
+        if sync.get("changed_since"):
+            params["changed_since"] = sync["changed_since"]
+        result = await client.request("GET", url, params=params)
+        
+        if not result:
+            sync["watermark"] = None
+            return
         
-        if result:
-            page_ids = []
-            for device in result["resources"]:
-                page_ids.append(device["device_id"])
+        if not after:
+            sync["watermark"] = result["meta"].get("watermark")
+        
+        page_ids = []
+        for device in result["resources"]:
+            page_ids.append(device["device_id"])
+        if page_ids:
             yield page_ids
         
-        offset += limit
+        total_mode = "none"
+        after = result["meta"]["pagination"]["next"]
+        if not after:
+            return
 
 
-async def get_device_details_batch(session, device_ids):
+async def get_device_details_batch(client, device_ids):
     """
-    Sadece verilen ID'lerin detaylarini ceker.
+    Sadece verilen ID'lerin detaylarini ceker. State ve group'lar da include ile
+    isteniyor; (device'lar, include edildi mi) donuyor.
     """
-    url = f"{BASE_URL}/devices/entities/"
+    url = f"{BASE_URL}/devices/entities/?include={ENTITY_INCLUDES}"
     json_data = {"ids": device_ids}
-    result = await make_request(session, "POST", url, json_data=json_data)
+    result = await client.request("POST", url, json_data=json_data, idempotent=True)
     
     if result:
-        return result["resources"]
-    return []
+        return result["resources"], bool(result["meta"].get("include"))
+    return [], False
 
 
-async def get_device_states_batch(session, device_ids):
+async def get_device_states_batch(client, device_ids):
     """
     Sadece verilen ID'lerin state'lerini ceker.
     """
     url = f"{BASE_URL}/devices/entities/online-state/"
     json_data = {"ids": device_ids}
-    result = await make_request(session, "POST", url, json_data=json_data)
+    result = await client.request("POST", url, json_data=json_data, idempotent=True)
     
     if result:
         return result["resources"]
@@ -270,45 +185,57 @@ async def log_to_es(es, level, message):
 
 async def main():
     es = AsyncElasticsearch([ES_URL])
+    client = APIClient(BASE_URL)
+    client.load_etag_cache()
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with client:
+            # Sayfa isteklerinin eszamanliligi cevaplara gore ayarlaniyor (scheduler.py)
+            scheduler = Scheduler()
+            client.observers.append(scheduler.limit.observe)
             # 1. Token al
             print("\nToken aliniyor")
-            await get_auth_token(session)
+            await client.authenticate(CLIENT_ID, CLIENT_SECRET)
             await log_to_es(es, "INFO", "Token alindi")
             
             # 2. Group'lari cek ve dict olarak tut (az veri, OK)
             print()
-            group_dict = await get_host_groups(session)
+            group_dict = await get_host_groups(client)
             await log_to_es(es, "INFO", f"{len(group_dict)} host group cekildi")
             
             # 3. Device ID'leri sayfa sayfa isle
             print("\nDevice'lar batch batch isleniyor (memory-efficient)")
             total_devices = 0
-            seen_ids = set()  # Dedupe icin
+            listed_ids = 0
             
-            async for page_ids in get_device_ids_paginated(session):
-                # Dedupe - daha once gordugumuz ID'leri atla
-                new_ids = [id for id in page_ids if id not in seen_ids]
-                seen_ids.update(new_ids)
-                
-                if not new_ids:
-                    continue
-                
-                print(f"\n--- Batch: {len(new_ids)} device isleniyor ---")
-                
-                # Bu batch icin detaylari cek
-                devices = await get_device_details_batch(session, new_ids)
-                print(f"  {len(devices)} device detayi cekildi")
-                
-                # Bu batch icin state'leri cek
-                states = await get_device_states_batch(session, new_ids)
-                print(f"  {len(states)} device state cekildi")
+            sync = {"changed_since": None if FULL_SYNC else load_watermark(SYNC_STATE_FILE), "watermark": None}
+            if sync["changed_since"]:
+                print(f"Delta sync: {sync['changed_since']} sonrasi degisen device'lar")
+            complete = True
+            
+            async def new_pages():
+                # Keyset cursor her id'yi bir kere veriyor; dedupe icin butun id'leri RAM'de tutmuyoruz
+                nonlocal listed_ids
+                async for page_ids in get_device_ids_paginated(client, sync):
+                    listed_ids += len(page_ids)
+                    yield page_ids
+            
+            async def fetch_page(new_ids):
+                # Bu sayfa icin detaylari cek
+                devices, embedded = await get_device_details_batch(client, new_ids)
                 
-                # Enrich et (group + state ekle)
-                devices = enrich_devices(devices, states, group_dict)
-                print(f"  Enrichment tamamlandi")
+                # Sunucu include'u desteklemiyorsa state'ler ayri istekle, group'lar lokal join ile
+                if not embedded:
+                    states = await get_device_states_batch(client, new_ids)
+                    devices = enrich_devices(devices, states, group_dict)
+                return devices
+            
+            # Sayfalar scheduler'in limiti kadar paralel isleniyor; biten sayfa hemen ES'e
+            async for new_ids, devices in scheduler.imap(fetch_page, new_pages()):
+                print(f"\n--- Batch: {len(new_ids)} device, {len(devices)} detay cekildi "
+                      f"(eszamanlilik {scheduler.limit.concurrency}) ---")
+                if len(devices) < len(new_ids):
+                    complete = False
                 
                 # ES'e yaz
                 await save_batch_to_es(es, devices)
@@ -317,22 +244,28 @@ async def main():
                 total_devices += len(devices)
                 
                 # !! ONEMLI: Bu batch'i RAM'den siliyoruz
-                # devices ve states degiskenleri bir sonraki iterasyonda
-                # yeni degerlerle uzerine yazilacak, eski veriler GC tarafindan silinecek
+                # devices degiskeni bir sonraki iterasyonda yeni degerle
+                # uzerine yazilacak, eski veriler GC tarafindan silinecek
                 
                 await log_to_es(es, "INFO", f"Batch islendi: {len(devices)} device")
             
+            # Eksik detay varsa watermark ilerlemiyor, sonraki calisma tekrar dener
+            if complete and sync["watermark"]:
+                save_watermark(SYNC_STATE_FILE, sync["watermark"])
+                print(f"\nWatermark kaydedildi: {sync['watermark']}")
+            
             print("\n" + "=" * 50)
             print("TAMAMLANDI (Memory-Efficient)")
             print(f"- {len(group_dict)} Host Group (RAM'de tutuldu - az veri)")
             print(f"- {total_devices} Device (batch batch islendi)")
-            print(f"- {len(seen_ids)} Unique ID")
+            print(f"- {listed_ids} ID listelendi")
     
     except Exception as e:
         print(f"Hata: {e}")
         await log_to_es(es, "ERROR", f"Hata: {e}")
     
     finally:
+        client.save_etag_cache()
         await es.close()
 
 
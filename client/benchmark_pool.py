@@ -0,0 +1,79 @@
+"""
+Baglanti havuzu boyutuna gore istek/saniye (APIClient, api_client.py).
+
+    python benchmark_pool.py --pool-sizes 1 10 50 100 --requests 2000
+
+Sunucunun rate limit'i kapali olmali (API_RATE_LIMIT_ENABLED=0), yoksa 429'lar olculur.
+Gecikmeler havuzdan baglanti beklemeyi de iceriyor.
+Her boyut icin keep-alive'li havuz; en son satir ayni en buyuk boyutta keep-alive'siz
+(her istek yeni TCP baglantisi, "no keep-alive") karsilastirma.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from api_client import APIClient
+
+load_dotenv()
+
+BASE_URL = os.getenv("API_URL", "http://127.0.0.1:8000")
+CLIENT_ID = os.getenv("CLIENT_ID")
+CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+
+
+async def run(pool_size, requests, concurrency, path, keepalive=True):
+    async with APIClient(BASE_URL, pool_size=pool_size, keepalive=keepalive, response_format="json") as client:
+        await client.authenticate(CLIENT_ID, CLIENT_SECRET)
+        url = f"{BASE_URL}{path}"
+        # Isinma: havuzdaki baglantilar acilsin
+        await asyncio.gather(*(client.request("GET", url) for _ in range(min(pool_size, requests))))
+
+        latencies = []
+        failures = 0
+        queue = iter(range(requests))
+
+        async def worker():
+            nonlocal failures
+            for _ in queue:
+                start = time.perf_counter()
+                result = await client.request("GET", url)
+                latencies.append(time.perf_counter() - start)
+                if result is None:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "failures": failures,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200, help="Ayni anda bekleyen istek (havuzdan fazla olabilir)")
+    parser.add_argument("--path", default="/devices/host-groups/")
+    args = parser.parse_args()
+
+    print(f"{args.requests} GET {args.path}, {args.concurrency} es zamanli")
+    print(f"{'havuz':>17} {'istek/sn':>10} {'p50 ms':>8} {'p99 ms':>8} {'hata':>5}")
+    runs = [(size, True) for size in args.pool_sizes] + [(max(args.pool_sizes), False)]
+    for size, keepalive in runs:
+        result = await run(size, args.requests, args.concurrency, args.path, keepalive)
+        label = str(size) if keepalive else f"{size} no keep-alive"
+        print(f"{label:>17} {result['rps']:>10.0f} {result['p50']:>8.1f} {result['p99']:>8.1f} {result['failures']:>5}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Sunucunun NDJSON / msgpack cevaplari icin artimli decoder'lar (api/renderers.py).
+Govde parca parca geldikce feed() tamamlanan kayitlari donuyor; parse islemi
+network transferiyle ust uste biniyor, govdenin tamamini beklemiyoruz.
+
+Cevapta resources kayit kayit, son kayit {"meta": ..., "errors": ...}.
+"""
+import json
+
+import msgpack
+
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "msgpack": "application/x-msgpack",
+}
+
+
+def accept_header(response_format):
+    # Format'i desteklemeyen endpoint'ler (host-groups) */* ile JSON donuyor
+    media_type = MEDIA_TYPES[response_format]
+    if response_format == "json":
+        return media_type
+    return f"{media_type}, */*;q=0.1"
+
+
+class NDJSONDecoder:
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data):
+        self.buffer += data
+        lines = self.buffer.split(b"\n")
+        # Son eleman yarim satir (ya da bos), bir sonraki parcayla tamamlaniyor
+        self.buffer = lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def close(self):
+        if self.buffer.strip():
+            raise ValueError("Truncated NDJSON body")
+
+
+class MsgPackDecoder:
+    # Ardisik msgpack nesneleri; yarim kalan nesneyi Unpacker sonraki parcaya sakliyor
+    def __init__(self):
+        self.unpacker = msgpack.Unpacker(raw=False)
+        self.received = 0
+        # Son tamamlanan nesnenin bittigi yer; yarim nesne tell()'i de ilerletiyor
+        self.complete = 0
+
+    def feed(self, data):
+        self.received += len(data)
+        self.unpacker.feed(data)
+        objects = []
+        for obj in self.unpacker:
+            objects.append(obj)
+            self.complete = self.unpacker.tell()
+        return objects
+
+    def close(self):
+        if self.complete != self.received:
+            raise ValueError("Truncated msgpack body")
+
+
+DECODERS = {
+    MEDIA_TYPES["ndjson"]: NDJSONDecoder,
+    MEDIA_TYPES["msgpack"]: MsgPackDecoder,
+}
+
+
+def envelope(records):
+    """
+    Kayit listesini JSON cevapla ayni sekle ({"meta", "errors", "resources"}) getiriyor.
+    """
+    if not records:
+        raise ValueError("Empty body")
+    trailer = records.pop()
+    if not isinstance(trailer, dict) or "meta" not in trailer:
+        # Zarf olmayan tek kayit (hata detayi)
+        return trailer
+    return {**trailer, "resources": records}
+
+
+async def read_body(response):
+    """
+    aiohttp cevabini Content-Type'a gore okuyor. NDJSON / msgpack'te kayitlar
+    parca geldikce parse ediliyor; JSON'da response.json().
+    """
+    decoder_class = DECODERS.get(response.content_type)
+    if decoder_class is None:
+        return await response.json()
+
+    decoder = decoder_class()
+    records = []
+    async for data in response.content.iter_any():
+        records.extend(decoder.feed(data))
+    decoder.close()
+    return envelope(records)
@@ -0,0 +1,145 @@
+"""
+Sunucunun token bucket'inin (api/ratelimit.py) client tarafindaki tahmini.
+
+Butun istekler ayni RateLimiter'dan gecip token aliyor. Token sayisi her cevapta
+X-RateLimit-Remaining'den (henuz cevabi gelmemis istekler dusulerek) duzeltiliyor,
+dolma hizi, tek basina giden isteklerin cevaplarindaki Remaining artisindan olculuyor.
+Token bitince istekler dolma hizinda, sirayla birakiliyor; RESERVE kadar token hic harcanmiyor,
+tahmin biraz sasarsa da 429 alinmiyor. Remaining 0 ya da 429 gelirse
+X-RateLimit-RetryAfter'a (epoch saniye) kadar kimse gonderilmiyor.
+"""
+import asyncio
+import os
+import time
+
+
+# Biliniyorsa sunucunun limiti (istek/saniye); bos ise cevaplardan olculuyor
+RATE = float(os.getenv("CLIENT_RATE_LIMIT", "0")) or None
+RESERVE = 1
+# Dolma hizi en az bu kadar saniyelik aralikla olculuyor (Remaining tam sayi, kisa aralikta gurultulu)
+RATE_WINDOW = 2.0
+
+
+class RateLimiter:
+    """
+    await limiter.acquire()         istekten once
+    limiter.update(status, remaining, retry_after)  cevap gelince
+    limiter.release()               cevap hic gelmediyse (baglanti hatasi)
+    """
+
+    def __init__(self, rate=RATE, reserve=RESERVE, clock=time.monotonic, wall_clock=time.time):
+        self.rate = rate
+        self.reserve = reserve
+        self.clock = clock
+        self.wall_clock = wall_clock
+        # Ilk cevap gelene kadar tek istek yolda; header'siz cevapta (limit yok) tokens None kaliyor
+        self.probing = True
+        self.tokens = None
+        self.burst = None
+        self.updated = clock()
+        self.blocked_until = 0.0
+        # Token alip cevabi henuz gelmemis istekler
+        self.outstanding = 0
+        # Yoldaki tek istek; cevabindaki Remaining kesin guncel
+        self.solo = False
+        self.answered = 0
+        self.sample = None
+        self.waits = 0
+        self._lock = asyncio.Lock()
+        self._answer = asyncio.Event()
+
+    def _refill(self, now):
+        if self.tokens is not None and self.rate:
+            self.tokens += (now - self.updated) * self.rate
+            if self.burst is not None:
+                self.tokens = min(self.tokens, self.burst)
+        self.updated = now
+
+    def _wait_time(self, now):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens is None:
+            return 0
+        if self.rate:
+            needed = 1 + self.reserve
+            return 0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+        # Hiz henuz olculmedi: rezerv tutulmuyor, token bitince yoldaki cevaplar bekleniyor (None).
+        # Yolda istek yoksa RetryAfter gecmis demek, tek istek gidiyor
+        if self.tokens >= 1 or not self.outstanding:
+            return 0
+        return None
+
+    async def acquire(self):
+        # Lock siradaki istegi tutuyor; bekleyenler FIFO, dolma hizinda birer birer
+        async with self._lock:
+            while True:
+                if self.probing and self.outstanding:
+                    await self._next_answer()
+                    continue
+                now = self.clock()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if wait is None:
+                    await self._next_answer()
+                    continue
+                if wait <= 0:
+                    break
+                self.waits += 1
+                await asyncio.sleep(wait)
+            if self.tokens is not None:
+                self.tokens -= 1
+            self.solo = not self.outstanding
+            self.outstanding += 1
+
+    async def _next_answer(self):
+        self._answer.clear()
+        await self._answer.wait()
+
+    def release(self):
+        self.outstanding = max(0, self.outstanding - 1)
+        self._answer.set()
+
+    def update(self, status, remaining=None, retry_after=None):
+        self.release()
+        self.probing = False
+        if remaining is None:
+            return
+        solo = self.solo and not self.outstanding
+        now = self.clock()
+        if status != 429:
+            # 429'da sunucu token harcamiyor
+            self.answered += 1
+        self.burst = max(self.burst or 0, remaining + 1)
+        if solo:
+            self._measure_rate(now, remaining)
+
+        # Yoldaki istekler dusuluyor. Cevaplar sunucudaki siradan farkli gelebiliyor, gec gelen
+        # cevabin Remaining'i eski (yuksek); tek istegin cevabi disinda tahmin sadece asagi cekiliyor
+        self._refill(now)
+        estimate = remaining - self.outstanding
+        if self.tokens is None or solo:
+            self.tokens = estimate
+        else:
+            self.tokens = min(self.tokens, estimate)
+        if status == 429 or remaining <= 0:
+            self.tokens = min(self.tokens, 0)
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after - self.wall_clock())
+
+    def _measure_rate(self, now, remaining):
+        # Sadece tek giden isteklerin cevaplari; arada harcanan token'lar cevaplanan istekler.
+        # Bucket doluyken artis gorunmuyor, o ornekler hizi dusuk gosterir
+        if remaining + 1 >= self.burst:
+            self.sample = None
+            return
+        if self.sample is None:
+            self.sample = (now, remaining, self.answered)
+            return
+        started, start_remaining, start_answered = self.sample
+        if now - started < RATE_WINDOW:
+            return
+        refill = remaining - start_remaining + (self.answered - start_answered)
+        if refill > 0:
+            rate = refill / (now - started)
+            self.rate = rate if self.rate is None else 0.5 * self.rate + 0.5 * rate
+        self.sample = (now, remaining, self.answered)
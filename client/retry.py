@@ -0,0 +1,169 @@
+"""
+APIClient icin tekrar deneme politikasi.
+
+- Bekleme decorrelated jitter ile: min(cap, uniform(base, onceki * 3)). Ayni anda hata
+  alan istekler ayni anda tekrar gelmiyor.
+- RetryBudget: calisma boyunca tekrar sayisi istek sayisinin RATIO'su (+ MIN_RETRIES)
+  ile sinirli; kesinti sirasinda tekrarlar yuku katlamiyor.
+- CircuitBreaker: ust uste FAILURE_THRESHOLD hata gelince devre aciliyor, istekler
+  sunucuya gitmeden None donuyor. RESET_TIMEOUT sonra tek bir deneme istegi geciyor;
+  basarili olursa devre kapaniyor.
+- classify(): hatanin turu. Sunucuya hic ulasmamis (baglanti kurulamadi) ya da islenmeden
+  reddedilmis (429) istekler her zaman, islenmis olabilecekler (5xx, timeout, kopan
+  baglanti) sadece idempotent isteklerde tekrar deneniyor.
+"""
+import os
+import random
+import time
+
+import aiohttp
+
+
+MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+RETRY_RATIO = 0.2
+MIN_RETRIES = 20
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 10.0
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# classify() sonuclari
+OK = "ok"
+CLIENT_ERROR = "client_error"     # 4xx; tekrar denemek ayni cevabi verir
+REJECTED = "rejected"             # 429; sunucu islemeden reddetti
+NOT_SENT = "not_sent"             # baglanti kurulamadi, istek gitmedi
+SERVER_ERROR = "server_error"     # 5xx; islenmis olabilir
+INTERRUPTED = "interrupted"       # timeout, kopan baglanti, bozuk govde; islenmis olabilir
+
+RETRY_ALWAYS = {REJECTED, NOT_SENT}
+RETRY_IF_IDEMPOTENT = {SERVER_ERROR, INTERRUPTED}
+# Devreyi acan hatalar; 429 ve 4xx sunucunun ayakta oldugunu gosteriyor
+OUTAGE = {NOT_SENT, SERVER_ERROR, INTERRUPTED}
+
+
+def classify(status=None, error=None):
+    if error is not None:
+        if isinstance(error, aiohttp.ClientConnectorError):
+            return NOT_SENT
+        return INTERRUPTED
+    if status == 429:
+        return REJECTED
+    if status >= 500:
+        return SERVER_ERROR
+    if status >= 400:
+        return CLIENT_ERROR
+    return OK
+
+
+def is_idempotent(method):
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+class RetryBudget:
+    """
+    Calisma basina tekrar hakki: MIN_RETRIES + RATIO * istek sayisi.
+    """
+
+    def __init__(self, ratio=RETRY_RATIO, min_retries=MIN_RETRIES):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_spend(self):
+        if self.retries >= self.min_retries + self.ratio * self.requests:
+            self.denied += 1
+            return False
+        self.retries += 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    closed -> (ust uste failure_threshold hata) -> open -> (reset_timeout) -> half_open.
+    half_open'da tek deneme istegi geciyor, digerleri reddediliyor.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.shed = 0
+
+    def allow(self):
+        """
+        Istek gonderilebilir mi. half_open'da True donen istek deneme istegi;
+        sonucu record() ile, iptal edilirse cancel_probe() ile bildirilmeli.
+        """
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        self.shed += 1
+        return False
+
+    def record(self, outcome):
+        if outcome in OUTAGE:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"Devre acildi: ust uste {self.failures} hata, {self.reset_timeout:.0f} sn istek gonderilmeyecek")
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self.probing = False
+
+    def cancel_probe(self):
+        # Deneme istegi sonucsuz kaldiysa (iptal) siradaki denesin
+        if self.state == self.HALF_OPEN:
+            self.probing = False
+
+
+class RetryPolicy:
+    """
+    APIClient.request bunu kullaniyor; alt sinif should_retry / backoff'u degistirebilir.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base=BACKOFF_BASE, cap=BACKOFF_CAP, budget=None, rng=None):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.budget = budget or RetryBudget()
+        self.rng = rng or random.Random()
+
+    def should_retry(self, outcome, idempotent, attempt):
+        if attempt + 1 >= self.max_attempts:
+            return False
+        if outcome in RETRY_ALWAYS or (idempotent and outcome in RETRY_IF_IDEMPOTENT):
+            return self.budget.try_spend()
+        return False
+
+    def backoff(self, previous=None):
+        # Decorrelated jitter (AWS Architecture Blog, "Exponential Backoff And Jitter")
+        return min(self.cap, self.rng.uniform(self.base, (previous or self.base) * 3))
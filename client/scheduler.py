@@ -0,0 +1,154 @@
+"""
+Batch istekleri icin sinirli, kendini ayarlayan worker havuzu.
+
+Ayni anda yolda olan is sayisi AIMD ile ayarlaniyor: saglikli her cevapta limit
+1/limit artiyor (her "tur" basina +1), 429 / 5xx / baglanti hatasinda ya da ortalama
+gecikme hedefi asinca yariya iniyor. X-RateLimit-Remaining azaldiysa limit artmiyor.
+Sonuclar tamamlandikca donuyor (imap), hepsi bellekte toplanmiyor.
+"""
+import asyncio
+import math
+import os
+import time
+
+
+INITIAL_CONCURRENCY = int(os.getenv("INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "64"))
+# Ortalama cevap suresi (saniye) bunu asarsa sunucu zorlaniyor sayiliyor
+LATENCY_TARGET = float(os.getenv("LATENCY_TARGET", "1.0"))
+# Kalan istek hakki bunun altindaysa limit artmiyor
+REMAINING_FLOOR = 10
+
+_DONE = object()
+
+
+class AIMDLimit:
+    """
+    observe(status, latency, remaining) her HTTP cevabi icin (APIClient.observers).
+    status None = baglanti hatasi / timeout.
+    """
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, min_limit=1, max_limit=MAX_CONCURRENCY, increase=1.0,
+                 backoff=0.5, latency_target=LATENCY_TARGET, remaining_floor=REMAINING_FLOOR, clock=time.monotonic):
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_target = latency_target
+        self.remaining_floor = remaining_floor
+        self.clock = clock
+        # Ustel ortalama, tek yavas cevap limiti dusurmesin
+        self.latency = None
+        self.last_decrease = -math.inf
+        self.decreases = 0
+
+    @property
+    def concurrency(self):
+        return int(self.limit)
+
+    def observe(self, status, latency, remaining=None):
+        if status is None or status == 429 or status >= 500:
+            self.decrease()
+            return
+        if status >= 400:
+            # Istegin kendisi hatali (404, 400), sunucunun yukuyle ilgisi yok
+            return
+
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if self.latency > self.latency_target:
+            self.decrease()
+            return
+        if remaining is not None and remaining < self.remaining_floor:
+            return
+        self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def decrease(self):
+        now = self.clock()
+        # Zaten yoldaki isteklerin hatalari ayni sikisikligin sonucu; tur basina tek azaltma
+        if now - self.last_decrease < (self.latency or 0):
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.last_decrease = now
+        self.decreases += 1
+
+
+class Scheduler:
+    """
+    async for item, result in scheduler.imap(fetch, items):
+        ...
+
+    items liste, generator ya da async generator olabiliyor; siradaki eleman ancak
+    bos slot olunca cekiliyor. Ayni anda en fazla limit.concurrency is calisiyor,
+    tamamlanan sonuclar sinirli bir kuyruktan tamamlanma sirasinda donuyor.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit or AIMDLimit()
+        self.in_flight = 0
+        self.peak = 0
+        self._slots = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < self.limit.concurrency)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    async def release(self):
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    async def imap(self, func, items):
+        source = items.__aiter__() if hasattr(items, "__aiter__") else aiter_sync(items)
+        source_lock = asyncio.Lock()
+        results = asyncio.Queue(maxsize=self.limit.max_limit)
+
+        async def worker():
+            while True:
+                await self.acquire()
+                try:
+                    async with source_lock:
+                        try:
+                            item = await source.__anext__()
+                        except StopAsyncIteration:
+                            return
+                    result = await func(item)
+                finally:
+                    await self.release()
+                await results.put((item, result))
+
+        async def run():
+            workers = [asyncio.create_task(worker()) for _ in range(self.limit.max_limit)]
+            try:
+                await asyncio.gather(*workers)
+            except Exception as e:
+                for task in workers:
+                    task.cancel()
+                await results.put((_DONE, e))
+            else:
+                await results.put((_DONE, None))
+
+        runner = asyncio.create_task(run())
+        try:
+            while True:
+                item, result = await results.get()
+                if item is _DONE:
+                    if result is not None:
+                        raise result
+                    return
+                yield item, result
+        finally:
+            runner.cancel()
+
+
+async def aiter_sync(items):
+    for item in items:
+        yield item
+
+
+def batched(items, size):
+    # Liste once bolunup bellekte tutulmuyor, batch'ler scheduler cektikce olusuyor
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import io
+import socket
+import time
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from api_client import APIClient
+from retry import CircuitBreaker, RetryPolicy
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubAPI:
+    """
+    /devices/devices/ gibi davranan stub; `failures[path]` kadar hata (status) verip sonra 200.
+    """
+
+    def __init__(self):
+        self.failures = {}
+        self.requests = []
+        self.app = web.Application()
+        self.app.router.add_route("*", "/{path:.*}", self.handle)
+
+    async def handle(self, request):
+        self.requests.append((request.method, request.path, request.headers.get("If-None-Match")))
+        if request.path == "/slow/":
+            await asyncio.sleep(10)
+        pending = self.failures.get(request.path)
+        if pending:
+            status = pending.pop(0)
+            if status == 429:
+                return web.json_response(
+                    {"errors": ["Too many requests"]}, status=429,
+                    headers={"X-RateLimit-Remaining": "0", "X-RateLimit-RetryAfter": str(int(time.time()))},
+                )
+            return web.json_response({"errors": [f"status {status}"]}, status=status)
+
+        etag = 'W/"v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        body = {"meta": {}, "resources": [{"device_id": "dev_000"}], "errors": []}
+        return web.json_response(body, headers={"ETag": etag, "X-RateLimit-Remaining": "50"})
+
+
+class RequestTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # request() hatalari print ediyor
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.stub = StubAPI()
+        self.server = TestServer(self.stub.app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+        self.base_url = str(self.server.make_url("")).rstrip("/")
+        self.client = APIClient(
+            self.base_url, response_format="json", etag_cache_file=None,
+            retry_policy=RetryPolicy(max_attempts=3, base=0.001, cap=0.01),
+        )
+        await self.client.__aenter__()
+        self.addAsyncCleanup(self.client.__aexit__, None, None, None)
+        self.statuses = []
+        self.client.observers.append(lambda status, latency, remaining: self.statuses.append(status))
+
+    async def test_ok(self):
+        result = await self.client.request("GET", f"{self.base_url}/devices/devices/", params={"limit": 1})
+        self.assertEqual(result["resources"], [{"device_id": "dev_000"}])
+        self.assertEqual(self.statuses, [200])
+        self.assertEqual(self.client.rate_limiter.tokens, 50)
+
+    async def test_not_modified_from_etag_cache(self):
+        url = f"{self.base_url}/devices/devices/"
+        first = await self.client.request("GET", url, params={"limit": 1}, cache=True)
+        second = await self.client.request("GET", url, params={"limit": 1}, cache=True)
+        self.assertEqual(second, first)
+        self.assertEqual(self.statuses, [200, 304])
+        self.assertEqual(self.stub.requests[-1][2], 'W/"v1"')
+
+    async def test_rate_limited_is_retried(self):
+        self.stub.failures["/devices/entities/"] = [429]
+        # POST idempotent degil; 429'da sunucu istegi islemedi, yine de tekrar deneniyor
+        result = await self.client.request("POST", f"{self.base_url}/devices/entities/", json_data={"ids": ["dev_000"]})
+        self.assertIsNotNone(result)
+        self.assertEqual(self.statuses, [429, 200])
+        self.assertEqual(self.client.rate_limiter.outstanding, 0)
+
+    async def test_server_error(self):
+        self.stub.failures["/devices/devices/"] = [503, 500]
+        result = await self.client.request("GET", f"{self.base_url}/devices/devices/")
+        self.assertIsNotNone(result)
+        self.assertEqual(self.statuses, [503, 500, 200])
+
+        # Islenmis olabilecek POST tekrar gonderilmiyor
+        self.stub.failures["/devices/entities/"] = [503]
+        result = await self.client.request("POST", f"{self.base_url}/devices/entities/", json_data={"ids": []})
+        self.assertIsNone(result)
+        self.assertEqual(self.statuses[-1], 503)
+
+    async def test_client_error_not_retried(self):
+        self.stub.failures["/devices/devices/"] = [404]
+        self.assertIsNone(await self.client.request("GET", f"{self.base_url}/devices/devices/"))
+        self.assertEqual(self.statuses, [404])
+
+    async def test_connection_error(self):
+        self.client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        url = f"http://127.0.0.1:{unused_port()}/devices/devices/"
+        self.assertIsNone(await self.client.request("GET", url))
+        # Iki baglanti hatasindan sonra devre acik, ucuncu deneme gonderilmiyor
+        self.assertEqual(self.statuses, [None, None])
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.client.rate_limiter.outstanding, 0)
+
+    async def test_cancelled_before_response(self):
+        task = asyncio.create_task(self.client.request("GET", f"{self.base_url}/slow/"))
+        while not self.stub.requests:
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.client.rate_limiter.outstanding, 1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.client.rate_limiter.outstanding, 0)
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+import msgpack
+
+from decoders import MsgPackDecoder, NDJSONDecoder, accept_header, envelope
+
+
+RECORDS = [
+    {"device_id": "dev_000", "hostname": "türkçe\nhost", "groups": []},
+    {"device_id": "dev_001", "hostname": "c" * 70000, "external_ip": None},
+]
+TRAILER = {"meta": {"pagination": {"next": None}}, "errors": [{"id": "missing", "message": "Device not found"}]}
+
+
+def decode(decoder, body, step=7):
+    # Govdeyi kucuk parcalarla besliyoruz, kayit sinirlari parcalara denk gelmesin
+    records = []
+    for i in range(0, len(body), step):
+        records.extend(decoder.feed(body[i:i + step]))
+    decoder.close()
+    return envelope(records)
+
+
+class DecoderTests(unittest.TestCase):
+
+    def test_ndjson(self):
+        body = b"".join(json.dumps(record).encode() + b"\n" for record in [*RECORDS, TRAILER])
+        self.assertEqual(decode(NDJSONDecoder(), body), {**TRAILER, "resources": RECORDS})
+
+    def test_msgpack(self):
+        body = b"".join(msgpack.packb(record) for record in [*RECORDS, TRAILER])
+        self.assertEqual(decode(MsgPackDecoder(), body, step=3), {**TRAILER, "resources": RECORDS})
+
+    def test_truncated_body(self):
+        for decoder, body in [
+            (NDJSONDecoder(), json.dumps(TRAILER).encode()),
+            (MsgPackDecoder(), msgpack.packb(TRAILER)[:-1]),
+        ]:
+            with self.subTest(decoder=type(decoder).__name__):
+                decoder.feed(body)
+                with self.assertRaises(ValueError):
+                    decoder.close()
+
+    def test_error_detail_without_envelope(self):
+        self.assertEqual(envelope([{"detail": "Not found."}]), {"detail": "Not found."})
+
+    def test_accept_header(self):
+        self.assertEqual(accept_header("json"), "application/json")
+        self.assertEqual(accept_header("msgpack"), "application/x-msgpack, */*;q=0.1")
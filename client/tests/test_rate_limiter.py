@@ -0,0 +1,29 @@
+import asyncio
+import time
+import unittest
+
+from rate_limiter import RateLimiter
+
+
+class RateLimiterTests(unittest.IsolatedAsyncioTestCase):
+
+    async def test_without_headers(self):
+        # Rate limit kapali sunucu header gondermiyor; ilk cevaptan sonra istekler serbest
+        limiter = RateLimiter()
+        await limiter.acquire()
+        limiter.update(200)
+        await asyncio.wait_for(asyncio.gather(*(limiter.acquire() for _ in range(50))), 1)
+        self.assertEqual(limiter.waits, 0)
+
+    async def test_out_of_order_responses(self):
+        limiter = RateLimiter()
+        await limiter.acquire()
+        limiter.update(200, 9, int(time.time()))
+        self.assertEqual(limiter.tokens, 9)
+        for _ in range(8):
+            await limiter.acquire()
+        # Sunucu 8..1 sirasinda isledi, cevaplar ters sirada geliyor; eski Remaining tahmini yukseltmiyor
+        for remaining in range(1, 9):
+            limiter.update(200, remaining, int(time.time()))
+            self.assertLessEqual(limiter.tokens, 1)
+        self.assertEqual(limiter.outstanding, 0)
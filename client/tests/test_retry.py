@@ -0,0 +1,91 @@
+import asyncio
+import random
+import unittest
+from unittest import mock
+
+import aiohttp
+
+import retry
+from retry import CircuitBreaker, RetryBudget, RetryPolicy
+
+
+class RetryPolicyTests(unittest.TestCase):
+
+    def test_decorrelated_jitter(self):
+        policy = RetryPolicy(base=0.5, cap=10, rng=random.Random(0))
+        delay = None
+        delays = []
+        for _ in range(200):
+            previous = delay or 0.5
+            delay = policy.backoff(delay)
+            self.assertGreaterEqual(delay, 0.5)
+            self.assertLessEqual(delay, min(10, previous * 3))
+            delays.append(delay)
+        # Ayni anda hata alanlar farkli surelerde bekliyor
+        self.assertGreater(len(set(delays)), 100)
+
+    def test_classify(self):
+        self.assertEqual(retry.classify(200), retry.OK)
+        self.assertEqual(retry.classify(404), retry.CLIENT_ERROR)
+        self.assertEqual(retry.classify(429), retry.REJECTED)
+        self.assertEqual(retry.classify(503), retry.SERVER_ERROR)
+        self.assertEqual(retry.classify(error=asyncio.TimeoutError()), retry.INTERRUPTED)
+        connect_error = aiohttp.ClientConnectorError(mock.Mock(), OSError(111, "Connection refused"))
+        self.assertEqual(retry.classify(error=connect_error), retry.NOT_SENT)
+        self.assertTrue(retry.is_idempotent("get"))
+        self.assertFalse(retry.is_idempotent("POST"))
+
+    def test_non_idempotent(self):
+        policy = RetryPolicy(max_attempts=4)
+        # Islenmis olabilecek istek tekrar gonderilmiyor; islenmemis olan (429, baglanti yok) gonderiliyor
+        self.assertFalse(policy.should_retry(retry.SERVER_ERROR, False, 0))
+        self.assertFalse(policy.should_retry(retry.INTERRUPTED, False, 0))
+        self.assertTrue(policy.should_retry(retry.REJECTED, False, 0))
+        self.assertTrue(policy.should_retry(retry.NOT_SENT, False, 0))
+        self.assertTrue(policy.should_retry(retry.SERVER_ERROR, True, 0))
+        self.assertFalse(policy.should_retry(retry.CLIENT_ERROR, True, 0))
+        self.assertFalse(policy.should_retry(retry.SERVER_ERROR, True, 3))
+
+    def test_budget(self):
+        budget = RetryBudget(ratio=0.1, min_retries=2)
+        policy = RetryPolicy(budget=budget)
+        for _ in range(100):
+            budget.record_request()
+        allowed = sum(policy.should_retry(retry.SERVER_ERROR, True, 0) for _ in range(50))
+        self.assertEqual(allowed, 12)
+        self.assertEqual(budget.denied, 38)
+        for _ in range(10):
+            budget.record_request()
+        self.assertTrue(budget.try_spend())
+
+    def test_circuit_breaker(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+        breaker.record(retry.SERVER_ERROR)
+        breaker.record(retry.OK)
+        breaker.record(retry.SERVER_ERROR)
+        breaker.record(retry.REJECTED)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record(retry.NOT_SENT)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        # Sure dolunca tek deneme istegi
+        now[0] = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(retry.INTERRUPTED)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        now[0] = 15
+        self.assertFalse(breaker.allow())
+
+        now[0] = 20
+        self.assertTrue(breaker.allow())
+        breaker.cancel_probe()
+        self.assertTrue(breaker.allow())
+        breaker.record(retry.OK)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(all(breaker.allow() for _ in range(5)))
+        self.assertEqual(breaker.shed, 3)
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from scheduler import AIMDLimit, Scheduler
+
+
+class SchedulerTests(unittest.IsolatedAsyncioTestCase):
+
+    def test_aimd(self):
+        now = [0.0]
+        limit = AIMDLimit(initial=4, max_limit=8, latency_target=0.5, clock=lambda: now[0])
+        for _ in range(4):
+            limit.observe(200, 0.1, 50)
+        # Tur basina (limit kadar cevap) +1
+        self.assertEqual(limit.concurrency, 4)
+        self.assertAlmostEqual(limit.limit, 5, delta=0.2)
+
+        limit.observe(200, 0.1, 5)
+        self.assertAlmostEqual(limit.limit, 5, delta=0.2)
+
+        limit.observe(429, 0.1)
+        limit.observe(503, 0.1)
+        limit.observe(None, 0.1)
+        # Ayni turdaki hatalar tek azaltma
+        self.assertEqual((limit.concurrency, limit.decreases), (2, 1))
+        now[0] = 1
+        limit.observe(500, 0.1)
+        self.assertEqual(limit.concurrency, 1)
+        limit.observe(404, 0.1)
+        self.assertEqual((limit.concurrency, limit.decreases), (1, 2))
+
+        for _ in range(1000):
+            limit.observe(200, 0.1)
+        self.assertEqual(limit.concurrency, 8)
+        now[0] = 2
+        for _ in range(10):
+            limit.observe(200, 2.0)
+        self.assertLess(limit.concurrency, 8)
+
+    async def test_bounded_and_streamed(self):
+        limit = AIMDLimit(initial=3, max_limit=10, latency_target=1)
+        scheduler = Scheduler(limit)
+        running = 0
+        pulled = []
+
+        def items():
+            for i in range(40):
+                pulled.append(i)
+                yield i
+
+        async def work(i):
+            nonlocal running
+            running += 1
+            self.assertLessEqual(running, limit.concurrency)
+            # Ters sirada bitiyor
+            await asyncio.sleep((40 - i) * 0.0005)
+            running -= 1
+            limit.observe(200, 0.01)
+            return i * 2
+
+        results = []
+        async for item, result in scheduler.imap(work, items()):
+            if not results:
+                # Ilk sonuc geldiginde hepsi cekilmemis
+                self.assertLess(len(pulled), 40)
+            results.append((item, result))
+        self.assertEqual(sorted(results), [(i, i * 2) for i in range(40)])
+        self.assertNotEqual(results, sorted(results))
+        self.assertGreater(scheduler.peak, 3)
+        self.assertLessEqual(scheduler.peak, 10)
+        self.assertEqual(scheduler.in_flight, 0)
+
+    async def test_backs_off(self):
+        limit = AIMDLimit(initial=8, max_limit=8)
+        scheduler = Scheduler(limit)
+
+        async def pages():
+            for i in range(20):
+                yield i
+
+        async def work(i):
+            await asyncio.sleep(0)
+            limit.observe(429 if i == 0 else 200, 0.001)
+            return i
+
+        seen = [item async for item, _ in scheduler.imap(work, pages())]
+        self.assertEqual(sorted(seen), list(range(20)))
+        self.assertEqual(limit.decreases, 1)
+
+    async def test_error_propagates(self):
+        async def work(i):
+            if i == 5:
+                raise ValueError("boom")
+            return i
+
+        with self.assertRaises(ValueError):
+            async for _ in Scheduler(AIMDLimit(initial=2, max_limit=4)).imap(work, range(20)):
+                pass
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mock_api.settings")
 
 application = get_asgi_application()
+
+# API_SNAPSHOT acik ise ilk snapshot arka planda yukleniyor (api/snapshot.py)
+from api.snapshot import engine as snapshot_engine  # noqa: E402
+
+snapshot_engine.warm_up()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -139,9 +141,85 @@ OAUTH2_PROVIDER = {
 # REST Framework Authentication
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'api.authentication.CachedOAuth2Authentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
+
+# Cache (count cache burada tutuluyor). Key'lerdeki tablo versiyonlari veritabanindan
+# (api/caching.py), process basina cache de eski sonuc vermiyor
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+API_COUNT_CACHE_TIMEOUT = 300
+
+# ?stream=true cevaplarinda QuerySet.iterator() chunk boyutu
+API_STREAM_CHUNK_SIZE = 500
+
+# Dogrulanmis access token'lar process icinde bu kadar saniye cache'leniyor (token expires'i gecmez)
+API_TOKEN_CACHE_TTL = 60
+API_TOKEN_CACHE_SIZE = 10000
+
+# Client bazli token bucket: PERIOD saniyede RATE istek, en fazla BURST birikir
+API_RATE_LIMIT = {
+    "ENABLED": os.getenv("API_RATE_LIMIT_ENABLED", "1") == "1",
+    "RATE": 100,
+    "PERIOD": 60,
+    "BURST": 100,
+}
+
+# /devices/entities/ ve online-state: istek basina en fazla bu kadar (tekrarsiz) id, fazlasi 400.
+# Id'ler bu boyutta parcalarla sorgulaniyor (SQLite'in parametre sinirini asmiyor)
+API_MAX_IDS_PER_REQUEST = 10000
+API_LOOKUP_CHUNK_SIZE = 5000
+
+# Yuk testleri icin hata / gecikme profilleri (api/faults.py). Istek basina ?fault_profile=<ad>
+# ya da X-Fault-Profile header'i; PROFILE verilirse butun isteklere uygulaniyor.
+# SEED verilirse ayni istek sirasi ayni hatalari / gecikmeleri aliyor
+API_FAULTS = {
+    "PROFILE": os.getenv("API_FAULT_PROFILE", ""),
+    "SEED": None,
+    "PROFILES": {
+        "production": {
+            "latency": {"lognormal": {"p50": 0.04, "p99": 0.6}, "max": 5},
+            "errors": {500: 0.002, 503: 0.003},
+            "rate_limit": 0.005,
+        },
+        "degraded": {
+            "latency": {"lognormal": {"p50": 0.2, "p99": 3}, "max": 10},
+            "errors": {500: 0.02, 502: 0.01, 503: 0.03, 504: 0.01},
+            "bursts": {"every": 60, "duration": 5},
+        },
+        "jitter": {"latency": {"uniform": [0.01, 0.25]}},
+    },
+}
+
+# Accept-Encoding ile cevap sikistirma (brotli kuruluysa "br" de kullaniliyor)
+API_COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "CODECS": ["br", "gzip"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+}
+
+# /devices/entities/ icin device basina render edilmis JSON parcalari (api/fragments.py)
+API_FRAGMENT_CACHE = {
+    "ENABLED": os.getenv("API_FRAGMENT_CACHE_ENABLED", "1") == "1",
+    "MAX_ENTRIES": 100000,
+    "MAX_BYTES": 64 * 1024 * 1024,
+}
+
+# Okuma endpoint'leri icin bellek ici snapshot (api/snapshot.py). Sunucu acilirken ve yazmadan
+# en erken MIN_REFRESH_INTERVAL saniye sonra arka planda yukleniyor, arada istekler ORM'den
+API_SNAPSHOT = {
+    "ENABLED": os.getenv("API_SNAPSHOT_ENABLED", "0") == "1",
+    "MIN_REFRESH_INTERVAL": 5,
+}
+
+# ASGI (uvicorn mock_api.asgi:application) altinda okuma endpoint'leri icin async view'lar
+API_ASYNC_VIEWS = os.getenv("API_ASYNC_VIEWS", "0") == "1"